@@ -0,0 +1,472 @@
+#!/usr/bin/env python3
+"""
+Flipkart Review Scraper API - standalone FastAPI service around the scraper
+
+Endpoints:
+    POST /jobs                      Queue a batch of product URLs, returns the job id
+    GET  /jobs/{job_id}             Job status, per product
+    GET  /jobs/{job_id}/reviews     Reviews of a job as NDJSON, streamed while it runs
+    GET  /products/{pid}/reviews    Reviews of one product, from the cache when fresh
+    GET  /scrape                    Scrape one product URL and return all its reviews
+    GET  /metrics                   Scraper metrics in the Prometheus text format
+
+Every product is crawled by a fixed number of workers sharing one
+FlipkartReviewScraper (one connection pool, rate limit and identity pool).
+Requests for a product that is already being crawled, or was crawled less
+than API_CACHE_TTL seconds ago, share that crawl instead of starting another.
+
+Usage:
+    python api/app.py
+    gunicorn -k uvicorn.workers.UvicornWorker -w 1 -b 0.0.0.0:8000 api.app:app
+
+Each server process keeps its own cache and workers, so run a single process
+per container and scale with API_WORKERS instead.
+"""
+
+import asyncio
+import os
+import sys
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from fastapi import FastAPI, HTTPException, Query
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, Field
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import json_backend  # noqa: E402
+from flipkart_scraper_apify import DEFAULT_PAGE_CONCURRENCY, FlipkartReviewScraper, canonical_review_url  # noqa: E402
+from metrics import metrics  # noqa: E402
+from proxy_pool import ProxyPool, proxy_urls_from_env  # noqa: E402
+from rate_controller import DEFAULT_MAX_RATE, AdaptiveRateController  # noqa: E402
+
+API_WORKERS = int(os.getenv('API_WORKERS', '4'))  # products crawled at the same time
+API_MAX_QUEUE = int(os.getenv('API_MAX_QUEUE', '200'))  # products waiting for a worker
+API_CACHE_TTL = float(os.getenv('API_CACHE_TTL', '3600'))  # seconds a finished crawl is served from
+API_MAX_CACHED = int(os.getenv('API_MAX_CACHED', '500'))  # crawls kept, least recently used evicted
+API_MAX_JOBS = int(os.getenv('API_MAX_JOBS', '1000'))  # jobs kept for status and review requests
+API_MAX_URLS_PER_JOB = 100
+PAGE_CONCURRENCY = int(os.getenv('PAGE_CONCURRENCY', str(DEFAULT_PAGE_CONCURRENCY)))
+MAX_REQUEST_RATE = float(os.getenv('MAX_REQUEST_RATE', str(DEFAULT_MAX_RATE)))
+PARSE_WORKERS = int(os.getenv('PARSE_WORKERS', '0'))
+
+
+class Crawl:
+    """
+    One crawl of a product's reviews, shared by every request for it.
+
+    Reviews are appended page by page, so readers can follow a running crawl.
+    """
+
+    def __init__(self, review_url: str, pid: Optional[str], max_reviews: Optional[int]):
+        self.review_url = review_url
+        self.pid = pid
+        self.max_reviews = max_reviews
+        self.reviews: List[Dict[str, Any]] = []
+        self.status = 'queued'  # queued -> running -> done | failed
+        self.error: Optional[str] = None
+        self.finished_at: Optional[float] = None
+        self._changed = asyncio.Event()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ('done', 'failed')
+
+    def covers(self, max_reviews: Optional[int]) -> bool:
+        """Whether this crawl fetches at least the reviews a request for max_reviews needs."""
+        if self.max_reviews is None:
+            return True
+        return max_reviews is not None and max_reviews <= self.max_reviews
+
+    def fresh(self, now: float) -> bool:
+        """Whether the crawl is running or finished successfully less than API_CACHE_TTL ago."""
+        if self.status == 'failed':
+            return False
+        return self.finished_at is None or now - self.finished_at < API_CACHE_TTL
+
+    def notify(self):
+        """Wake every reader waiting for new reviews or the end of the crawl."""
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    def finish(self, error: Optional[str] = None):
+        self.status = 'failed' if error else 'done'
+        self.error = error
+        self.finished_at = time.monotonic()
+        self.notify()
+
+    async def follow(self, max_reviews: Optional[int] = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Yield the crawl's reviews, waiting for new pages until the crawl finishes.
+
+        Args:
+            max_reviews: Stop after this many reviews. If None, yields all of them.
+
+        Raises:
+            RuntimeError: If the crawl failed
+        """
+        limit = max_reviews if max_reviews is not None else float('inf')
+        sent = 0
+        while sent < limit:
+            changed = self._changed
+            while sent < len(self.reviews) and sent < limit:
+                yield self.reviews[sent]
+                sent += 1
+            if sent >= limit or (self.finished and sent >= len(self.reviews)):
+                break
+            await changed.wait()
+        if self.status == 'failed' and sent < limit:
+            raise RuntimeError(self.error)
+
+    def summary(self) -> Dict[str, Any]:
+        return {'product_id': self.pid, 'review_url': self.review_url, 'status': self.status,
+                'reviews': len(self.reviews), 'error': self.error}
+
+
+class Job:
+    """A batch of product URLs submitted through POST /jobs."""
+
+    def __init__(self, urls: List[str], max_reviews: Optional[int]):
+        self.id = uuid.uuid4().hex
+        self.urls = urls
+        self.max_reviews = max_reviews
+        self.crawls: List[Optional[Crawl]] = []
+        self.errors: Dict[int, str] = {}  # URL position -> why it was not crawled
+        self.created_at = time.time()
+
+    @property
+    def finished(self) -> bool:
+        return all(crawl is None or crawl.finished for crawl in self.crawls)
+
+    @property
+    def status(self) -> str:
+        if self.finished:
+            return 'done'
+        if all(crawl is None or crawl.status == 'queued' for crawl in self.crawls):
+            return 'queued'
+        return 'running'
+
+    def to_dict(self) -> Dict[str, Any]:
+        products = []
+        for index, (url, crawl) in enumerate(zip(self.urls, self.crawls)):
+            if crawl is None:
+                products.append({'flipkart_url': url, 'status': 'failed', 'error': self.errors[index]})
+                continue
+            summary = crawl.summary()
+            if self.max_reviews is not None:
+                summary['reviews'] = min(summary['reviews'], self.max_reviews)
+            products.append({'flipkart_url': url, **summary})
+        return {'job_id': self.id, 'status': self.status, 'max_reviews': self.max_reviews, 'products': products}
+
+
+class QueueFullError(Exception):
+    """Raised when no more products can be queued."""
+
+
+class ReviewService:
+    """
+    Bounded pool of crawl workers with a TTL cache of crawls.
+
+    Usage:
+        service = ReviewService()
+        await service.start()
+        crawl = service.crawl(url, max_reviews=50)
+        async for review in crawl.follow(50):
+            ...
+        await service.stop()
+    """
+
+    def __init__(self, workers: int = API_WORKERS, max_queue: int = API_MAX_QUEUE,
+                 max_cached: int = API_MAX_CACHED, max_jobs: int = API_MAX_JOBS):
+        self.workers = max(1, workers)
+        self.queue: asyncio.Queue = asyncio.Queue(max_queue)
+        self.max_cached = max_cached
+        self.max_jobs = max_jobs
+        self.crawls: 'OrderedDict[str, Crawl]' = OrderedDict()  # by review URL, least recently used first
+        self.product_urls: Dict[str, str] = {}  # product id -> last product URL requested for it
+        self.jobs: 'OrderedDict[str, Job]' = OrderedDict()
+        self.coalesced = 0
+        self.scraper: Optional[FlipkartReviewScraper] = None
+        self._tasks: List[asyncio.Task] = []
+
+    async def start(self):
+        self.scraper = FlipkartReviewScraper(
+            pool_size=self.workers * PAGE_CONCURRENCY,
+            page_concurrency=PAGE_CONCURRENCY,
+            rate_controller=AdaptiveRateController(max_rate=MAX_REQUEST_RATE),
+            proxy_pool=ProxyPool(
+                proxy_urls_from_env(),
+                rate_controller_factory=lambda: AdaptiveRateController(max_rate=MAX_REQUEST_RATE)
+            ),
+            parse_workers=PARSE_WORKERS,
+        )
+        self.scraper.open()
+        self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        if self.scraper is not None:
+            await self.scraper.close()
+
+    def crawl(self, product_url: str, max_reviews: Optional[int] = None) -> Crawl:
+        """
+        The crawl serving product_url, reusing a running or fresh one when it covers max_reviews.
+
+        Raises:
+            ValueError: If product_url is not a Flipkart product URL
+            QueueFullError: If a new crawl is needed and the queue is full
+        """
+        review_url, pid, _ = canonical_review_url(product_url)
+        if not review_url:
+            raise ValueError(f"Not a Flipkart product URL: {product_url}")
+        # Variant listings share one review path (and crawl); each pid remembers its own URL
+        if pid:
+            self.product_urls[pid] = product_url
+
+        crawl = self.crawls.get(review_url)
+        if crawl is not None and crawl.fresh(time.monotonic()) and crawl.covers(max_reviews):
+            self.crawls.move_to_end(review_url)
+            self.coalesced += 1
+            metrics.inc('api_crawls_total', result='coalesced' if not crawl.finished else 'cached')
+            return crawl
+
+        crawl = Crawl(review_url, pid, max_reviews)
+        try:
+            self.queue.put_nowait(crawl)
+        except asyncio.QueueFull:
+            raise QueueFullError(f"{self.queue.qsize()} products are already waiting") from None
+        metrics.inc('api_crawls_total', result='queued')
+        self.crawls[review_url] = crawl
+        self.crawls.move_to_end(review_url)
+        self._evict()
+        return crawl
+
+    def _evict(self):
+        """Drop the least recently used finished crawls beyond max_cached."""
+        for review_url in list(self.crawls):
+            if len(self.crawls) <= self.max_cached:
+                break
+            if self.crawls[review_url].finished:
+                del self.crawls[review_url]
+
+    def product_url_for(self, pid: str) -> Optional[str]:
+        return self.product_urls.get(pid)
+
+    def submit(self, urls: List[str], max_reviews: Optional[int]) -> Job:
+        """
+        Queue a job for a batch of product URLs. Invalid URLs are reported in the job.
+
+        Raises:
+            QueueFullError: If the queue cannot take the job's products
+        """
+        # A maxsize of 0 (API_MAX_QUEUE=0) is an unbounded queue
+        if self.queue.maxsize and self.queue.maxsize - self.queue.qsize() < len(urls):
+            raise QueueFullError(f"{self.queue.qsize()} products are already waiting")
+        job = Job(urls, max_reviews)
+        for index, url in enumerate(urls):
+            try:
+                job.crawls.append(self.crawl(url, max_reviews))
+            except ValueError as e:
+                job.crawls.append(None)
+                job.errors[index] = str(e)
+        self.jobs[job.id] = job
+        while len(self.jobs) > self.max_jobs:
+            self.jobs.popitem(last=False)
+        return job
+
+    async def _work(self):
+        while True:
+            crawl = await self.queue.get()
+            try:
+                await self._run(crawl)
+            finally:
+                self.queue.task_done()
+
+    async def _run(self, crawl: Crawl):
+        crawl.status = 'running'
+        started = time.monotonic()
+        failed_pages = []
+        try:
+            async for review in self.scraper.iter_product_reviews(
+                crawl.review_url, crawl.max_reviews, review_url=crawl.review_url,
+                on_page=lambda page, collected: crawl.notify(),
+                on_page_failed=lambda page, outcome: failed_pages.append((page, outcome)),
+            ):
+                crawl.reviews.append(review.to_dict())
+            if not crawl.reviews and failed_pages:
+                # Every page was blocked or failed; don't cache that as a product without reviews
+                raise RuntimeError(f'No review page could be fetched: {failed_pages}')
+        except asyncio.CancelledError:
+            crawl.finish('server shutting down')
+            raise
+        except Exception as e:
+            print(f"Error crawling {crawl.review_url}: {e}")
+            metrics.inc('api_crawl_errors_total')
+            crawl.finish(str(e))
+        else:
+            crawl.finish()
+        metrics.observe('api_crawl_seconds', time.monotonic() - started)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'workers': self.workers,
+            'queued': self.queue.qsize(),
+            'running': sum(crawl.status == 'running' for crawl in self.crawls.values()),
+            'cached_products': len(self.crawls),
+            'coalesced_requests': self.coalesced,
+            'jobs': len(self.jobs),
+        }
+
+
+service = ReviewService()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    metrics.enable()
+    await service.start()
+    try:
+        yield
+    finally:
+        await service.stop()
+
+
+app = FastAPI(
+    title='Flipkart Review Scraper API',
+    description='Scrape genuine product reviews from Flipkart',
+    lifespan=lifespan,
+)
+
+
+class JobRequest(BaseModel):
+    flipkart_urls: List[str] = Field(..., min_length=1, max_length=API_MAX_URLS_PER_JOB)
+    max_reviews: Optional[int] = Field(None, ge=1, description='Reviews per product; all if omitted')
+
+
+def _queue_full(e: QueueFullError) -> HTTPException:
+    return HTTPException(status_code=503, detail=f'Too many queued products ({e}), retry later',
+                         headers={'Retry-After': '30'})
+
+
+def _ndjson(item: Dict[str, Any]) -> bytes:
+    return json_backend.dumps(item) + b'\n'
+
+
+@app.post('/jobs', status_code=202)
+async def create_job(request: JobRequest):
+    """Queue product URLs for scraping."""
+    try:
+        job = service.submit(request.flipkart_urls, request.max_reviews)
+    except QueueFullError as e:
+        raise _queue_full(e)
+    return job.to_dict()
+
+
+def _get_job(job_id: str) -> Job:
+    job = service.jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f'Unknown job: {job_id}')
+    return job
+
+
+@app.get('/jobs/{job_id}')
+async def get_job(job_id: str):
+    """Status of a job and of each of its products."""
+    return _get_job(job_id).to_dict()
+
+
+@app.get('/jobs/{job_id}/reviews')
+async def stream_job_reviews(job_id: str):
+    """
+    Reviews of every product of a job as NDJSON, one review per line, in input order.
+
+    Lines are sent as pages are scraped. A product that fails adds an
+    {"flipkart_url": ..., "error": ...} line instead of (the rest of) its reviews.
+    """
+    job = _get_job(job_id)
+
+    async def lines() -> AsyncIterator[bytes]:
+        for index, (url, crawl) in enumerate(zip(job.urls, job.crawls), 1):
+            if crawl is None:
+                yield _ndjson({'flipkart_url': url, 'url_index': index, 'error': job.errors[index - 1]})
+                continue
+            pid = canonical_review_url(url)[1] or crawl.pid
+            try:
+                async for review in crawl.follow(job.max_reviews):
+                    yield _ndjson({**review, 'flipkart_url': url, 'product_id': pid, 'url_index': index})
+            except RuntimeError as e:
+                yield _ndjson({'flipkart_url': url, 'url_index': index, 'error': str(e)})
+
+    return StreamingResponse(lines(), media_type='application/x-ndjson')
+
+
+@app.get('/products/{pid}/reviews')
+async def get_product_reviews(
+    pid: str,
+    flipkart_url: Optional[str] = Query(None, description='Product URL, needed the first time a product is requested'),
+    max_reviews: Optional[int] = Query(None, ge=1, description='Maximum number of reviews; all if omitted'),
+):
+    """
+    Reviews of a product, served from the cache while fresh; otherwise the product is scraped.
+
+    Product IDs alone do not identify a review page, so products never requested
+    before need flipkart_url.
+    """
+    url = flipkart_url or service.product_url_for(pid)
+    if url is None:
+        raise HTTPException(status_code=404, detail=f'Unknown product {pid}: pass flipkart_url to scrape it')
+    return await _collect(url, max_reviews, pid)
+
+
+@app.get('/scrape')
+async def scrape(
+    flipkart_url: str = Query(..., description='Flipkart product URL (must contain /p/)'),
+    max_reviews: Optional[int] = Query(None, ge=1, description='Maximum number of reviews; all if omitted'),
+):
+    """Scrape the reviews of one product URL."""
+    return await _collect(flipkart_url, max_reviews)
+
+
+async def _collect(url: str, max_reviews: Optional[int], pid: Optional[str] = None) -> Dict[str, Any]:
+    try:
+        crawl = service.crawl(url, max_reviews)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except QueueFullError as e:
+        raise _queue_full(e)
+    # A variant listing is served by the crawl of the review path it shares; report the pid asked for
+    pid = pid or canonical_review_url(url)[1] or crawl.pid
+
+    try:
+        reviews = [review async for review in crawl.follow(max_reviews)]
+    except RuntimeError as e:
+        raise HTTPException(status_code=502, detail=f'Scraping failed: {e}')
+    return {
+        'flipkart_url': url,
+        'product_id': pid,
+        'total_reviews': len(reviews),
+        'success': True,
+        'reviews': reviews,
+    }
+
+
+@app.get('/health')
+async def health():
+    return {'status': 'ok', **service.stats()}
+
+
+@app.get('/metrics', response_class=PlainTextResponse)
+async def get_metrics():
+    return PlainTextResponse(metrics.to_prometheus(), media_type='text/plain; version=0.0.4')
+
+
+if __name__ == '__main__':
+    import uvicorn
+
+    uvicorn.run(app, host=os.getenv('HOST', '0.0.0.0'), port=int(os.getenv('PORT', '8000')))
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for review lookup in a parsed __INITIAL_STATE__
+
+Compares the previous recursive walk over the whole tree with
+extract_reviews_from_json, which goes straight to the known review paths.
+
+Usage:
+    python benchmarks/bench_extract_reviews.py                 # synthetic pages
+    python benchmarks/bench_extract_reviews.py page1.html ...  # captured pages
+"""
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flipkart_scraper_apify import (  # noqa: E402
+    extract_json_from_html,
+    extract_review_details,
+    extract_reviews_from_json,
+)
+from sample_pages import SAMPLE_PAGES, build_state  # noqa: E402
+
+
+def extract_reviews_legacy(data):
+    """The recursive full-tree walk this benchmark measures against."""
+    reviews = []
+
+    def find_reviews_recursive(obj):
+        if isinstance(obj, dict):
+            if 'value' in obj and isinstance(obj['value'], dict):
+                if obj['value'].get('type') == 'ProductReviewValue':
+                    reviews.append(extract_review_details(obj['value'], obj))
+            for value in obj.values():
+                find_reviews_recursive(value)
+        elif isinstance(obj, list):
+            for item in obj:
+                find_reviews_recursive(item)
+
+    find_reviews_recursive(data)
+    return reviews
+
+
+def time_call(func, data, number: int) -> float:
+    """Best-of-5 time per call in milliseconds."""
+    return min(timeit.repeat(lambda: func(data), number=number, repeat=5)) / number * 1000
+
+
+def load_states(paths):
+    if not paths:
+        return {name: extract_json_from_html(build()) for name, build in SAMPLE_PAGES.items()}
+    states = {}
+    for path in paths:
+        with open(path, encoding='utf-8') as f:
+            states[os.path.basename(path)] = extract_json_from_html(f.read())
+    return states
+
+
+def main():
+    states = load_states(sys.argv[1:])
+
+    # Review widget moved out of pageDataV4 to exercise the fallback walk
+    moved = build_state(num_reviews=10, filler_items=1000, seed=1)
+    moved['reviewsPage'] = {'widgets': [moved['pageDataV4']['page']['data'].pop('10002')[0]['widget']]}
+    states['moved-layout'] = moved
+
+    print(f"{'page':<24}{'reviews':>9}{'walk ms':>12}{'new ms':>12}{'speedup':>10}")
+    for name, data in states.items():
+        legacy = extract_reviews_legacy(data)
+        same = legacy == extract_reviews_from_json(data)
+        legacy_ms = time_call(extract_reviews_legacy, data, 20)
+        new_ms = time_call(extract_reviews_from_json, data, 20)
+        note = '' if same else '  (results differ)'
+        print(f"{name:<24}{len(legacy):>9}{legacy_ms:>12.3f}{new_ms:>12.3f}{legacy_ms / new_ms:>9.1f}x{note}")
+
+
+if __name__ == '__main__':
+    main()
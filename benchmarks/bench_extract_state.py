@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for __INITIAL_STATE__ extraction
+
+Compares the previous lazy DOTALL regex with extract_json_from_html, which
+goes through extract_page and so also includes review extraction.
+
+Usage:
+    python benchmarks/bench_extract_state.py                 # synthetic pages
+    python benchmarks/bench_extract_state.py page1.html ...  # captured pages
+"""
+
+import json
+import os
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flipkart_scraper_apify import extract_json_from_html  # noqa: E402
+from sample_pages import SAMPLE_PAGES, build_page  # noqa: E402
+
+
+def extract_json_legacy(html_content: str):
+    """The regex-based extractor this benchmark measures against."""
+    match = re.search(r'window\.__INITIAL_STATE__\s*=\s*(\{.*?\});', html_content, re.DOTALL)
+    if not match:
+        raise ValueError("Could not find __INITIAL_STATE__ in HTML")
+    return json.loads(match.group(1))
+
+
+def time_call(func, html: str, number: int) -> float:
+    """Best-of-5 time per call in milliseconds."""
+    return min(timeit.repeat(lambda: func(html), number=number, repeat=5)) / number * 1000
+
+
+def load_pages(paths):
+    if not paths:
+        return {name: build() for name, build in SAMPLE_PAGES.items()}
+    pages = {}
+    for path in paths:
+        with open(path, encoding='utf-8') as f:
+            pages[os.path.basename(path)] = f.read()
+    return pages
+
+
+def main():
+    pages = load_pages(sys.argv[1:])
+
+    print(f"{'page':<24}{'size':>10}{'regex ms':>12}{'new ms':>12}{'speedup':>10}")
+    for name, html in pages.items():
+        number = max(1, 2_000_000 // max(len(html), 1))
+        new_ms = time_call(extract_json_from_html, html, number)
+        try:
+            same = extract_json_legacy(html) == extract_json_from_html(html)
+            legacy_ms = time_call(extract_json_legacy, html, number)
+            legacy_col, speedup_col = f"{legacy_ms:>12.3f}", f"{legacy_ms / new_ms:>9.1f}x"
+        except ValueError:
+            same = False
+            legacy_col, speedup_col = f"{'failed':>12}", f"{'-':>10}"
+        note = '' if same else '  (regex result differs)'
+        print(f"{name:<24}{len(html) / 1024:>8.0f}KB{legacy_col}{new_ms:>12.3f}{speedup_col}{note}")
+
+    # A review containing "};" used to truncate the regex match
+    tricky = build_page(num_reviews=1, filler_items=10).replace('"text": "', '"text": "Worth it };', 1)
+    try:
+        extract_json_legacy(tricky)
+        legacy_ok = 'ok'
+    except ValueError:
+        legacy_ok = 'fails'
+    extract_json_from_html(tricky)
+    print(f"\nReview text containing '}};': regex {legacy_ok}, new extractor ok")
+
+
+if __name__ == '__main__':
+    main()
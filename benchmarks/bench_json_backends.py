@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the JSON backends in json_backend
+
+Times page decoding plus review extraction with every installed backend,
+the typed msgspec decoder, and encoding of the extracted reviews.
+
+Usage:
+    python benchmarks/bench_json_backends.py                 # synthetic pages
+    python benchmarks/bench_json_backends.py page1.html ...  # captured pages
+"""
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import json_backend  # noqa: E402
+from flipkart_scraper_apify import (  # noqa: E402
+    extract_json_from_html,
+    extract_reviews_from_html,
+    extract_reviews_from_json,
+)
+from sample_pages import SAMPLE_PAGES  # noqa: E402
+
+
+def time_call(func, number: int) -> float:
+    """Best-of-5 time per call in milliseconds."""
+    return min(timeit.repeat(func, number=number, repeat=5)) / number * 1000
+
+
+def load_pages(paths):
+    if not paths:
+        return {name: build() for name, build in SAMPLE_PAGES.items()}
+    pages = {}
+    for path in paths:
+        with open(path, encoding='utf-8') as f:
+            pages[os.path.basename(path)] = f.read()
+    return pages
+
+
+def main():
+    pages = load_pages(sys.argv[1:])
+    backends = json_backend.available_backends()
+    print(f"Installed backends: {', '.join(backends)}\n")
+
+    print(f"{'page':<16}{'size':>9}" + ''.join(f"{name + ' ms':>14}" for name in backends) + f"{'typed ms':>12}")
+    for name, html in pages.items():
+        number = max(1, 2_000_000 // max(len(html), 1))
+        expected = None
+        row = f"{name:<16}{len(html) / 1024:>7.0f}KB"
+        for backend in backends:
+            json_backend.set_backend(backend)
+            reviews = extract_reviews_from_json(extract_json_from_html(html))
+            expected = reviews if expected is None else expected
+            assert reviews == expected, f"{backend} returned different reviews"
+            row += f"{time_call(lambda: extract_reviews_from_json(extract_json_from_html(html)), number):>14.3f}"
+
+        # extract_reviews_from_html takes the typed path when msgspec is installed
+        if 'msgspec' in backends:
+            assert extract_reviews_from_html(html) == expected, "typed decoder returned different reviews"
+            row += f"{time_call(lambda: extract_reviews_from_html(html), number):>12.3f}"
+        else:
+            row += f"{'-':>12}"
+        print(row)
+
+    # Reviews are encoded in the dict form pushed to the dataset
+    first_page = pages[next(iter(pages))]
+    reviews = [review.to_dict() for review in extract_reviews_from_json(extract_json_from_html(first_page))] * 100
+    print(f"\nEncoding {len(reviews)} reviews:")
+    for backend in backends:
+        json_backend.set_backend(backend)
+        print(f"  {backend:<10}{time_call(lambda: [json_backend.dumps(review) for review in reviews], 5):>10.3f} ms")
+
+    json_backend.set_backend()
+
+
+if __name__ == '__main__':
+    main()
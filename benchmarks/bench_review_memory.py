@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Memory benchmark for Review records
+
+Measures the memory held per review by the previous plain-dict layout and by
+the Review record (and its to_dict() output for comparison).
+
+Usage:
+    python benchmarks/bench_review_memory.py [num_reviews]
+"""
+
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flipkart_scraper_apify import extract_json_from_html, find_review_components, extract_review_details  # noqa: E402
+from sample_pages import build_page  # noqa: E402
+
+
+def measure(build, count: int) -> float:
+    """Bytes allocated per item while `count` items are alive."""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    items = [build(i) for i in range(count)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del items
+    return (after - before) / count
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    components = find_review_components(extract_json_from_html(build_page(num_reviews=10)))
+
+    def as_record(i):
+        review = extract_review_details(components[i % 10]['value'], components[i % 10])
+        review.flipkart_url, review.product_id, review.url_index = 'https://www.flipkart.com/x/p/itm1', 'PID', 1
+        return review
+
+    def as_dict(i):
+        return as_record(i).to_dict()
+
+    dict_bytes = measure(as_dict, count)
+    record_bytes = measure(as_record, count)
+    print(f"{count} reviews held in memory")
+    print(f"  dict per review:   {dict_bytes:>8.0f} bytes")
+    print(f"  Review per review: {record_bytes:>8.0f} bytes  ({(1 - record_bytes / dict_bytes) * 100:.0f}% less)")
+
+
+if __name__ == '__main__':
+    main()
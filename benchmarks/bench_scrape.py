@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark suite: parsing per page and end-to-end scraping against the stub server
+
+The parse stage times extract_page (the scraper's only HTML parsing path)
+and, on its decoded state, extract_reviews_from_json on every page of the
+fixture corpus. The scrape
+stage starts benchmarks/stub_server.py in a subprocess and scrapes products
+from it through scrape_product_reviews_async - the coroutine behind
+scrape_product_reviews_wrapper - with a shared scraper whose rate limit is
+lifted to --max-rate, so the numbers measure the scraper, not the pacing.
+--parse-workers moves page parsing into that many worker processes.
+
+Reports pages/sec, reviews/sec, parse time per page and peak RSS. Use
+--json to save the results and compare them between commits.
+
+Usage:
+    python benchmarks/bench_scrape.py
+    python benchmarks/bench_scrape.py --products 8 --pages 30 --latency 0.05 --error-rate 0.02
+    python benchmarks/bench_scrape.py --only scrape --parse-workers 3 --filler-items 6000
+    python benchmarks/bench_scrape.py --only parse --json results.json
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+import timeit
+import urllib.request
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+import flipkart_scraper_apify  # noqa: E402
+from flipkart_scraper_apify import (  # noqa: E402
+    FlipkartReviewScraper,
+    extract_page,
+    extract_reviews_from_json,
+    scrape_product_reviews_async,
+)
+from fixtures import load_corpus  # noqa: E402
+from rate_controller import AdaptiveRateController  # noqa: E402
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process so far (Linux reports KiB)."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 if sys.platform != 'darwin' else peak / (1024 * 1024)
+
+
+def time_call(func, arg, number: int) -> float:
+    """Best-of-5 time per call in milliseconds."""
+    return min(timeit.repeat(lambda: func(arg), number=number, repeat=5)) / number * 1000
+
+
+def bench_parse(number: int) -> dict:
+    results = {}
+    print(f"{'page':<32}{'KB':>8}{'reviews':>9}{'walk ms':>10}{'html ms':>10}")
+    for name, html in load_corpus().items():
+        try:
+            state_json, reviews, _ = extract_page(html)
+        except ValueError:
+            # Blocked pages have no state; only the failed lookup can be timed
+            def lookup_fails(page):
+                try:
+                    extract_page(page)
+                except ValueError:
+                    pass
+            html_ms = time_call(lookup_fails, html, number)
+            print(f"{name:<32}{len(html) / 1024:>8.0f}{'-':>9}{'-':>10}{html_ms:>10.3f}  (no state)")
+            results[name] = {'bytes': len(html), 'reviews': 0, 'html_ms': html_ms}
+            continue
+
+        data = json.loads(state_json)
+        walk_ms = time_call(extract_reviews_from_json, data, number)
+        html_ms = time_call(extract_page, html, number)
+        print(f"{name:<32}{len(html) / 1024:>8.0f}{len(reviews):>9}{walk_ms:>10.3f}{html_ms:>10.3f}")
+        results[name] = {'bytes': len(html), 'reviews': len(reviews), 'walk_ms': walk_ms, 'html_ms': html_ms}
+    print(f"Peak RSS: {peak_rss_mb():.1f} MB")
+    return results
+
+
+@contextlib.contextmanager
+def stub_server(args):
+    command = [
+        sys.executable, os.path.join(BENCH_DIR, 'stub_server.py'),
+        '--pages', str(args.pages), '--reviews-per-page', str(args.reviews_per_page),
+        '--filler-items', str(args.filler_items), '--latency', str(args.latency),
+        '--jitter', str(args.jitter), '--error-rate', str(args.error_rate),
+        '--blocked-rate', str(args.blocked_rate),
+    ]
+    if args.recorded:
+        command.append('--recorded')
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    try:
+        base_url = process.stdout.readline().strip().rsplit(' ', 1)[-1]
+        if not base_url.startswith('http'):
+            raise RuntimeError('stub server did not start')
+        yield base_url
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def stub_stats(base_url: str) -> dict:
+    with urllib.request.urlopen(f'{base_url}/__stats') as response:
+        return json.loads(response.read())
+
+
+async def scrape_products(base_url: str, args) -> int:
+    # Identities are bootstrapped from the stub instead of flipkart.com
+    flipkart_scraper_apify.FLIPKART_HOME_URL = f'{base_url}/'
+    controller = AdaptiveRateController(initial_rate=args.max_rate, max_rate=args.max_rate,
+                                        burst=args.concurrency * args.products)
+    async with FlipkartReviewScraper(pool_size=args.concurrency * args.products,
+                                     page_concurrency=args.concurrency, rate_controller=controller,
+                                     parse_workers=args.parse_workers) as scraper:
+        results = await asyncio.gather(*(
+            scrape_product_reviews_async(f'{base_url}/bench-product-{i}/p/itm{i:04d}?pid=BENCH{i:04d}',
+                                         None, args.concurrency, scraper)
+            for i in range(args.products)
+        ))
+    return sum(count for _, count, _ in results)
+
+
+def bench_scrape(args) -> dict:
+    with stub_server(args) as base_url:
+        output = io.StringIO()
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(output if not args.verbose else sys.stdout):
+            reviews = asyncio.run(scrape_products(base_url, args))
+        elapsed = time.perf_counter() - started
+        served = stub_stats(base_url)
+
+    pages = served['pages'] + served['empty']
+    results = {
+        'products': args.products,
+        'seconds': elapsed,
+        'requests': served['requests'],
+        'pages': pages,
+        'reviews': reviews,
+        'pages_per_sec': pages / elapsed,
+        'reviews_per_sec': reviews / elapsed,
+        'throttled': served['throttled'],
+        'blocked': served['blocked'],
+        'peak_rss_mb': peak_rss_mb(),
+    }
+    print(f"Scraped {args.products} product(s) from the stub server in {elapsed:.2f}s")
+    print(f"  {served['requests']} requests: {served['pages']} review pages, {served['empty']} empty, "
+          f"{served['throttled']} throttled, {served['blocked']} blocked, {served['bootstrap']} bootstrap")
+    print(f"  {results['pages_per_sec']:.1f} pages/s, {results['reviews_per_sec']:.1f} reviews/s")
+    print(f"  Peak RSS: {results['peak_rss_mb']:.1f} MB")
+    return results
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='Offline scraper benchmarks')
+    parser.add_argument('--only', choices=('parse', 'scrape'), help='Run a single stage')
+    parser.add_argument('--number', type=int, default=20, help='Calls per timing in the parse stage')
+    parser.add_argument('--products', type=int, default=4)
+    parser.add_argument('--pages', type=int, default=20, help='Review pages per product')
+    parser.add_argument('--reviews-per-page', type=int, default=10)
+    parser.add_argument('--filler-items', type=int, default=400)
+    parser.add_argument('--concurrency', type=int, default=4, help='Pages fetched at once per product')
+    parser.add_argument('--parse-workers', type=int, default=0, help='Parser processes (0: parse in-process)')
+    parser.add_argument('--max-rate', type=float, default=1000.0, help='Request rate limit (req/s)')
+    parser.add_argument('--latency', type=float, default=0.02)
+    parser.add_argument('--jitter', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--blocked-rate', type=float, default=0.0)
+    parser.add_argument('--recorded', action='store_true', help='Serve the recorded fixtures')
+    parser.add_argument('--verbose', action='store_true', help="Show the scraper's own output")
+    parser.add_argument('--json', help='Write the results to this file')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    results = {}
+    if args.only != 'scrape':
+        print('== Parse stage ==')
+        results['parse'] = bench_parse(args.number)
+    if args.only != 'parse':
+        print('\n== Scrape stage ==')
+        results['scrape'] = bench_scrape(args)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Benchmark corpus - recorded Flipkart review pages plus synthetic stand-ins
+
+Recorded pages live in benchmarks/fixtures/ as .html or .html.gz files and
+are picked up automatically. Without recordings, the corpus falls back to
+synthetic small, large, empty and blocked pages from sample_pages, so the
+benchmarks always run offline.
+
+Usage:
+    python benchmarks/fixtures.py list
+    python benchmarks/fixtures.py record <flipkart product url> [pages]
+"""
+
+import gzip
+import os
+import sys
+from typing import Dict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sample_pages import build_empty_page, build_page  # noqa: E402
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+# What Flipkart serves instead of a review page when it blocks a client
+BLOCKED_PAGE = (
+    '<html><head><title>Flipkart</title></head><body>'
+    '<div class="captcha-container"><h1>Are you a human?</h1>'
+    '<p>Please verify to continue shopping.</p><form action="/captcha"></form></div>'
+    '</body></html>'
+)
+
+
+def build_blocked_page() -> str:
+    """A block/captcha page: HTTP 200, but no __INITIAL_STATE__."""
+    return BLOCKED_PAGE
+
+
+def read_fixture(path: str) -> str:
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rt', encoding='utf-8') as f:
+        return f.read()
+
+
+def recorded_pages(directory: str = FIXTURES_DIR) -> Dict[str, str]:
+    """Recorded pages by file name, in name order."""
+    if not os.path.isdir(directory):
+        return {}
+    return {
+        name: read_fixture(os.path.join(directory, name))
+        for name in sorted(os.listdir(directory))
+        if name.endswith(('.html', '.html.gz'))
+    }
+
+
+def load_corpus(directory: str = FIXTURES_DIR) -> Dict[str, str]:
+    """
+    Every page the benchmarks run against.
+
+    Returns:
+        Page HTML by name: 'small', 'large', 'empty' and 'blocked' synthetic
+        pages, followed by any recorded pages as 'recorded/<file name>'
+    """
+    corpus = {
+        'small': build_page(num_reviews=10, filler_items=100),
+        'large': build_page(num_reviews=10, filler_items=6000),
+        'empty': build_empty_page(),
+        'blocked': build_blocked_page(),
+    }
+    for name, html in recorded_pages(directory).items():
+        corpus[f'recorded/{name}'] = html
+    return corpus
+
+
+def record(product_url: str, pages: int = 3, directory: str = FIXTURES_DIR):
+    """
+    Fetch review pages of a live product and store them gzip-compressed as fixtures.
+
+    Args:
+        product_url: Flipkart product URL
+        pages: Number of review pages to record, starting at page 1
+        directory: Where to write the fixtures
+    """
+    from curl_cffi import requests
+
+    from flipkart_scraper_apify import canonical_review_url, cookies, headers
+
+    review_url, pid, _ = canonical_review_url(product_url)
+    if not review_url:
+        raise ValueError(f"Not a Flipkart product URL: {product_url}")
+
+    os.makedirs(directory, exist_ok=True)
+    session = requests.Session()
+    for page in range(1, pages + 1):
+        response = session.get(review_url, params={'page': str(page)}, cookies=cookies, headers=headers)
+        path = os.path.join(directory, f'{pid or "product"}-page{page}-{response.status_code}.html.gz')
+        with gzip.open(path, 'wt', encoding='utf-8') as f:
+            f.write(response.text)
+        print(f"Recorded page {page} (HTTP {response.status_code}, {len(response.text)} bytes) -> {path}")
+
+
+def main():
+    command = sys.argv[1] if len(sys.argv) > 1 else 'list'
+    if command == 'record' and len(sys.argv) > 2:
+        record(sys.argv[2], int(sys.argv[3]) if len(sys.argv) > 3 else 3)
+    elif command == 'list':
+        for name, html in load_corpus().items():
+            print(f"{name:<40}{len(html):>12} bytes")
+    else:
+        print(__doc__)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
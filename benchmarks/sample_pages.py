@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Synthetic Flipkart review pages for benchmarks
+
+Builds HTML that mirrors the layout of a real product-reviews page: a large
+`window.__INITIAL_STATE__` blob with navigation, SEO and product metadata
+around the `pageDataV4.page.data` slots that hold the review widgets. Pass
+captured pages to the benchmark scripts to measure against real traffic.
+"""
+
+import json
+import random
+from typing import Any, Dict, List
+
+
+def build_review_value(review_id: str, rng: random.Random) -> Dict[str, Any]:
+    """Build one ProductReviewValue the way Flipkart renders it."""
+    words = ['good', 'camera', 'battery', 'value', 'money', 'quality', 'screen', 'fast', 'delivery', 'nice']
+    return {
+        'type': 'ProductReviewValue',
+        'id': review_id,
+        'author': f'Customer {rng.randint(1, 10**6)}',
+        'certifiedBuyer': rng.random() < 0.8,
+        'created': f'{rng.randint(1, 28)} Mar, 2025',
+        'rating': rng.randint(1, 5),
+        'title': ' '.join(rng.choice(words) for _ in range(3)).title(),
+        'text': ' '.join(rng.choice(words) for _ in range(rng.randint(10, 120))),
+        'helpfulCount': rng.randint(0, 500),
+        'location': {'type': 'LocationInfo', 'city': 'Mumbai', 'state': 'Maharashtra'},
+        'productAttributeList': [
+            {'name': 'Color', 'value': rng.choice(['Black', 'Blue', 'Silver'])},
+            {'name': 'Storage', 'value': rng.choice(['128 GB', '256 GB'])},
+        ],
+        'images': [
+            {'value': {'imageURL': f'https://rukminim1.flixcart.com/blobio/{{@width}}/{{@height}}/{review_id}-{i}.jpg?q={{@quality}}'}}
+            for i in range(rng.randint(0, 2))
+        ],
+        'upvote': {'value': {'count': rng.randint(0, 300)}},
+        'downvote': {'value': {'count': rng.randint(0, 40)}},
+        'reviewPropertyMap': {'VERIFIED_PURCHASE': True},
+    }
+
+
+def build_state(num_reviews: int = 10, filler_items: int = 400, seed: int = 0,
+                total_pages: int = 50) -> Dict[str, Any]:
+    """
+    Build an __INITIAL_STATE__ dictionary.
+
+    Args:
+        num_reviews: Number of ProductReviewValue components on the page
+        filler_items: Size of the non-review sections (navigation, SEO, ads)
+        seed: Random seed so repeated runs produce identical pages
+        total_pages: Page count reported by the pagination widget
+
+    Returns:
+        State dictionary
+    """
+    rng = random.Random(seed)
+    components: List[Dict[str, Any]] = [
+        {
+            'value': build_review_value(f'rev-{seed}-{i}', rng),
+            'tracking': {'position': str(i + 1), 'reviewLanguage': 'en'},
+        }
+        for i in range(num_reviews)
+    ]
+
+    slots = {
+        '10001': [{'slotType': 'WIDGET', 'widget': {'type': 'PRODUCT_SUMMARY', 'data': {
+            'product': {'title': 'Sample Product', 'rating': {
+                'average': 4.3, 'count': num_reviews * 50, 'reviewCount': num_reviews * 20,
+                'ratingBreakup': [num_reviews * 25, num_reviews * 12, num_reviews * 6, num_reviews * 3,
+                                  num_reviews * 4]}}}}}],
+        '10002': [{'slotType': 'WIDGET', 'widget': {'type': 'REVIEWS', 'data': {
+            'renderableComponents': components}}}],
+        '10003': [{'slotType': 'WIDGET', 'widget': {'type': 'PAGINATION_BAR', 'data': {
+            'currentPage': 1, 'totalPages': total_pages}}}],
+    }
+
+    return {
+        'navigation': {'menu': [{'id': i, 'label': f'Category {i}', 'url': f'/category-{i}', 'children': [
+            {'id': j, 'label': f'Sub {j}'} for j in range(5)]} for i in range(filler_items // 5)]},
+        'seo': {'breadcrumbs': [f'crumb-{i}' for i in range(filler_items)], 'meta': 'x' * filler_items * 10},
+        'ads': [{'slot': i, 'payload': {'value': {'type': 'AdValue', 'id': i}}} for i in range(filler_items)],
+        'pageDataV4': {'page': {'pageData': {'pageContext': {'pageTitle': 'Reviews'}}, 'data': slots}},
+    }
+
+
+def build_page(num_reviews: int = 10, filler_items: int = 400, seed: int = 0, total_pages: int = 50) -> str:
+    """Wrap a synthetic state in review-page HTML."""
+    state = json.dumps(build_state(num_reviews, filler_items, seed, total_pages))
+    head = '<html><head><script>var marker = "window.__INITIAL_STATE__ is set below";</script>'
+    scripts = ''.join(f'<script>var chunk{i} = {{a: {i}}};</script>' for i in range(200))
+    return (
+        f'{head}{scripts}</head><body><div id="container"></div>'
+        f'<script nonce="abc">window.__INITIAL_STATE__ = {state};</script>'
+        f'<script>window.__APP_CONFIG__ = {{"env": "prod"}};</script></body></html>'
+    )
+
+
+def build_empty_page(seed: int = 0) -> str:
+    """A review page whose state contains no review components."""
+    return build_page(num_reviews=0, seed=seed)
+
+
+SAMPLE_PAGES = {
+    'small': lambda: build_page(num_reviews=10, filler_items=100),
+    'large': lambda: build_page(num_reviews=10, filler_items=6000),
+    'empty': build_empty_page,
+}
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for Flipkart's review pages, with configurable latency and errors
+
+Serves any /<slug>/product-reviews/<item id>?page=N URL: pages 1 to --pages
+carry --reviews-per-page reviews each (or the recorded fixtures, in order,
+with --recorded), later pages are empty. A request may instead be answered
+with HTTP 429 (--error-rate) or a captcha page (--blocked-rate). GET / sets
+a session cookie, so identity bootstrapping works against the stub, and
+GET /__stats returns the request counts as JSON.
+
+Usage:
+    python benchmarks/stub_server.py --port 8080 --latency 0.05 --error-rate 0.02
+
+The first line printed is "Listening on http://127.0.0.1:<port>".
+"""
+
+import argparse
+import http.server
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+import zlib
+from functools import lru_cache
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fixtures import build_blocked_page, recorded_pages  # noqa: E402
+from sample_pages import build_empty_page, build_page  # noqa: E402
+
+REVIEW_PATH = re.compile(r'/product-reviews/([^/?]+)')
+
+
+class StubConfig:
+    """Behaviour of the stub server; shared by all handler threads."""
+
+    def __init__(self, pages: int = 20, reviews_per_page: int = 10, filler_items: int = 400,
+                 latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0,
+                 blocked_rate: float = 0.0, recorded: bool = False, seed: int = 0):
+        self.pages = pages
+        self.reviews_per_page = reviews_per_page
+        self.filler_items = filler_items
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.blocked_rate = blocked_rate
+        self.recorded = list(recorded_pages().values()) if recorded else []
+        if self.recorded:
+            self.pages = len(self.recorded)
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.counts = {'requests': 0, 'pages': 0, 'empty': 0, 'throttled': 0, 'blocked': 0, 'bootstrap': 0}
+
+    def count(self, key: str):
+        with self.lock:
+            self.counts['requests'] += 1
+            self.counts[key] += 1
+
+    def roll(self) -> float:
+        with self.lock:
+            return self.rng.random()
+
+
+def make_handler(config: StubConfig):
+    @lru_cache(maxsize=256)
+    def render_page(item_id: str, page: int) -> bytes:
+        if page > config.pages:
+            return build_empty_page().encode('utf-8')
+        if config.recorded:
+            return config.recorded[page - 1].encode('utf-8')
+        seed = (zlib.crc32(item_id.encode('utf-8')) & 0xFFFF) * 10_000 + page
+        return build_page(config.reviews_per_page, config.filler_items, seed, config.pages).encode('utf-8')
+
+    class StubHandler(http.server.BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def send_body(self, status: int, body: bytes, extra_headers=()):
+            self.send_response(status)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            for name, value in extra_headers:
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            parsed = urlparse(self.path)
+            if parsed.path == '/__stats':
+                with config.lock:
+                    body = json.dumps(config.counts).encode('utf-8')
+                self.send_body(200, body)
+                return
+
+            if config.latency or config.jitter:
+                time.sleep(max(0.0, config.latency + random.uniform(-config.jitter, config.jitter)))
+
+            if parsed.path == '/':
+                config.count('bootstrap')
+                self.send_body(200, b'<html>home</html>', [('Set-Cookie', f'T={uuid.uuid4().hex}; Path=/')])
+                return
+
+            match = REVIEW_PATH.search(parsed.path)
+            if not match:
+                self.send_body(404, b'not found')
+                return
+
+            roll = config.roll()
+            if roll < config.error_rate:
+                config.count('throttled')
+                self.send_body(429, b'Too Many Requests')
+                return
+            if roll < config.error_rate + config.blocked_rate:
+                config.count('blocked')
+                self.send_body(200, build_blocked_page().encode('utf-8'))
+                return
+
+            page = int((parse_qs(parsed.query).get('page') or ['1'])[0])
+            config.count('pages' if page <= config.pages else 'empty')
+            self.send_body(200, render_page(match.group(1), page))
+
+        def log_message(self, format, *args):
+            pass
+
+    return StubHandler
+
+
+def start_server(config: StubConfig, port: int = 0) -> http.server.ThreadingHTTPServer:
+    """Start the stub server on a background thread and return it."""
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', port), make_handler(config))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--port', type=int, default=0, help='Port to listen on (default: any free port)')
+    parser.add_argument('--pages', type=int, default=20, help='Review pages per product')
+    parser.add_argument('--reviews-per-page', type=int, default=10)
+    parser.add_argument('--filler-items', type=int, default=400, help='Size of the non-review page state')
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds added to every response')
+    parser.add_argument('--jitter', type=float, default=0.0, help='Random +/- seconds on top of --latency')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Share of requests answered with HTTP 429')
+    parser.add_argument('--blocked-rate', type=float, default=0.0, help='Share of requests answered with a captcha')
+    parser.add_argument('--recorded', action='store_true', help='Serve the recorded fixtures as pages 1..N')
+    parser.add_argument('--seed', type=int, default=0)
+    return parser.parse_args(argv)
+
+
+def main():
+    args = parse_args()
+    config = StubConfig(args.pages, args.reviews_per_page, args.filler_items, args.latency, args.jitter,
+                        args.error_rate, args.blocked_rate, args.recorded, args.seed)
+    server = start_server(config, args.port)
+    print(f"Listening on http://127.0.0.1:{server.server_address[1]}", flush=True)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        print(f"Served: {config.counts}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Crawl checkpoints - lets an interrupted run resume where it stopped
+"""
+
+import asyncio
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+
+from apify import Actor
+from apify_shared.consts import ActorEventTypes
+
+CHECKPOINT_KEY = 'CRAWL_CHECKPOINT'
+
+
+@dataclass
+class ProductProgress:
+    """How far one input URL has been scraped and pushed."""
+    url: str
+    last_page: int = 0  # last page whose reviews have all been pushed
+    page_reviews: int = 0  # reviews taken from pages up to and including last_page
+    pushed: int = 0  # reviews pushed so far, including any from the page after last_page
+    # Only the pages a resumed crawl can see again are tracked: the page after last_page, which
+    # resumes from its start, and last_page itself, in case new reviews pushed its reviews down
+    review_ids: Set[str] = field(default_factory=set)  # pushed from the page after last_page
+    last_page_ids: Set[str] = field(default_factory=set)  # pushed from last_page
+    summary: Optional[Dict[str, Any]] = None  # set once the product's summary has been pushed
+
+    @property
+    def done(self) -> bool:
+        return self.summary is not None
+
+    @property
+    def next_page(self) -> int:
+        return self.last_page + 1
+
+    def is_pushed(self, review_id: Optional[str]) -> bool:
+        """Whether a review was already pushed before the crawl was interrupted."""
+        return review_id is not None and (review_id in self.review_ids or review_id in self.last_page_ids)
+
+    def record_review(self, review_id: Optional[str]):
+        self.pushed += 1
+        if review_id is not None:
+            self.review_ids.add(review_id)
+
+    def complete_page(self, page: int, collected: int):
+        """on_page callback for FlipkartReviewScraper.iter_product_reviews."""
+        self.last_page = page
+        self.page_reviews = collected
+        # Pages before this one are not fetched again on resume
+        self.last_page_ids = self.review_ids
+        self.review_ids = set()
+
+    def complete(self, summary: Dict[str, Any]):
+        self.summary = summary
+        # Finished products are skipped on resume; their IDs are no longer needed
+        self.review_ids = set()
+        self.last_page_ids = set()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'url': self.url,
+            'last_page': self.last_page,
+            'page_reviews': self.page_reviews,
+            'pushed': self.pushed,
+            'review_ids': sorted(self.review_ids),
+            'last_page_ids': sorted(self.last_page_ids),
+            'summary': self.summary,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'ProductProgress':
+        return cls(url=data['url'], last_page=data.get('last_page', 0), page_reviews=data.get('page_reviews', 0),
+                   pushed=data.get('pushed', 0), review_ids=set(data.get('review_ids') or []),
+                   last_page_ids=set(data.get('last_page_ids') or []), summary=data.get('summary'))
+
+
+class CrawlCheckpoint:
+    """
+    Progress of a run, saved to the run's key-value store.
+
+    Records which input URLs are finished, the last fully pushed page of each
+    product and the IDs of the reviews on the pages a resume can fetch again,
+    so its size does not grow with the number of reviews. The checkpoint is
+    saved on every PERSIST_STATE event (periodically, and before a migration) and
+    when the block exits. Before each save, `before_save` is awaited - pass the
+    dataset writer's flush - so the saved state never claims reviews that are
+    still sitting in a buffer.
+
+    Usage:
+        checkpoint = await CrawlCheckpoint.load(before_save=dataset.flush)
+        async with checkpoint:
+            progress = checkpoint.product(idx, url)
+            ...
+    """
+
+    def __init__(self, products: Dict[str, ProductProgress] = None, key: str = CHECKPOINT_KEY,
+                 before_save: Callable[[], Awaitable[Any]] = None):
+        self.products = products or {}
+        self.key = key
+        self.before_save = before_save
+        self._lock = asyncio.Lock()
+        self.resumed = bool(self.products)
+
+    @classmethod
+    async def load(cls, key: str = CHECKPOINT_KEY,
+                   before_save: Callable[[], Awaitable[Any]] = None) -> 'CrawlCheckpoint':
+        """Load the checkpoint left by an earlier attempt of this run, if any."""
+        data = await Actor.get_value(key) or {}
+        products = {
+            index: ProductProgress.from_dict(progress)
+            for index, progress in (data.get('products') or {}).items()
+        }
+        return cls(products, key=key, before_save=before_save)
+
+    async def __aenter__(self) -> 'CrawlCheckpoint':
+        Actor.on(ActorEventTypes.PERSIST_STATE, self.save)
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        Actor.off(ActorEventTypes.PERSIST_STATE, self.save)
+        await self.save()
+
+    def product(self, url_index: int, url: str) -> ProductProgress:
+        """
+        Progress for the input URL at url_index, starting fresh if the input changed.
+
+        Args:
+            url_index: 1-based position of the URL in the input
+            url: The input URL
+        """
+        key = str(url_index)
+        progress = self.products.get(key)
+        if progress is None or progress.url != url:
+            progress = self.products[key] = ProductProgress(url=url)
+        return progress
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'products': {index: progress.to_dict() for index, progress in self.products.items()}}
+
+    async def save(self):
+        """Flush pending output, then store the progress recorded before the flush."""
+        async with self._lock:
+            # Snapshot first: everything recorded so far has been handed to the writer
+            data = self.to_dict()
+            if self.before_save:
+                await self.before_save()
+            await Actor.set_value(self.key, data)
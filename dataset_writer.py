@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Buffered dataset writer - batches Actor.push_data calls for the review scraper
+"""
+
+import asyncio
+from typing import Any, Dict, List, Optional
+
+from apify import Actor
+
+import json_backend
+from metrics import metrics
+
+DEFAULT_BATCH_SIZE = 500
+# Apify rejects push_data payloads above 9 MB; leave headroom for the JSON array framing
+DEFAULT_MAX_BATCH_BYTES = 8 * 1024 * 1024
+DEFAULT_FLUSH_INTERVAL = 5.0  # seconds
+
+
+class DatasetWriter:
+    """
+    Collects dataset items and pushes them to the Actor dataset in chunks.
+
+    A chunk is flushed when it reaches `batch_size` items or `max_batch_bytes`
+    of serialised JSON, when `flush_interval` seconds have passed since the
+    last flush, and when the writer is closed.
+
+    Usage:
+        async with DatasetWriter() as dataset:
+            await dataset.push(review)
+    """
+
+    def __init__(self, batch_size: int = DEFAULT_BATCH_SIZE,
+                 max_batch_bytes: int = DEFAULT_MAX_BATCH_BYTES,
+                 flush_interval: Optional[float] = DEFAULT_FLUSH_INTERVAL):
+        self.batch_size = max(1, batch_size)
+        self.max_batch_bytes = max_batch_bytes
+        self.flush_interval = flush_interval
+
+        self._buffer: List[Dict[str, Any]] = []
+        self._buffer_bytes = 0
+        self._lock = asyncio.Lock()
+        self._timer: Optional[asyncio.Task] = None
+
+        self.items_pushed = 0
+        self.push_calls = 0
+
+    async def __aenter__(self) -> 'DatasetWriter':
+        if self.flush_interval:
+            self._timer = asyncio.create_task(self._flush_periodically())
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    async def push(self, item: Dict[str, Any]):
+        """
+        Add one item to the buffer, flushing first if it would overflow the chunk.
+
+        Args:
+            item: JSON-serialisable dataset item
+        """
+        item_bytes = len(json_backend.dumps(item)) + 1
+
+        if self._buffer and self._buffer_bytes + item_bytes > self.max_batch_bytes:
+            await self.flush()
+
+        self._buffer.append(item)
+        self._buffer_bytes += item_bytes
+
+        if len(self._buffer) >= self.batch_size:
+            await self.flush()
+
+    async def push_many(self, items):
+        """
+        Add several items to the buffer.
+
+        Args:
+            items: Iterable of JSON-serialisable dataset items
+        """
+        for item in items:
+            await self.push(item)
+
+    async def flush(self):
+        """Push everything currently buffered as a single push_data call."""
+        async with self._lock:
+            if not self._buffer:
+                return
+
+            chunk, chunk_bytes = self._buffer, self._buffer_bytes
+            self._buffer = []
+            self._buffer_bytes = 0
+
+            try:
+                with metrics.timer('dataset_push_seconds'):
+                    await Actor.push_data(chunk)
+            except Exception:
+                metrics.inc('dataset_push_errors_total')
+                # Keep the items so the next flush retries them
+                self._buffer = chunk + self._buffer
+                self._buffer_bytes += chunk_bytes
+                raise
+
+            self.items_pushed += len(chunk)
+            self.push_calls += 1
+            metrics.inc('dataset_items_pushed_total', len(chunk))
+
+    async def close(self):
+        """Stop the flush timer and push any remaining items."""
+        if self._timer:
+            self._timer.cancel()
+            try:
+                await self._timer
+            except asyncio.CancelledError:
+                pass
+            self._timer = None
+
+        await self.flush()
+        Actor.log.info(f'Dataset writer pushed {self.items_pushed} item(s) in {self.push_calls} request(s)')
+
+    async def _flush_periodically(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                Actor.log.warning(f'Periodic dataset flush failed, will retry: {e}')
@@ -3,17 +3,47 @@
 Flipkart Review Scraper - Fetches reviews from Flipkart product pages
 """
 
-from curl_cffi import requests
+from curl_cffi import requests, CurlHttpVersion, CurlOpt
+from curl_cffi.requests import AsyncSession
+import asyncio
 import json
+import operator
 import re
 import os
-from typing import List, Dict, Any, Tuple
+import time
+from collections import deque
+from dataclasses import dataclass, fields
+from typing import List, Dict, Any, Tuple, Optional, AsyncIterator, Callable, Set
 from dotenv import load_dotenv
 
+import json_backend
+from identity_pool import Identity, IdentityPool
+from metrics import metrics
+from parse_pool import ParsePool
+from proxy_pool import ProxyPool
+from response_cache import ResponseCache
+from response_classifier import (
+    BLOCKED, EMPTY, ERROR, STRIPPED, SUCCESS, THROTTLED,
+    Classification, classify_html, classify_reviews, classify_status
+)
+from rate_controller import AdaptiveRateController, THROTTLE_STATUS_CODES
+
 load_dotenv()
 
 MAX_RETRIES = 5
 
+# Pagination settings shared by the serial and concurrent page loops
+DEFAULT_PAGE_CONCURRENCY = 4
+MAX_CONSECUTIVE_EMPTY_PAGES = 3
+MAX_CONSECUTIVE_FAILED_PAGES = 3
+MAX_PAGES = 1000
+# Value of Flipkart's sortOrder review parameter that lists the newest reviews first
+SORT_MOST_RECENT = 'MOST_RECENT'
+
+# Shared HTTP session settings
+DEFAULT_POOL_SIZE = 16
+DEFAULT_KEEPALIVE_IDLE = 60  # seconds
+
 # =========================
 # 🔧 Oxylabs Configuration
 # =========================
@@ -38,6 +68,8 @@ cookies = {
     'AMCV_17EB401053DAF4840A490D4C%40AdobeOrg': '-227196251%7CMCIDTS%7C20399%7CMCMID%7C58981570769183976403714749427124473329%7CMCAID%7CNONE%7CMCOPTOUT-1762460216s%7CNONE',
 }
 
+FLIPKART_HOME_URL = 'https://www.flipkart.com/'
+
 headers = {
     'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8',
     'Accept-Language': 'en-GB,en;q=0.8',
@@ -59,58 +91,426 @@ headers = {
 }
 
 
+@dataclass(slots=True)
+class Review:
+    """
+    One extracted review with a fixed schema.
+
+    Product attributes (colour, size, ...) vary per product, so they are kept
+    as a tuple of (attribute, value) pairs and only expanded into
+    `product_<attribute>` keys by to_dict() at the output boundary.
+    """
+    review_id: str = ''
+    author: str = ''
+    certified_buyer: bool = False
+    created_date: str = ''
+    rating: int = 0
+    title: str = ''
+    review_text: str = ''
+    helpful_count: int = 0
+    city: str = ''
+    state: str = ''
+    product_attributes: Tuple[Tuple[str, Any], ...] = ()
+    image_urls: str = ''
+    image_count: int = 0
+    upvotes: int = 0
+    downvotes: int = 0
+    verified_purchase: bool = False
+    position: str = ''
+    review_language: str = ''
+    # Run metadata, filled in by the caller
+    flipkart_url: Optional[str] = None
+    product_id: Optional[str] = None
+    url_index: Optional[int] = None
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Dict-style read access, including `product_<attribute>` keys."""
+        if key.startswith('product_') and key != 'product_id':
+            return dict(self.product_attributes).get(key[len('product_'):], default)
+        return getattr(self, key, default)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Flatten into the dataset item layout.
+
+        Returns:
+            Dictionary with the same keys and order the scraper has always pushed
+        """
+        review = {
+            'review_id': self.review_id,
+            'author': self.author,
+            'certified_buyer': self.certified_buyer,
+            'created_date': self.created_date,
+            'rating': self.rating,
+            'title': self.title,
+            'review_text': self.review_text,
+            'helpful_count': self.helpful_count,
+            'city': self.city,
+            'state': self.state,
+        }
+        for attr_name, attr_value in self.product_attributes:
+            review[f'product_{attr_name}'] = attr_value
+        review['image_urls'] = self.image_urls
+        review['image_count'] = self.image_count
+        review['upvotes'] = self.upvotes
+        review['downvotes'] = self.downvotes
+        review['verified_purchase'] = self.verified_purchase
+        review['position'] = self.position
+        review['review_language'] = self.review_language
+
+        if self.flipkart_url is not None:
+            review['flipkart_url'] = self.flipkart_url
+            review['product_id'] = self.product_id
+            review['url_index'] = self.url_index
+        return review
+
+
+# Extracted fields of a Review, in constructor order; the run metadata is left out
+_REVIEW_RECORD_FIELDS = tuple(f.name for f in fields(Review))[:-3]
+_review_record = operator.attrgetter(*_REVIEW_RECORD_FIELDS)
+
+
+def default_identity() -> Identity:
+    """The identity built from the module-level cookies and headers."""
+    return Identity(cookies=dict(cookies), headers=dict(headers))
+
+
+INITIAL_STATE_MARKER = 'window.__INITIAL_STATE__'
+_STATE_ASSIGNMENT = re.compile(r'\s*=\s*')
+_json_decoder = json.JSONDecoder()
+
+
+def _find_state_start(html_content: str) -> int:
+    """
+    Return the offset of the opening brace of the __INITIAL_STATE__ object.
+
+    Raises:
+        ValueError: If the page has no __INITIAL_STATE__ assignment
+    """
+    start = html_content.find(INITIAL_STATE_MARKER)
+
+    while start != -1:
+        assignment = _STATE_ASSIGNMENT.match(html_content, start + len(INITIAL_STATE_MARKER))
+        if assignment and html_content.startswith('{', assignment.end()):
+            return assignment.end()
+        # Marker mentioned somewhere other than the assignment; keep looking
+        start = html_content.find(INITIAL_STATE_MARKER, start + len(INITIAL_STATE_MARKER))
+
+    raise ValueError("Could not find __INITIAL_STATE__ in HTML")
+
+
+def _slice_state(html_content: str, state_start: int) -> Optional[str]:
+    """
+    Cut the state JSON text out of the page without parsing it.
+
+    The assignment normally fills its own <script> tag, and valid inline
+    scripts cannot contain a literal </script>, so the text up to that tag
+    (minus the trailing semicolon) is the whole object. This is only a
+    candidate: when more statements follow the assignment in the same tag,
+    it still ends in '}' but is not valid JSON, so callers must fall back to
+    _raw_state_json whenever decoding it fails. Returns None when the text
+    cannot be the object at all.
+    """
+    end = html_content.find('</script>', state_start)
+    if end == -1:
+        return None
+    state_json = html_content[state_start:end].rstrip().rstrip(';').rstrip()
+    return state_json if state_json.endswith('}') else None
+
+
+def _raw_state_json(html_content: str, state_start: int) -> str:
+    """
+    Cut the state JSON text out of the page by decoding exactly one object from state_start.
+
+    Raises:
+        ValueError: If no JSON object starts there
+    """
+    _, state_end = _json_decoder.raw_decode(html_content, state_start)
+    return html_content[state_start:state_end]
+
+
+def extract_page(html_content: str) -> Tuple[str, List[Review], Optional[str]]:
+    """
+    Cut the __INITIAL_STATE__ JSON text out of a page and extract its reviews.
+
+    Tries the cheap slice up to </script> first. If that text does not
+    decode (more script follows the assignment), the object is delimited with
+    raw_decode instead. raw_decode accepts any valid object, so there is
+    nothing left to fall back to when it fails.
+
+    Args:
+        html_content: HTML string
+
+    Returns:
+        Tuple of (state JSON text, reviews, fallback). fallback is 'raw_decode'
+        when the slice did not decode, else None; the caller counts it, since
+        this may run in a ParsePool worker whose metrics are never read.
+
+    Raises:
+        ValueError: If the page has no decodable __INITIAL_STATE__
+    """
+    state_start = _find_state_start(html_content)
+    state_json = _slice_state(html_content, state_start)
+    if state_json is not None:
+        try:
+            return state_json, extract_reviews_from_state(state_json), None
+        except ValueError:
+            pass
+
+    state_json = _raw_state_json(html_content, state_start)
+    return state_json, extract_reviews_from_state(state_json), 'raw_decode'
+
+
 def extract_json_from_html(html_content: str) -> Dict[str, Any]:
     """
-    Extract the JSON data from HTML content.
+    Extract the __INITIAL_STATE__ data from HTML content as a dictionary.
+
+    A thin wrapper over extract_page, which also extracts the reviews; use
+    extract_page directly when both are needed.
 
     Args:
         html_content: HTML string
 
     Returns:
         Dictionary containing the parsed JSON data
+
+    Raises:
+        ValueError: If the page has no decodable __INITIAL_STATE__
     """
-    # Find the window.__INITIAL_STATE__ JSON object
-    pattern = r'window\.__INITIAL_STATE__\s*=\s*(\{.*?\});'
-    match = re.search(pattern, html_content, re.DOTALL)
+    return json_backend.loads(extract_page(html_content)[0])
 
-    if not match:
-        raise ValueError("Could not find __INITIAL_STATE__ in HTML")
 
-    json_str = match.group(1)
-    return json.loads(json_str)
+def extract_reviews_from_html(html_content: str) -> List[Review]:
+    """
+    Extract reviews straight from review page HTML; a thin wrapper over extract_page.
 
+    Args:
+        html_content: HTML string
+
+    Returns:
+        List of Review records
+
+    Raises:
+        ValueError: If the page has no decodable __INITIAL_STATE__
+    """
+    return extract_page(html_content)[1]
+
+
+def extract_reviews_from_state(state_json) -> List[Review]:
+    """
+    Extract reviews from __INITIAL_STATE__ JSON text, as returned by extract_page.
+
+    Args:
+        state_json: JSON text (str or bytes) of the state object
+
+    Returns:
+        List of Review records
+
+    Raises:
+        ValueError: If the text is not valid JSON
+    """
+    components = json_backend.decode_review_components(state_json)
+    if components:
+        return [extract_review_details(component['value'], component) for component in components]
+    return extract_reviews_from_json(json_backend.loads(state_json))
+
+
+def parse_page(html_content: str, keep_state: bool = False) -> Tuple[Optional[str], List[tuple], Optional[str]]:
+    """
+    Parse a fetched page into compact review records; runs in ParsePool workers.
+
+    Records are plain tuples, which are cheaper to send back to the event
+    loop's process than Review objects. Rebuild them with Review(*record).
+
+    Args:
+        html_content: HTML string
+        keep_state: Also return the __INITIAL_STATE__ JSON text (for caching or pagination)
+
+    Returns:
+        Tuple of (state JSON text or None, review records, fallback path as in extract_page)
 
-def extract_reviews_from_json(data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    Raises:
+        ValueError: If the page has no decodable __INITIAL_STATE__
     """
-    Extract review data from the JSON structure using recursive search.
+    try:
+        state_json, reviews, fallback = extract_page(html_content)
+        records = [_review_record(review) for review in reviews]
+    except ValueError as e:
+        # Backend-specific decode errors may not survive pickling
+        raise ValueError(str(e)) from None
+    return (state_json if keep_state else None), records, fallback
+
+
+def parse_state(state_json) -> List[tuple]:
+    """
+    Extract compact review records from __INITIAL_STATE__ JSON text; runs in ParsePool workers.
+
+    Args:
+        state_json: JSON text of the state object
+
+    Returns:
+        Review records, see parse_page
+
+    Raises:
+        ValueError: If the text is not valid JSON
+    """
+    try:
+        return [_review_record(review) for review in extract_reviews_from_state(state_json)]
+    except ValueError as e:
+        raise ValueError(str(e)) from None
+
+
+# Where review components live in __INITIAL_STATE__. '*' matches every item
+# of a list or every value of a dict (slot ids differ from page to page).
+KNOWN_REVIEW_PATHS = [
+    ('pageDataV4', 'page', 'data', '*', '*', 'widget', 'data', 'renderableComponents', '*'),
+]
+
+# Paths discovered by the full walk when Flipkart changes the page layout
+_learned_review_paths: List[Tuple[str, ...]] = []
+
+
+def _is_review_component(obj: Any) -> bool:
+    """Whether obj is a renderable component wrapping a ProductReviewValue."""
+    return (
+        isinstance(obj, dict)
+        and isinstance(obj.get('value'), dict)
+        and obj['value'].get('type') == 'ProductReviewValue'
+    )
+
+
+def _resolve_path(data: Any, path: Tuple[str, ...]) -> List[Any]:
+    """
+    Return every node reachable from data along path.
 
     Args:
         data: Parsed JSON data
+        path: Sequence of dict keys, with '*' matching all list items or dict values
 
     Returns:
-        List of review dictionaries
+        List of matching nodes in document order
     """
-    reviews = []
+    nodes = [data]
+    for key in path:
+        next_nodes = []
+        for node in nodes:
+            if key == '*':
+                if isinstance(node, list):
+                    next_nodes.extend(node)
+                elif isinstance(node, dict):
+                    next_nodes.extend(node.values())
+            elif isinstance(node, dict) and key in node:
+                next_nodes.append(node[key])
+        nodes = next_nodes
+        if not nodes:
+            break
+    return nodes
+
+
+def _find_review_components_full(data: Any) -> List[Dict[str, Any]]:
+    """
+    Walk the whole state tree iteratively and collect review components.
 
-    def find_reviews_recursive(obj):
-        """Recursively search for ProductReviewValue objects with their component context"""
-        if isinstance(obj, dict):
-            # Check if this object is a renderable component with ProductReviewValue
-            if 'value' in obj and isinstance(obj['value'], dict):
-                if obj['value'].get('type') == 'ProductReviewValue':
-                    review = extract_review_details(obj['value'], obj)
-                    reviews.append(review)
+    Args:
+        data: Parsed JSON data
+
+    Returns:
+        List of review components in document order
+    """
+    components = []
+    stack = [data]
+
+    while stack:
+        obj = stack.pop()
+
+        # Decoded JSON only holds plain dicts and lists; exact type checks keep this loop cheap
+        if type(obj) is dict:
+            value = obj.get('value')
+            if type(value) is dict and value.get('type') == 'ProductReviewValue':
+                components.append(obj)
+                continue
+            # Push in reverse so children are visited in document order
+            stack.extend(reversed(obj.values()))
+
+        elif type(obj) is list:
+            stack.extend(reversed(obj))
+
+    return components
 
-            # Continue searching in nested objects
-            for value in obj.values():
-                find_reviews_recursive(value)
 
+def _learn_review_paths(data: Any, components: List[Dict[str, Any]]):
+    """
+    Remember the generalised paths of review components found by the full walk.
+
+    List indices and numeric slot ids become '*', so later pages with the same
+    layout are served by the targeted lookup.
+
+    Args:
+        data: Parsed JSON data
+        components: Review components returned by the full walk
+    """
+    wanted = {id(component) for component in components}
+    stack = [(data, ())]
+
+    while stack and wanted:
+        obj, path = stack.pop()
+
+        if id(obj) in wanted:
+            wanted.discard(id(obj))
+            pattern = tuple('*' if isinstance(key, int) or key.isdigit() else key for key in path)
+            if pattern not in KNOWN_REVIEW_PATHS and pattern not in _learned_review_paths:
+                print(f"Learned new review path: {'.'.join(pattern)}")
+                _learned_review_paths.append(pattern)
+        elif isinstance(obj, dict):
+            stack.extend((value, path + (key,)) for key, value in obj.items())
         elif isinstance(obj, list):
-            for item in obj:
-                find_reviews_recursive(item)
+            stack.extend((item, path + (index,)) for index, item in enumerate(obj))
+
+
+def find_review_components(data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Locate review components, trying the known review paths before a full walk.
+
+    Args:
+        data: Parsed JSON data
+
+    Returns:
+        List of review components in document order
+    """
+    components = []
+    seen = set()
+
+    for path in KNOWN_REVIEW_PATHS + _learned_review_paths:
+        for node in _resolve_path(data, path):
+            if _is_review_component(node) and id(node) not in seen:
+                seen.add(id(node))
+                components.append(node)
+
+    if components:
+        return components
+
+    # Nothing at the known paths: either the page has no reviews or the layout changed
+    components = _find_review_components_full(data)
+    if components:
+        _learn_review_paths(data, components)
+    return components
+
+
+def extract_reviews_from_json(data: Dict[str, Any]) -> List[Review]:
+    """
+    Extract review data from the JSON structure.
+
+    Args:
+        data: Parsed JSON data
+
+    Returns:
+        List of Review records
+    """
+    reviews = []
 
     try:
-        find_reviews_recursive(data)
+        for component in find_review_components(data):
+            reviews.append(extract_review_details(component['value'], component))
     except Exception as e:
         print(f"Error extracting reviews: {e}")
         import traceback
@@ -119,7 +519,7 @@ def extract_reviews_from_json(data: Dict[str, Any]) -> List[Dict[str, Any]]:
     return reviews
 
 
-def extract_review_details(value: Dict[str, Any], component: Dict[str, Any]) -> Dict[str, Any]:
+def extract_review_details(value: Dict[str, Any], component: Dict[str, Any]) -> Review:
     """
     Extract detailed information from a single review.
 
@@ -128,36 +528,23 @@ def extract_review_details(value: Dict[str, Any], component: Dict[str, Any]) ->
         component: Component dictionary containing tracking info
 
     Returns:
-        Dictionary with extracted review details
-    """
-    # Extract basic review info
-    review = {
-        'review_id': value.get('id', ''),
-        'author': value.get('author', ''),
-        'certified_buyer': value.get('certifiedBuyer', False),
-        'created_date': value.get('created', ''),
-        'rating': value.get('rating', 0),
-        'title': value.get('title', ''),
-        'review_text': value.get('text', ''),
-        'helpful_count': value.get('helpfulCount', 0),
-    }
-
+        Review with extracted review details
+    """
     # Extract location info
     location = value.get('location', {})
     if isinstance(location, dict):
-        review['city'] = location.get('city', '')
-        review['state'] = location.get('state', '')
+        city = location.get('city', '')
+        state = location.get('state', '')
     else:
-        review['city'] = ''
-        review['state'] = ''
+        city = ''
+        state = ''
 
     # Extract product attributes
     product_attrs = value.get('productAttributeList', [])
-    if product_attrs:
-        for attr in product_attrs:
-            attr_name = attr.get('name', '').lower().replace(' ', '_')
-            attr_value = attr.get('value', '')
-            review[f'product_{attr_name}'] = attr_value
+    product_attributes = tuple(
+        (attr.get('name', '').lower().replace(' ', '_'), attr.get('value', ''))
+        for attr in product_attrs or ()
+    )
 
     # Extract image URLs
     images = value.get('images', [])
@@ -169,95 +556,167 @@ def extract_review_details(value: Dict[str, Any], component: Dict[str, Any]) ->
             # Clean up the URL template
             img_url = img_url.replace('{@width}', '400').replace('{@height}', '400').replace('{@quality}', '90')
             image_urls.append(img_url)
-    review['image_urls'] = ', '.join(image_urls) if image_urls else ''
-    review['image_count'] = len(image_urls)
 
     # Extract votes
     upvote = value.get('upvote', {}).get('value', {})
     downvote = value.get('downvote', {}).get('value', {})
-    review['upvotes'] = upvote.get('count', 0) if isinstance(upvote, dict) else 0
-    review['downvotes'] = downvote.get('count', 0) if isinstance(downvote, dict) else 0
 
     # Extract verified purchase status
     review_props = value.get('reviewPropertyMap', {})
-    review['verified_purchase'] = review_props.get('VERIFIED_PURCHASE', False)
 
     # Extract tracking info
     tracking = component.get('tracking', {})
-    review['position'] = tracking.get('position', '')
-    review['review_language'] = tracking.get('reviewLanguage', '')
-
-    return review
-
 
-def fetch_and_extract_reviews(url: str, params: dict, page_num: int = None) -> List[Dict[str, Any]]:
+    return Review(
+        review_id=value.get('id', ''),
+        author=value.get('author', ''),
+        certified_buyer=value.get('certifiedBuyer', False),
+        created_date=value.get('created', ''),
+        rating=value.get('rating', 0),
+        title=value.get('title', ''),
+        review_text=value.get('text', ''),
+        helpful_count=value.get('helpfulCount', 0),
+        city=city,
+        state=state,
+        product_attributes=product_attributes,
+        image_urls=', '.join(image_urls) if image_urls else '',
+        image_count=len(image_urls),
+        upvotes=upvote.get('count', 0) if isinstance(upvote, dict) else 0,
+        downvotes=downvote.get('count', 0) if isinstance(downvote, dict) else 0,
+        verified_purchase=review_props.get('VERIFIED_PURCHASE', False),
+        position=tracking.get('position', ''),
+        review_language=tracking.get('reviewLanguage', ''),
+    )
+
+
+# Only widgets of these types are searched for pagination metadata, so a
+# totalPages or reviewCount belonging to some other widget cannot cut a crawl short
+_PAGINATION_WIDGET_TYPES = re.compile(r'PAGINATION', re.IGNORECASE)
+_SUMMARY_WIDGET_TYPES = re.compile(r'SUMMARY|RATING', re.IGNORECASE)
+_WIDGET_PATH = ('pageDataV4', 'page', 'data', '*', '*', 'widget')
+# Keys Flipkart has used for the rating histogram and its bucket fields
+_HISTOGRAM_KEYS = ('ratingBreakup', 'ratingHistogram', 'ratingDistribution', 'histogram')
+_BUCKET_RATING_KEYS = ('rating', 'star', 'stars', 'key')
+_BUCKET_COUNT_KEYS = ('count', 'value', 'ratingCount')
+
+
+@dataclass
+class PageResult:
+    """A fetched review page and how the fetch turned out (see response_classifier)."""
+    reviews: List[Review]
+    outcome: str = SUCCESS
+    reason: str = ''
+
+    @property
+    def failed(self) -> bool:
+        """Whether no usable page came back, as opposed to a page with or without reviews."""
+        return self.outcome not in (SUCCESS, EMPTY)
+
+
+@dataclass
+class PaginationInfo:
+    """Pagination metadata found in a review page's __INITIAL_STATE__."""
+    total_pages: Optional[int] = None
+    total_reviews: Optional[int] = None
+    rating_histogram: Optional[Dict[str, int]] = None  # star rating ("5" to "1") -> number of ratings
+    planned_pages: Optional[int] = None  # pages the scraper expects to need, set by plan_pages
+
+    def plan_pages(self, reviews_per_page: int, max_reviews: Optional[int] = None) -> Optional[int]:
+        """
+        Work out the last page worth requesting.
+
+        Args:
+            reviews_per_page: Number of reviews on the first page
+            max_reviews: Review limit, if any
+
+        Returns:
+            Last page number, or None when the page count is unknown
+        """
+        if not self.total_pages:
+            return None
+        last_page = self.total_pages
+        if max_reviews and reviews_per_page:
+            last_page = min(last_page, -(-max_reviews // reviews_per_page))
+        self.planned_pages = min(last_page, MAX_PAGES)
+        return self.planned_pages
+
+
+def _as_count(value: Any) -> Optional[int]:
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return int(value)
+    if isinstance(value, str) and value.replace(',', '').isdigit():
+        return int(value.replace(',', ''))
+    return None
+
+
+def _parse_histogram(value: Any) -> Optional[Dict[str, int]]:
+    """Normalise the rating histogram shapes Flipkart uses to {"5": n, ..., "1": n}."""
+    histogram = {}
+    if isinstance(value, dict):
+        for rating, count in value.items():
+            if _as_count(rating) is not None and _as_count(count) is not None:
+                histogram[str(_as_count(rating))] = _as_count(count)
+    elif isinstance(value, list):
+        for index, bucket in enumerate(value):
+            if isinstance(bucket, dict):
+                rating = next((_as_count(bucket[key]) for key in _BUCKET_RATING_KEYS if key in bucket), None)
+                count = next((_as_count(bucket[key]) for key in _BUCKET_COUNT_KEYS if key in bucket), None)
+            else:
+                # Plain list of counts, listed from 5 stars down as on the page
+                rating, count = 5 - index, _as_count(bucket)
+            if rating is not None and count is not None:
+                histogram[str(rating)] = count
+    return histogram if histogram and all(key in ('1', '2', '3', '4', '5') for key in histogram) else None
+
+
+def _first_value(root: Any, keys: Tuple[str, ...], parse: Callable[[Any], Any]) -> Any:
+    """First value under any of keys in root's subtree (document order) that parse accepts."""
+    stack = [root]
+    while stack:
+        obj = stack.pop()
+        if type(obj) is dict:
+            for key in keys:
+                if key in obj:
+                    value = parse(obj[key])
+                    if value is not None:
+                        return value
+            stack.extend(reversed(list(obj.values())))
+        elif type(obj) is list:
+            stack.extend(reversed(obj))
+    return None
+
+
+def extract_pagination_info(data: Dict[str, Any]) -> PaginationInfo:
     """
-    Fetch reviews from Flipkart and extract them with retry logic.
+    Find the total page count, review count and rating histogram in page state.
+
+    The page count is only read from pagination widgets, and the review
+    count and histogram from product summary / rating widgets, all found at
+    pageDataV4.page.data.<slot>.<n>.widget by their type; the first value
+    found for each field wins. Anything else is left as None, in which case
+    the crawl falls back to stopping at empty pages.
 
     Args:
-        url: Product review URL
-        params: Request parameters
-        page_num: Optional page number for display
+        data: Parsed __INITIAL_STATE__
 
     Returns:
-        List of extracted reviews
+        PaginationInfo with None for anything not found
     """
-    page_info = f" (Page {page_num})" if page_num else ""
-    max_retries = 5
-    retry_delay = 3  # seconds
-
-    for attempt in range(1, max_retries + 1):
-        try:
-            if attempt > 1:
-                print(f"  Retry attempt {attempt}/{max_retries}...")
-            else:
-                print(f"Fetching reviews{page_info}...")
-
-            response = requests.get(
-                url,
-                params=params,
-                cookies=cookies,
-                headers=headers,
-                impersonate= "chrome110",
-                # proxies = PROXY_CONFIG,
-                timeout=30
-            )
-            response.raise_for_status()
-
-            print(f"Received response with status code: {response.status_code}")
-
-            # Extract JSON from HTML
-            data = extract_json_from_html(response.text)
-            print("JSON data extracted successfully")
-
-            # Extract reviews
-            reviews = extract_reviews_from_json(data)
-            print(f"Found {len(reviews)} reviews")
-
-            return reviews
-
-        except (requests.exceptions.ProxyError, requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
-            print(f"Connection error (attempt {attempt}/{max_retries}): {e}")
-            if attempt < max_retries:
-                print(f"Retrying in {retry_delay} seconds...")
-                import time
-                time.sleep(retry_delay)
-            else:
-                print(f"Max retries reached. Giving up.")
-                return []
-        except requests.RequestException as e:
-            print(f"Error fetching URL: {e}")
-            return []
-        except ValueError as e:
-            print(f"Error parsing response: {e}")
-            return []
-        except Exception as e:
-            print(f"Unexpected error: {e}")
-            import traceback
-            traceback.print_exc()
-            return []
-
-    return []
+    info = PaginationInfo()
+    for widget in _resolve_path(data, _WIDGET_PATH):
+        if type(widget) is not dict:
+            continue
+        widget_type = str(widget.get('type') or '')
+        if info.total_pages is None and _PAGINATION_WIDGET_TYPES.search(widget_type):
+            info.total_pages = _first_value(widget.get('data'), ('totalPages',), _as_count)
+        if _SUMMARY_WIDGET_TYPES.search(widget_type):
+            if info.total_reviews is None:
+                info.total_reviews = _first_value(widget.get('data'), ('reviewCount',), _as_count)
+            if info.rating_histogram is None:
+                info.rating_histogram = _first_value(widget.get('data'), _HISTOGRAM_KEYS, _parse_histogram)
+    return info
 
 
 def extract_product_id_from_url(url: str) -> Tuple[str, str, str]:
@@ -313,96 +772,765 @@ def extract_product_id_from_url(url: str) -> Tuple[str, str, str]:
         return None, None, None
 
 
-def scrape_product_reviews_wrapper(product_url: str, max_reviews: int = None) -> Tuple[List[Dict[str, Any]], int, bool]:
+def canonical_review_url(url: str) -> Tuple[Optional[str], Optional[str], Optional[str]]:
     """
-    Wrapper function to scrape product reviews from a Flipkart URL.
+    Normalise a Flipkart product URL to the review URL its pages are fetched from.
+
+    Review pages are requested from the review path alone, so product URLs
+    that differ only in tracking parameters, lid or scheme map to the same
+    canonical URL and can be scraped once.
 
     Args:
-        product_url: Flipkart product URL
-        max_reviews: Maximum number of reviews to scrape. If None, scrapes all reviews.
+        url: Flipkart product URL
 
     Returns:
-        Tuple of (reviews_list, review_count, success)
+        Tuple of (canonical review URL without query, pid, lid) or (None, None, None)
+        if the URL is not a product URL
     """
-    import time
+    from urllib.parse import urlparse
 
-    print(f"\n{'='*80}")
-    print(f"Processing URL: {product_url}")
-    if max_reviews:
-        print(f"Max reviews limit: {max_reviews}")
-    else:
-        print(f"Max reviews limit: No limit (scraping all)")
-    print(f"{'='*80}")
+    review_url, pid, lid = extract_product_id_from_url(url)
+    if not review_url:
+        return None, None, None
 
-    try:
-        # Extract product ID and build review URL
-        review_url, _, _ = extract_product_id_from_url(product_url)
+    parsed = urlparse(review_url)
+    netloc = parsed.netloc.lower()
+    scheme = parsed.scheme.lower()
+    if netloc in ('flipkart.com', 'www.flipkart.com'):
+        netloc, scheme = 'www.flipkart.com', 'https'
+    path = parsed.path.rstrip('/') or '/'
+    return f"{scheme}://{netloc}{path}", pid, lid
 
-        if not review_url:
-            print(f"✗ Failed to extract product ID from URL")
-            return ([], 0, False)
 
-        print(f"Review URL: {review_url}")
+class _PageWindow:
+    """
+    Bookkeeping for a window of review pages fetched concurrently.
+
+    Pages are handed out in increasing order and committed strictly in page
+    order, so the empty-page and max_reviews stop rules behave exactly like the
+    serial loop even though later pages may finish first. Pages that could not
+    be fetched (blocked, throttled or stripped to the end) are skipped without
+    counting as empty, so they neither end the crawl early nor are mistaken for
+    the last page; a run of them stops the crawl instead. Nothing past
+    `last_page` (the end of a page range, or MAX_PAGES) is handed out.
+
+    The page count read from page 1 sets `planned_page`. It is trusted: one
+    page past it is fetched as a probe, and later pages are held back until
+    the probe is committed. Only if the probe still had reviews (the count was
+    too low) does fetching carry on past the plan, until the first empty page
+    ends the crawl. Committed pages wait
+    in `ready` until the consumer takes them; they count against the window so
+    a slow consumer throttles fetching instead of growing memory.
+    """
 
-        # Build base URL without query parameters for pagination
-        from urllib.parse import urlparse
-        parsed = urlparse(review_url)
-        base_review_url = f"{parsed.scheme}://{parsed.netloc}{parsed.path}"
+    def __init__(self, max_reviews: Optional[int], window: int, start_page: int = 1, collected: int = 0):
+        self.max_reviews = max_reviews
+        self.window = window
+        self.results: Dict[int, PageResult] = {}
+        self.ready = deque()
+        self.next_page = start_page
+        self.next_commit = start_page
+        self.last_page = MAX_PAGES
+        self.planned_page: Optional[int] = None
+        self.past_plan = False  # the page after the planned last page had reviews; keep going
+        self.collected = collected
+        self.consecutive_empty = 0
+        self.consecutive_failed = 0
+        self.failed_pages: List[Tuple[int, str]] = []  # (page, outcome)
+        self.on_failed: Optional[Callable[[int, str], Any]] = None
+        self.reviews_per_page = 0
+        self.active_workers = 0
+        self.stopped = False
+        self.changed = asyncio.Condition()
+
+    def _enough_in_flight(self) -> bool:
+        """Whether the pages already handed out should cover max_reviews."""
+        if not self.max_reviews or not self.reviews_per_page:
+            return False
+        pending = self.next_page - self.next_commit
+        return self.collected + pending * self.reviews_per_page >= self.max_reviews
+
+    def can_allocate(self) -> bool:
+        if self.stopped:
+            return True
+        if self._waiting_for_plan():
+            return False
+        in_window = (self.next_page - self.next_commit) + len(self.ready)
+        return in_window < self.window and not self._enough_in_flight()
+
+    def _waiting_for_plan(self) -> bool:
+        """Whether the next page lies past the probe page and the probe is not committed yet."""
+        if self.planned_page is None or self.past_plan:
+            return False
+        probe_page = self.planned_page + 1
+        return self.next_page > probe_page and self.next_commit <= probe_page
+
+    def can_consume(self) -> bool:
+        return bool(self.ready) or self.active_workers == 0
+
+    def allocate(self) -> Optional[int]:
+        """Hand out the next page number, or None once fetching should stop."""
+        if self.stopped or self.next_page > self.last_page:
+            return None
+        page = self.next_page
+        self.next_page += 1
+        return page
+
+    def commit(self, page: int, result: PageResult):
+        """Record a fetched page and release every page that is now in order."""
+        self.results[page] = result
+
+        while not self.stopped and self.next_commit in self.results:
+            current = self.next_commit
+            result = self.results.pop(current)
+            page_reviews = result.reviews
+            self.next_commit += 1
+
+            if result.failed:
+                self.consecutive_failed += 1
+                self.failed_pages.append((current, result.outcome))
+                print(f"  Page {current}: ✗ Not fetched ({result.outcome}), skipping")
+                if self.on_failed:
+                    self.on_failed(current, result.outcome)
+
+                if self.consecutive_failed >= MAX_CONSECUTIVE_FAILED_PAGES:
+                    print(f"\n  Stopping after {self.consecutive_failed} consecutive pages could not be fetched")
+                    self.stopped = True
+            elif page_reviews:
+                self.consecutive_empty = 0
+                self.consecutive_failed = 0
+                self.reviews_per_page = max(self.reviews_per_page, len(page_reviews))
+
+                if self.max_reviews:
+                    remaining_slots = self.max_reviews - self.collected
+                    page_reviews = page_reviews[:remaining_slots]
+
+                self.collected += len(page_reviews)
+                self.ready.append((current, page_reviews))
+                print(f"  Page {current}: ✓ {len(page_reviews)} reviews extracted (total: {self.collected})")
+
+                if self.max_reviews and self.collected >= self.max_reviews:
+                    print(f"  ✓ Max reviews limit reached ({self.collected} reviews)")
+                    self.stopped = True
+            else:
+                self.consecutive_empty += 1
+                self.consecutive_failed = 0
+                print(f"  Page {current}: ✗ No reviews")
+
+                if self.planned_page is not None and current >= self.planned_page:
+                    print(f"\n  Reached the end of the reviews after planned page {self.planned_page}")
+                    self.stopped = True
+                elif self.consecutive_empty >= MAX_CONSECUTIVE_EMPTY_PAGES:
+                    print(f"\n  Stopping after {self.consecutive_empty} consecutive empty pages")
+                    self.stopped = True
+
+            if self.planned_page is not None and current == self.planned_page + 1 and not self.stopped:
+                # The page count was too low; carry on until a page comes back empty
+                print(f"  Page {current} is past the planned {self.planned_page} pages, continuing")
+                self.past_plan = True
+
+            if current >= self.last_page and not self.stopped:
+                if self.last_page < MAX_PAGES:
+                    print(f"\n  Reached the last page of the range ({self.last_page})")
+                else:
+                    print(f"\n  Reached safety limit of {MAX_PAGES} pages")
+                self.stopped = True
+
+
+class FlipkartReviewScraper:
+    """
+    Review scraper that owns one pooled curl_cffi AsyncSession.
 
-        product_reviews = []
-        page = 1
-        consecutive_empty_pages = 0
-        max_consecutive_empty = 3
+    Every page and product fetched through the same instance reuses the
+    session's connections, so the TLS handshake with browser impersonation is
+    paid once per connection rather than once per page, and HTTP/2 lets
+    concurrent page requests share a connection.
 
-        while True:
-            print(f"\n  Page {page}...", end=' ')
+    Usage:
+        async with FlipkartReviewScraper(pool_size=16) as scraper:
+            async for review in scraper.iter_product_reviews(url):
+                ...
+    """
 
+    def __init__(self, pool_size: int = DEFAULT_POOL_SIZE, http2: bool = True,
+                 keepalive_idle: int = DEFAULT_KEEPALIVE_IDLE,
+                 page_concurrency: int = DEFAULT_PAGE_CONCURRENCY,
+                 rate_controller: AdaptiveRateController = None,
+                 proxy_pool: ProxyPool = None,
+                 identity_pool: IdentityPool = None,
+                 response_cache: ResponseCache = None,
+                 parse_workers: int = 0):
+        """
+        Args:
+            pool_size: Maximum number of concurrent transfers and cached connections
+            http2: Negotiate HTTP/2 and multiplex requests over shared connections
+            keepalive_idle: Seconds of idleness before TCP keep-alive probes start
+            page_concurrency: Default number of pages fetched at the same time per product
+            rate_controller: Paces requests made without a proxy.
+                Defaults to an AdaptiveRateController with its default limits.
+            proxy_pool: Proxies to route requests through. Each proxy is paced by
+                its own rate controller. If None or empty, requests go out directly.
+            identity_pool: Cookie/header identities rotated across requests. Defaults to
+                the built-in cookies, refreshed via bootstrap_identity when they go stale.
+            response_cache: Cache of fetched page state. In replay mode every page is
+                served from it and nothing is fetched. If None, nothing is cached.
+            parse_workers: Number of processes that parse pages in parallel (see ParsePool).
+                0 parses in this process, on the event loop.
+        """
+        self.pool_size = max(1, pool_size)
+        self.http2 = http2
+        self.keepalive_idle = keepalive_idle
+        self.page_concurrency = page_concurrency
+        self.rate_controller = rate_controller or AdaptiveRateController()
+        self.proxy_pool = proxy_pool or ProxyPool([])
+        self.identity_pool = identity_pool or IdentityPool([default_identity()])
+        if self.identity_pool.bootstrap is None:
+            self.identity_pool.bootstrap = self.bootstrap_identity
+        self.response_cache = response_cache if response_cache is not None and response_cache.enabled else None
+        self.parse_pool = ParsePool(parse_workers) if parse_workers > 0 else None
+        self.session: Optional[AsyncSession] = None
+
+    async def __aenter__(self) -> 'FlipkartReviewScraper':
+        self.open()
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    def open(self):
+        """Create the shared session. Must be called from a running event loop."""
+        if self.session is not None:
+            return
+        self.session = AsyncSession(
+            max_clients=self.pool_size,
+            impersonate="chrome110",
+            timeout=30,
+            # Cookies belong to identities, not to the shared session
+            discard_cookies=True,
+            http_version=CurlHttpVersion.V2TLS if self.http2 else CurlHttpVersion.V1_1,
+            curl_options={
+                CurlOpt.MAXCONNECTS: self.pool_size,
+                CurlOpt.TCP_KEEPALIVE: 1,
+                CurlOpt.TCP_KEEPIDLE: self.keepalive_idle,
+                # Wait for an HTTP/2 connection to multiplex on instead of opening another
+                CurlOpt.PIPEWAIT: 1 if self.http2 else 0,
+            },
+        )
+
+    async def close(self):
+        """Close the shared session and its connections, and stop the parse workers."""
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+        if self.parse_pool is not None:
+            await asyncio.to_thread(self.parse_pool.close)
+
+    async def bootstrap_identity(self, request_headers: Dict[str, str]) -> Dict[str, str]:
+        """
+        Obtain cookies for a new identity by loading the Flipkart home page without cookies.
+
+        Args:
+            request_headers: Headers the new identity will send
+
+        Returns:
+            Cookies set by Flipkart
+        """
+        self.open()
+        proxy = self.proxy_pool.checkout()
+        started = time.monotonic()
+        try:
+            response = await self.session.get(FLIPKART_HOME_URL, headers=request_headers,
+                                              proxy=proxy.url if proxy else None)
+        except requests.exceptions.RequestException as e:
+            self.proxy_pool.record_failure(proxy, type(e).__name__)
+            raise
+        except BaseException:
+            # Cancelled: the request was never judged, but the proxy is no longer in flight
+            self.proxy_pool.release(proxy)
+            raise
+        if response.status_code in THROTTLE_STATUS_CODES:
+            self.proxy_pool.record_block(proxy, f"HTTP {response.status_code} on home page")
+        else:
+            self.proxy_pool.record_success(proxy, time.monotonic() - started)
+        response.raise_for_status()
+        return dict(response.cookies)
+
+    async def _parse_page(self, html_content: str, keep_state: bool) -> Tuple[Optional[str], List[Review]]:
+        """Parse a fetched page, in the parse pool when there is one. Raises ValueError like parse_page."""
+        if self.parse_pool is None:
+            with metrics.timer('parse_page_seconds'):
+                state_json, reviews, fallback = extract_page(html_content)
+        else:
+            with metrics.timer('parse_pool_seconds'):
+                state_json, records, fallback = await self.parse_pool.run(parse_page, html_content, keep_state)
+            reviews = [Review(*record) for record in records]
+        if fallback:
+            metrics.inc('state_fallbacks_total', path=fallback)
+        return state_json, reviews
+
+    async def _parse_state(self, state_json) -> List[Review]:
+        """Extract reviews from cached page state, in the parse pool when there is one."""
+        if self.parse_pool is None:
+            with metrics.timer('extract_reviews_seconds'):
+                return extract_reviews_from_state(state_json)
+        with metrics.timer('parse_pool_seconds'):
+            records = await self.parse_pool.run(parse_state, state_json)
+        return [Review(*record) for record in records]
+
+    async def fetch_page(self, url: str, params: dict, page_num: int = None,
+                         on_state: Callable[[str], Any] = None) -> List[Review]:
+        """
+        Fetch one review page; see fetch_page_result.
+
+        Returns:
+            List of extracted reviews, empty when the page has none or could not be fetched
+        """
+        return (await self.fetch_page_result(url, params, page_num, on_state)).reviews
+
+    async def fetch_page_result(self, url: str, params: dict, page_num: int = None,
+                                on_state: Callable[[str], Any] = None) -> PageResult:
+        """
+        Fetch one review page through the shared session, paced by the rate controller.
+
+        Pages in the response cache are served from it without a request.
+
+        Each attempt uses the least busy identity from the identity pool and,
+        when a proxy pool is configured, the healthiest proxy; both are told
+        how the attempt went. Every response is classified (see
+        response_classifier), from its status code and cheap substring checks
+        before any parsing where possible, and handled accordingly:
+
+        - throttled (HTTP 429/503/529): lower the request rate, back off, retry
+        - blocked (HTTP 401/403, captcha page): count a block against the proxy,
+          lower the rate and retry with another identity; the stale one is refreshed
+        - stripped (page variant without state or review list): retry with another identity
+        - success, or empty (a complete page past the last review): return it
+
+        Connection errors are retried with a jittered back-off.
+
+        Args:
+            url: Product review URL
+            params: Request parameters
+            page_num: Optional page number for display
+            on_state: Called with the page's __INITIAL_STATE__ JSON text once the
+                page has been parsed, e.g. to read its pagination metadata
+
+        Returns:
+            PageResult; after MAX_RETRIES unusable responses its outcome is the last
+            one seen and it has no reviews
+        """
+        self.open()
+        page_info = f" (Page {page_num})" if page_num else ""
+
+        if self.response_cache is not None:
+            state_json = await self.response_cache.get(url, params)
+            metrics.inc('cache_lookups_total', result='miss' if state_json is None else 'hit')
+            if state_json is not None:
+                try:
+                    reviews = await self._parse_state(state_json)
+                    verdict = classify_reviews(state_json, len(reviews))
+                    if verdict.usable:
+                        if on_state:
+                            on_state(state_json)
+                        return PageResult(reviews, verdict.outcome)
+                    print(f"Ignoring cached page{page_info}: {verdict.reason}")
+                except ValueError as e:
+                    print(f"Ignoring unreadable cached page{page_info}: {e}")
+            if self.response_cache.replay:
+                print(f"  Not in response cache{page_info}, treating as empty (replay mode)")
+                return PageResult([], EMPTY, 'not in response cache')
+        max_retries = MAX_RETRIES
+        verdict = Classification(ERROR, 'not fetched')
+
+        for attempt in range(1, max_retries + 1):
+            # Set back to None once the proxy has been told how the attempt went
+            proxy = self.proxy_pool.checkout()
+            rate_controller = proxy.rate_controller if proxy else self.rate_controller
+            identity = None
+            identity_healthy = True
+            try:
+                identity = await self.identity_pool.checkout()
+                if attempt > 1:
+                    print(f"  Retry attempt {attempt}/{max_retries}{page_info}...")
+                    metrics.inc('retries_total')
+
+                with metrics.timer('rate_limit_wait_seconds'):
+                    await rate_controller.acquire()
+                started = time.monotonic()
+                response = await self.session.get(
+                    url,
+                    params=params,
+                    cookies=identity.cookies,
+                    headers=identity.headers,
+                    proxy=proxy.url if proxy else None,
+                )
+                latency = time.monotonic() - started
+                metrics.observe('fetch_seconds', latency)
+                metrics.inc('http_responses_total', status=response.status_code)
+
+                verdict = classify_status(response.status_code)
+                if verdict is None:
+                    response.raise_for_status()
+                    verdict = classify_html(response.text)
+                state_json, reviews = None, []
+                if verdict is None:
+                    try:
+                        state_json, reviews = await self._parse_page(
+                            response.text, keep_state=on_state is not None or self.response_cache is not None)
+                        verdict = classify_reviews(response.text, len(reviews))
+                    except ValueError as e:
+                        verdict = Classification(STRIPPED, f"unreadable page state: {e}")
+                metrics.inc('page_outcomes_total', outcome=verdict.outcome)
+
+                if verdict.outcome in (THROTTLED, BLOCKED):
+                    reason = f"{verdict.reason}{page_info}"
+                    had_proxy = proxy is not None
+                    self.proxy_pool.record_block(proxy, reason)
+                    proxy = None
+                    pause = rate_controller.record_throttle(reason, attempt)
+                    if verdict.outcome == BLOCKED:
+                        # The identity is burnt; the retry goes out with another one
+                        identity_healthy = False
+                    elif attempt < max_retries and (not had_proxy or len(self.proxy_pool) == 1):
+                        # With other proxies available, retry right away through another one
+                        await asyncio.sleep(pause)
+                    continue
+
+                self.proxy_pool.record_success(proxy, latency)
+                proxy = None
+                rate_controller.record_success()
+
+                if verdict.outcome == STRIPPED:
+                    # Flipkart served a minimal variant to this identity; it is refreshed if it keeps happening
+                    identity_healthy = False
+                    print(f"Stripped page variant{page_info} ({verdict.reason}), retrying with another identity")
+                    continue
+
+                if self.response_cache is not None:
+                    await self.response_cache.put(url, params, state_json)
+                if on_state:
+                    on_state(state_json)
+                self.identity_pool.release(identity, dict(response.cookies))
+                identity = None
+                metrics.inc('pages_total', result='reviews' if reviews else 'empty')
+                metrics.inc('reviews_extracted_total', len(reviews))
+                return PageResult(reviews, verdict.outcome, verdict.reason)
+
+            except (requests.exceptions.ProxyError, requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                self.proxy_pool.record_failure(proxy, type(e).__name__)
+                proxy = None
+                metrics.inc('request_errors_total', error=type(e).__name__)
+                verdict = Classification(ERROR, f"{type(e).__name__}: {e}")
+                print(f"Connection error{page_info} (attempt {attempt}/{max_retries}): {e}")
+                if attempt < max_retries:
+                    await asyncio.sleep(rate_controller.backoff_delay(attempt))
+            except requests.exceptions.RequestException as e:
+                self.proxy_pool.record_failure(proxy, type(e).__name__)
+                proxy = None
+                metrics.inc('request_errors_total', error=type(e).__name__)
+                print(f"Error fetching URL{page_info}: {e}")
+                return PageResult([], ERROR, str(e))
+            except Exception as e:
+                self.proxy_pool.record_failure(proxy, type(e).__name__)
+                proxy = None
+                print(f"Unexpected error{page_info}: {e}")
+                import traceback
+                traceback.print_exc()
+                return PageResult([], ERROR, str(e))
+            finally:
+                # Cancelled mid-attempt (early stop, shutdown): the proxy was never judged
+                self.proxy_pool.release(proxy)
+                if identity is not None:
+                    if identity_healthy:
+                        self.identity_pool.release(identity)
+                    else:
+                        await self.identity_pool.report_stale(identity, f"{verdict.outcome} response{page_info}")
+
+        print(f"Giving up{page_info} after {max_retries} attempts: {verdict.outcome} ({verdict.reason})")
+        metrics.inc('pages_total', result='failed')
+        return PageResult([], verdict.outcome, verdict.reason)
+
+    async def iter_review_pages(self, base_review_url: str, max_reviews: int = None,
+                                concurrency: int = None, start_page: int = 1, collected: int = 0,
+                                sort_order: str = None,
+                                on_pagination: Callable[[PaginationInfo], Any] = None,
+                                on_page_failed: Callable[[int, str], Any] = None,
+                                end_page: int = None
+                                ) -> AsyncIterator[Tuple[int, List[Review]]]:
+        """
+        Fetch review pages with up to `concurrency` requests in flight and yield them in page order.
+
+        Page 1 is fetched on its own first: its pagination widget says how many
+        pages there are, so the remaining pages can be planned (and clamped by
+        max_reviews). The plan is trusted: a single page past it is fetched to
+        confirm the end, and only if that page still has reviews does fetching
+        carry on until the first empty page. The empty-page rule still applies
+        when the state has no page count or overstates it.
+
+        Args:
+            base_review_url: Review URL without query parameters
+            max_reviews: Maximum number of reviews to yield. If None, yields all reviews.
+            concurrency: Number of pages fetched at the same time.
+                Defaults to the scraper's page_concurrency.
+            start_page: First page to fetch, when resuming an interrupted crawl
+            collected: Reviews already taken from the pages before start_page;
+                they count towards max_reviews
+            sort_order: Flipkart sortOrder parameter, e.g. SORT_MOST_RECENT.
+                If None, Flipkart's default order is used.
+            on_pagination: Called with the PaginationInfo read from page 1
+            on_page_failed: Called as on_page_failed(page, outcome) for each page skipped
+                because it could not be fetched, e.g. ('blocked')
+            end_page: Last page to fetch, when only a range of pages is wanted
+
+        Yields:
+            Tuples of (page number, non-empty list of reviews)
+        """
+        state = _PageWindow(max_reviews, max(1, concurrency or self.page_concurrency), start_page, collected)
+        state.on_failed = on_page_failed
+        if end_page:
+            state.last_page = min(state.last_page, end_page)
+
+        def page_params(page: int) -> Dict[str, str]:
             params = {'page': str(page)}
-            reviews = fetch_and_extract_reviews(base_review_url, params, page_num=page)
-
-            if reviews:
-                consecutive_empty_pages = 0
-
-                # Check if adding these reviews would exceed max_reviews
-                if max_reviews:
-                    remaining_slots = max_reviews - len(product_reviews)
-                    if remaining_slots <= 0:
-                        print(f"✓ Max reviews limit reached ({len(product_reviews)} reviews)")
-                        break
-                    elif len(reviews) > remaining_slots:
-                        # Only take the reviews we need to reach max_reviews
-                        reviews = reviews[:remaining_slots]
-                        product_reviews.extend(reviews)
-                        print(f"✓ {len(reviews)} reviews extracted (reached max limit of {max_reviews})")
+            if sort_order:
+                params['sortOrder'] = sort_order
+            return params
+
+        if start_page == 1:
+            first_page_states = []
+            result = await self.fetch_page_result(base_review_url, page_params(1), page_num=1,
+                                                  on_state=first_page_states.append)
+            info = PaginationInfo()
+            if first_page_states:
+                try:
+                    info = extract_pagination_info(json_backend.loads(first_page_states[0]))
+                except ValueError:
+                    pass
+            last_page = info.plan_pages(len(result.reviews), max_reviews)
+            if last_page:
+                print(f"  Planned {last_page} page(s) of {info.total_pages}")
+                state.planned_page = last_page
+            if on_pagination:
+                on_pagination(info)
+            state.next_page = 2
+            state.commit(1, result)
+
+        async def worker():
+            try:
+                while True:
+                    async with state.changed:
+                        await state.changed.wait_for(state.can_allocate)
+                        page = state.allocate()
+                    if page is None:
+                        return
+
+                    result = await self.fetch_page_result(base_review_url, page_params(page), page_num=page)
+
+                    async with state.changed:
+                        state.commit(page, result)
+                        state.changed.notify_all()
+            finally:
+                async with state.changed:
+                    state.active_workers -= 1
+                    state.changed.notify_all()
+
+        state.active_workers = state.window
+        workers = [asyncio.create_task(worker()) for _ in range(state.window)]
+        try:
+            while True:
+                async with state.changed:
+                    await state.changed.wait_for(state.can_consume)
+                    if not state.ready:
                         break
+                    page = state.ready.popleft()
+                    state.changed.notify_all()
+                yield page
+        finally:
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+    async def iter_product_reviews(self, product_url: str, max_reviews: int = None,
+                                   concurrency: int = None, start_page: int = 1, collected: int = 0,
+                                   on_page: Callable[[int, int], Any] = None, sort_order: str = None,
+                                   stop_at_review_ids: Set[str] = None,
+                                   on_pagination: Callable[[PaginationInfo], Any] = None,
+                                   review_url: str = None,
+                                   on_page_failed: Callable[[int, str], Any] = None,
+                                   end_page: int = None) -> AsyncIterator[Review]:
+        """
+        Stream reviews for a Flipkart product URL as each page arrives.
+
+        Only a window of pages is held in memory at any time, so callers that
+        consume reviews as they go keep memory flat regardless of review count.
+
+        Args:
+            product_url: Flipkart product URL
+            max_reviews: Maximum number of reviews to yield. If None, yields all reviews.
+            concurrency: Number of review pages fetched at the same time.
+                Defaults to the scraper's page_concurrency.
+            start_page: First page to fetch, when resuming an interrupted crawl
+            collected: Reviews already taken from the pages before start_page
+            on_page: Called as on_page(page, collected) once the caller has consumed
+                every review of a page; collected includes the earlier pages
+            sort_order: Flipkart sortOrder parameter, e.g. SORT_MOST_RECENT
+            stop_at_review_ids: IDs of reviews scraped before. Streaming stops at the
+                first of them, so with SORT_MOST_RECENT only new reviews are fetched.
+            on_pagination: Called with the page count, review count and rating
+                histogram read from page 1 (not called when resuming past page 1)
+            review_url: Canonical review URL, if the caller already derived it with
+                canonical_review_url; otherwise it is derived from product_url
+            on_page_failed: Called as on_page_failed(page, outcome) for each page
+                skipped because it could not be fetched
+            end_page: Last page to fetch; with start_page, limits the crawl to a
+                range of pages (as handed out by a distributed crawl's work queue)
+
+        Yields:
+            Reviews in page order
+
+        Raises:
+            ValueError: If the review URL cannot be built from product_url
+        """
+        concurrency = concurrency or self.page_concurrency
+        self.open()
+
+        print(f"\n{'='*80}")
+        print(f"Processing URL: {product_url}")
+        if max_reviews:
+            print(f"Max reviews limit: {max_reviews}")
+        else:
+            print(f"Max reviews limit: No limit (scraping all)")
+        print(f"Page concurrency: {concurrency}")
+        if stop_at_review_ids:
+            print(f"Incremental: stopping at the first of {len(stop_at_review_ids)} known reviews")
+        if end_page:
+            print(f"Pages {start_page} to {end_page}")
+        elif start_page > 1:
+            print(f"Resuming from page {start_page} ({collected} reviews already collected)")
+        print(f"{'='*80}")
+
+        # Build the review URL pages are fetched from (no query parameters)
+        base_review_url = review_url or canonical_review_url(product_url)[0]
+
+        if not base_review_url:
+            raise ValueError(f"Failed to extract product ID from URL: {product_url}")
+
+        print(f"Review URL: {base_review_url}")
+
+        review_count = 0
+        pages = self.iter_review_pages(base_review_url, max_reviews, concurrency, start_page, collected,
+                                       sort_order, on_pagination, on_page_failed, end_page)
+        try:
+            async for page, page_reviews in pages:
+                for review in page_reviews:
+                    if stop_at_review_ids and review.review_id in stop_at_review_ids:
+                        print(f"  Page {page}: reached already scraped review {review.review_id}, stopping")
+                        print(f"\n  Summary: {review_count} new reviews extracted")
+                        return
+                    review_count += 1
+                    yield review
+                if on_page:
+                    on_page(page, collected + review_count)
+        finally:
+            # Stop the page workers now rather than when the generator is garbage collected
+            await pages.aclose()
+
+        print(f"\n  Summary: {review_count} total reviews extracted")
+
+
+async def iter_product_reviews(product_url: str, max_reviews: int = None,
+                               concurrency: int = DEFAULT_PAGE_CONCURRENCY,
+                               scraper: FlipkartReviewScraper = None, sort_order: str = None,
+                               stop_at_review_ids: Set[str] = None,
+                               on_page_failed: Callable[[int, str], Any] = None) -> AsyncIterator[Review]:
+    """
+    Stream reviews for a Flipkart product URL as each page arrives.
 
-                product_reviews.extend(reviews)
-                print(f"✓ {len(reviews)} reviews extracted (total: {len(product_reviews)})")
-            else:
-                consecutive_empty_pages += 1
-                print(f"✗ No reviews")
+    Args:
+        product_url: Flipkart product URL
+        max_reviews: Maximum number of reviews to yield. If None, yields all reviews.
+        concurrency: Number of review pages fetched at the same time
+        scraper: Scraper whose session to reuse. If None, a temporary one is opened.
+        sort_order: Flipkart sortOrder parameter, e.g. SORT_MOST_RECENT
+        stop_at_review_ids: IDs of reviews scraped before; streaming stops at the first of them
+        on_page_failed: Called as on_page_failed(page, outcome) for each page that could not be fetched
+
+    Yields:
+        Reviews in page order
+
+    Raises:
+        ValueError: If the review URL cannot be built from product_url
+    """
+    options = dict(sort_order=sort_order, stop_at_review_ids=stop_at_review_ids, on_page_failed=on_page_failed)
+    if scraper is not None:
+        async for review in scraper.iter_product_reviews(product_url, max_reviews, concurrency, **options):
+            yield review
+        return
 
-                if consecutive_empty_pages >= max_consecutive_empty:
-                    print(f"\n  Stopping after {consecutive_empty_pages} consecutive empty pages")
-                    break
+    async with FlipkartReviewScraper(pool_size=concurrency, page_concurrency=concurrency) as scraper:
+        async for review in scraper.iter_product_reviews(product_url, max_reviews, concurrency, **options):
+            yield review
 
-            # Safety limit
-            if page >= 1000:
-                print(f"\n  Reached safety limit of 1000 pages")
-                break
 
-            page += 1
+async def scrape_product_reviews_async(product_url: str, max_reviews: int = None,
+                                       concurrency: int = DEFAULT_PAGE_CONCURRENCY,
+                                       scraper: FlipkartReviewScraper = None, sort_order: str = None,
+                                       stop_at_review_ids: Set[str] = None) -> Tuple[List[Review], int, bool]:
+    """
+    Scrape product reviews from a Flipkart URL, fetching several pages concurrently.
 
-            # Delay between requests
-            if reviews:
-                delay = 2.5
-                time.sleep(delay)
+    Args:
+        product_url: Flipkart product URL
+        max_reviews: Maximum number of reviews to scrape. If None, scrapes all reviews.
+        concurrency: Number of review pages fetched at the same time
+        scraper: Scraper whose session to reuse. If None, a temporary one is opened.
+        sort_order: Flipkart sortOrder parameter, e.g. SORT_MOST_RECENT
+        stop_at_review_ids: IDs of reviews scraped before; scraping stops at the first of them
 
-        print(f"\n  Summary: {len(product_reviews)} total reviews extracted")
+    Returns:
+        Tuple of (reviews_list, review_count, success). success is False when no
+        review was scraped and pages were skipped as blocked, throttled or failed.
+    """
+    try:
+        failed_pages = []
+        product_reviews = [
+            review async for review in iter_product_reviews(
+                product_url, max_reviews, concurrency, scraper, sort_order, stop_at_review_ids,
+                on_page_failed=lambda page, outcome: failed_pages.append((page, outcome)))
+        ]
+        if not product_reviews and failed_pages:
+            print(f"✗ No review page could be fetched: {failed_pages}")
+            return ([], 0, False)
         return (product_reviews, len(product_reviews), True)
 
+    except ValueError as e:
+        print(f"✗ {e}")
+        return ([], 0, False)
     except Exception as e:
         print(f"\n✗ Error scraping product: {e}")
         import traceback
         traceback.print_exc()
         return ([], 0, False)
+
+
+def scrape_product_reviews_wrapper(product_url: str, max_reviews: int = None,
+                                   concurrency: int = DEFAULT_PAGE_CONCURRENCY, sort_order: str = None,
+                                   stop_at_review_ids: Set[str] = None) -> Tuple[List[Review], int, bool]:
+    """
+    Wrapper function to scrape product reviews from a Flipkart URL.
+
+    Blocking entry point for scripts; runs scrape_product_reviews_async on a
+    fresh event loop. Async callers should await scrape_product_reviews_async.
+
+    Args:
+        product_url: Flipkart product URL
+        max_reviews: Maximum number of reviews to scrape. If None, scrapes all reviews.
+        concurrency: Number of review pages fetched at the same time
+        sort_order: Flipkart sortOrder parameter, e.g. SORT_MOST_RECENT
+        stop_at_review_ids: IDs of reviews scraped before; scraping stops at the first of them
+
+    Returns:
+        Tuple of (reviews_list, review_count, success)
+    """
+    return asyncio.run(scrape_product_reviews_async(product_url, max_reviews, concurrency, None,
+                                                    sort_order, stop_at_review_ids))
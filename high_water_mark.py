@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+High-water marks - the newest reviews seen per product, for incremental scraping
+"""
+
+import asyncio
+import time
+from typing import Any, Dict, List, Optional, Set
+
+HIGH_WATER_MARKS_KEY = 'HIGH_WATER_MARKS'
+# More than one ID per product, so a newest review that gets deleted doesn't
+# make the next run walk every page again
+KNOWN_IDS_PER_PRODUCT = 20
+
+
+class HighWaterMarks:
+    """
+    The newest review IDs seen for each product ID, kept in a key-value store.
+
+    Products whose URL has no pid are keyed by their canonical review URL instead.
+
+    In incremental mode reviews are fetched newest first, and a product's
+    crawl stops at the first review whose ID is recorded here.
+
+    The store is shared by every run, including the workers of a distributed
+    crawl, so save() re-reads it and writes back only the products this run
+    updated, merged into what the other runs saved meanwhile.
+
+    Usage:
+        marks = await HighWaterMarks.load(store)
+        known = marks.known_review_ids(pid)
+        ... scrape until a known review, collecting new IDs newest first ...
+        marks.update(pid, new_ids, newest_created_date)
+        await marks.save()
+    """
+
+    def __init__(self, store, marks: Dict[str, Dict[str, Any]] = None, key: str = HIGH_WATER_MARKS_KEY):
+        """
+        Args:
+            store: Key-value store the marks are loaded from and saved to
+            marks: Marks by product ID, as stored
+            key: Record key in the store
+        """
+        self.store = store
+        self.marks = marks or {}
+        self.key = key
+        self._updated: Set[str] = set()  # products updated since the last save
+        self._lock = asyncio.Lock()
+
+    @classmethod
+    async def load(cls, store, key: str = HIGH_WATER_MARKS_KEY) -> 'HighWaterMarks':
+        return cls(store, await store.get_value(key) or {}, key=key)
+
+    def known_review_ids(self, pid: str) -> Set[str]:
+        """IDs of the newest reviews scraped for pid in earlier runs."""
+        return set(self.marks.get(pid, {}).get('review_ids') or [])
+
+    def get(self, pid: str) -> Optional[Dict[str, Any]]:
+        return self.marks.get(pid)
+
+    def update(self, pid: str, new_review_ids: List[str], newest_created_date: str = None):
+        """
+        Record the reviews scraped for pid in this run.
+
+        Args:
+            pid: Flipkart product ID (or canonical review URL, for URLs without one)
+            new_review_ids: IDs of the new reviews, newest first
+            newest_created_date: created_date of the newest new review
+        """
+        if not pid or not new_review_ids:
+            return
+        previous = self.marks.get(pid, {})
+        review_ids = list(dict.fromkeys(new_review_ids + (previous.get('review_ids') or [])))
+        self.marks[pid] = {
+            'review_id': review_ids[0],
+            'created_date': newest_created_date or previous.get('created_date'),
+            'review_ids': review_ids[:KNOWN_IDS_PER_PRODUCT],
+            'updated_at': time.time(),
+        }
+        self._updated.add(pid)
+
+    async def save(self):
+        """Merge this run's updates into the stored marks and save them."""
+        async with self._lock:
+            stored = await self.store.get_value(self.key) or {}
+            for pid in self._updated:
+                mark = self.marks[pid]
+                other_ids = (stored.get(pid) or {}).get('review_ids') or []
+                review_ids = list(dict.fromkeys(mark['review_ids'] + other_ids))
+                stored[pid] = {**mark, 'review_ids': review_ids[:KNOWN_IDS_PER_PRODUCT]}
+            self._updated = set()
+            self.marks = stored
+            await self.store.set_value(self.key, stored)
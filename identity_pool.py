@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Identity pool - rotating cookie/header identities with automatic refresh
+"""
+
+import asyncio
+import base64
+import json
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+DEFAULT_POOL_SIZE = 5
+# Refresh a little before the `at` token expires rather than after
+EXPIRY_MARGIN_SECONDS = 300
+# Consecutive stale signals after which an identity is replaced
+STALE_THRESHOLD = 2
+# Wait this long before retrying a failed refresh of the same identity
+REFRESH_RETRY_SECONDS = 60
+
+
+def token_expiry(cookies: Dict[str, str]) -> Optional[float]:
+    """
+    Read the expiry time of Flipkart's `at` access token.
+
+    Args:
+        cookies: Cookie dictionary
+
+    Returns:
+        Expiry as a Unix timestamp, or None if there is no readable token
+    """
+    token = cookies.get('at', '')
+    parts = token.split('.')
+    if len(parts) != 3:
+        return None
+    try:
+        payload = parts[1] + '=' * (-len(parts[1]) % 4)
+        return float(json.loads(base64.urlsafe_b64decode(payload))['exp'])
+    except (ValueError, KeyError, TypeError):
+        return None
+
+
+@dataclass
+class Identity:
+    """One browser identity: the cookies Flipkart issued to it plus its request headers."""
+    cookies: Dict[str, str]
+    headers: Dict[str, str]
+    id: str = field(default_factory=lambda: uuid.uuid4().hex[:8])
+    created_at: float = field(default_factory=time.time)
+    requests: int = 0
+    in_flight: int = 0
+    consecutive_stale: int = 0
+    retry_refresh_at: float = 0.0
+
+    @property
+    def expires_at(self) -> Optional[float]:
+        return token_expiry(self.cookies)
+
+    def is_expired(self, now: float = None) -> bool:
+        expires_at = self.expires_at
+        return expires_at is not None and (now or time.time()) >= expires_at - EXPIRY_MARGIN_SECONDS
+
+    def update_cookies(self, new_cookies: Dict[str, str]):
+        """Fold Set-Cookie values from a response into the identity."""
+        if new_cookies:
+            self.cookies.update(new_cookies)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'id': self.id, 'cookies': self.cookies, 'headers': self.headers, 'created_at': self.created_at}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'Identity':
+        return cls(cookies=dict(data['cookies']), headers=dict(data['headers']),
+                   id=data.get('id') or uuid.uuid4().hex[:8], created_at=data.get('created_at') or time.time())
+
+
+# Returns fresh cookies for a new identity, e.g. by loading the Flipkart home page
+BootstrapFunc = Callable[[Dict[str, str]], Awaitable[Dict[str, str]]]
+
+
+class IdentityPool:
+    """
+    Spreads concurrent requests over several cookie/header identities.
+
+    Identities are bootstrapped by a caller-supplied coroutine (normally a
+    visit to the Flipkart home page), checked out least-busy first, and
+    replaced when their `at` token is about to expire or when requests made
+    with them keep coming back stale. snapshot()/from_snapshot() let the
+    caller persist the pool between runs.
+    """
+
+    def __init__(self, identities: List[Identity], bootstrap: Optional[BootstrapFunc] = None,
+                 size: int = DEFAULT_POOL_SIZE):
+        """
+        Args:
+            identities: Initial identities (seed cookies, or a persisted snapshot)
+            bootstrap: Coroutine taking request headers and returning fresh cookies.
+                Without it, identities are never refreshed.
+            size: Number of identities fill() brings the pool up to
+        """
+        self.identities = list(identities)
+        self.bootstrap = bootstrap
+        self.size = max(1, size)
+        self._refreshing: Dict[str, asyncio.Task] = {}
+        self.refreshes = 0
+
+    def __len__(self) -> int:
+        return len(self.identities)
+
+    @classmethod
+    def from_snapshot(cls, snapshot: Optional[List[Dict[str, Any]]], seed: Identity,
+                      bootstrap: Optional[BootstrapFunc] = None, size: int = DEFAULT_POOL_SIZE) -> 'IdentityPool':
+        """
+        Build a pool from persisted identities, falling back to the seed identity.
+
+        Expired identities in the snapshot are dropped.
+        """
+        identities = [Identity.from_dict(data) for data in snapshot or []]
+        identities = [identity for identity in identities if not identity.is_expired()]
+        return cls(identities or [seed], bootstrap=bootstrap, size=size)
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """Serialisable copy of every identity, for the key-value store."""
+        return [identity.to_dict() for identity in self.identities]
+
+    async def fill(self):
+        """Bootstrap new identities until the pool reaches its configured size."""
+        if not self.bootstrap or len(self.identities) >= self.size:
+            return
+        template = self.identities[0].headers if self.identities else {}
+        results = await asyncio.gather(
+            *(self._new_identity(template) for _ in range(self.size - len(self.identities))),
+            return_exceptions=True
+        )
+        for result in results:
+            if isinstance(result, Identity):
+                self.identities.append(result)
+            else:
+                print(f"Could not bootstrap identity: {result}")
+        print(f"Identity pool: {len(self.identities)} identities")
+
+    async def checkout(self) -> Identity:
+        """
+        Pick the least busy identity, refreshing it first if its token has expired.
+
+        The caller must hand it back with release().
+        """
+        identity = min(self.identities, key=lambda candidate: (candidate.in_flight, candidate.requests))
+        if identity.is_expired() and self._can_refresh(identity):
+            identity = await self.refresh(identity, 'access token expired')
+        identity.in_flight += 1
+        identity.requests += 1
+        return identity
+
+    def release(self, identity: Identity, response_cookies: Dict[str, str] = None):
+        """Return an identity after a healthy response, keeping any cookies it was sent."""
+        identity.in_flight -= 1
+        identity.consecutive_stale = 0
+        identity.update_cookies(response_cookies)
+
+    async def report_stale(self, identity: Identity, reason: str):
+        """
+        Return an identity whose request looked like it was made with stale cookies.
+
+        After STALE_THRESHOLD consecutive stale responses the identity is replaced.
+        """
+        identity.in_flight -= 1
+        identity.consecutive_stale += 1
+        if identity.consecutive_stale >= STALE_THRESHOLD and self._can_refresh(identity):
+            await self.refresh(identity, reason)
+
+    def _can_refresh(self, identity: Identity) -> bool:
+        return self.bootstrap is not None and time.time() >= identity.retry_refresh_at
+
+    async def refresh(self, identity: Identity, reason: str) -> Identity:
+        """
+        Replace an identity with a freshly bootstrapped one.
+
+        Concurrent refreshes of the same identity share one bootstrap request.
+        If bootstrapping fails, the old identity is kept.
+
+        Returns:
+            The identity now in the old one's place
+        """
+        task = self._refreshing.get(identity.id)
+        if task is None:
+            task = asyncio.ensure_future(self._replace(identity, reason))
+            self._refreshing[identity.id] = task
+        return await asyncio.shield(task)
+
+    async def _replace(self, identity: Identity, reason: str) -> Identity:
+        try:
+            fresh = await self._new_identity(identity.headers)
+        except Exception as e:
+            print(f"Identity {identity.id} refresh failed ({reason}): {e}")
+            identity.consecutive_stale = 0
+            identity.retry_refresh_at = time.time() + REFRESH_RETRY_SECONDS
+            return identity
+        finally:
+            self._refreshing.pop(identity.id, None)
+
+        for index, current in enumerate(self.identities):
+            if current is identity:
+                self.identities[index] = fresh
+        self.refreshes += 1
+        print(f"Identity {identity.id} replaced by {fresh.id} ({reason})")
+        return fresh
+
+    async def _new_identity(self, headers: Dict[str, str]) -> Identity:
+        new_cookies = await self.bootstrap(headers)
+        if not new_cookies:
+            raise ValueError("bootstrap returned no cookies")
+        return Identity(cookies=dict(new_cookies), headers=dict(headers))
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Pluggable JSON backend - uses orjson or msgspec when installed, stdlib json otherwise
+"""
+
+import json
+import os
+from typing import Any, Callable, Dict, List, Optional
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:  # optional dependency
+    msgspec = None
+
+
+def _stdlib_dumps(obj: Any) -> bytes:
+    return json.dumps(obj, ensure_ascii=False).encode('utf-8')
+
+
+_BACKENDS: Dict[str, Dict[str, Callable]] = {
+    'json': {'loads': json.loads, 'dumps': _stdlib_dumps},
+}
+if orjson is not None:
+    _BACKENDS['orjson'] = {'loads': orjson.loads, 'dumps': orjson.dumps}
+if msgspec is not None:
+    _BACKENDS['msgspec'] = {'loads': msgspec.json.decode, 'dumps': msgspec.json.encode}
+
+BACKEND = 'json'
+loads: Callable[[Any], Any] = json.loads
+dumps: Callable[[Any], bytes] = _stdlib_dumps
+
+
+def available_backends() -> List[str]:
+    """Names of the JSON backends that can be used in this environment."""
+    return list(_BACKENDS)
+
+
+def set_backend(name: Optional[str] = None) -> str:
+    """
+    Select the JSON backend used by loads() and dumps().
+
+    Decode errors from every backend are ValueError subclasses, so callers
+    handle them the same way regardless of the backend.
+
+    Args:
+        name: 'orjson', 'msgspec' or 'json'. If None, picks the fastest installed one.
+
+    Returns:
+        Name of the selected backend
+    """
+    global BACKEND, loads, dumps
+
+    if name is None:
+        name = next(candidate for candidate in ('orjson', 'msgspec', 'json') if candidate in _BACKENDS)
+    if name not in _BACKENDS:
+        raise ValueError(f"JSON backend '{name}' is not available (installed: {', '.join(_BACKENDS)})")
+
+    BACKEND = name
+    loads = _BACKENDS[name]['loads']
+    dumps = _BACKENDS[name]['dumps']
+    return name
+
+
+set_backend(os.getenv('JSON_BACKEND') or None)
+
+
+# =========================
+# Typed review decoder (msgspec)
+# =========================
+if msgspec is not None:
+    UNSET = msgspec.UNSET
+
+    class _ReviewValue(msgspec.Struct):
+        """Only the ProductReviewValue fields extract_review_details reads."""
+        type: Any = UNSET
+        id: Any = UNSET
+        author: Any = UNSET
+        certifiedBuyer: Any = UNSET
+        created: Any = UNSET
+        rating: Any = UNSET
+        title: Any = UNSET
+        text: Any = UNSET
+        helpfulCount: Any = UNSET
+        location: Any = UNSET
+        productAttributeList: Any = UNSET
+        images: Any = UNSET
+        upvote: Any = UNSET
+        downvote: Any = UNSET
+        reviewPropertyMap: Any = UNSET
+
+    class _Component(msgspec.Struct):
+        # Non-review components carry unrelated payloads here; keep them undecoded
+        value: msgspec.Raw = msgspec.Raw(b'null')
+        tracking: Any = UNSET
+
+    class _WidgetData(msgspec.Struct):
+        renderableComponents: Optional[List[_Component]] = None
+
+    class _Widget(msgspec.Struct):
+        data: Optional[_WidgetData] = None
+
+    class _Slot(msgspec.Struct):
+        widget: Optional[_Widget] = None
+
+    class _Page(msgspec.Struct):
+        data: Optional[Dict[str, List[_Slot]]] = None
+
+    class _PageData(msgspec.Struct):
+        page: Optional[_Page] = None
+
+    class _State(msgspec.Struct):
+        pageDataV4: Optional[_PageData] = None
+
+    _state_decoder = msgspec.json.Decoder(_State)
+    _review_value_decoder = msgspec.json.Decoder(_ReviewValue)
+    _tracking_fields = ('position', 'reviewLanguage')
+
+    def _struct_to_dict(struct) -> Dict[str, Any]:
+        return {
+            field: getattr(struct, field)
+            for field in struct.__struct_fields__
+            if getattr(struct, field) is not UNSET
+        }
+
+
+def decode_review_components(state_json) -> Optional[List[Dict[str, Any]]]:
+    """
+    Decode only the review components from an __INITIAL_STATE__ JSON string.
+
+    Navigation, SEO, ads and other widgets' payloads are skipped without
+    being turned into Python objects. Requires msgspec.
+
+    Args:
+        state_json: JSON text (str or bytes) of the __INITIAL_STATE__ object
+
+    Returns:
+        List of component dictionaries shaped like the generic parser's output,
+        or None when msgspec is unavailable or the page layout doesn't match
+    """
+    if msgspec is None:
+        return None
+
+    try:
+        state = _state_decoder.decode(state_json)
+    except msgspec.DecodeError:
+        return None
+
+    page = state.pageDataV4.page if state.pageDataV4 else None
+    if not page or not page.data:
+        return None
+
+    components = []
+    for slots in page.data.values():
+        for slot in slots:
+            widget_data = slot.widget.data if slot.widget else None
+            if not widget_data or not widget_data.renderableComponents:
+                continue
+            for component in widget_data.renderableComponents:
+                try:
+                    value = _review_value_decoder.decode(component.value)
+                except msgspec.ValidationError:
+                    continue
+                if value.type != 'ProductReviewValue':
+                    continue
+                tracking = component.tracking if isinstance(component.tracking, dict) else {}
+                components.append({
+                    'value': _struct_to_dict(value),
+                    'tracking': {key: tracking[key] for key in _tracking_fields if key in tracking},
+                })
+
+    return components or None
@@ -3,11 +3,148 @@
 Apify Actor entry point for Flipkart Review Scraper
 """
 
+import asyncio
+import os
+import re
+import tempfile
+import time
+from typing import List, Optional, Tuple
+
+import json_backend
 from apify import Actor
+from apify_shared.consts import ActorEventTypes
+from checkpoint import CrawlCheckpoint, ProductProgress
+from dataset_writer import DEFAULT_BATCH_SIZE, DatasetWriter
 from flipkart_scraper_apify import (
-    extract_product_id_from_url,
-    scrape_product_reviews_wrapper
+    DEFAULT_PAGE_CONCURRENCY,
+    SORT_MOST_RECENT,
+    FlipkartReviewScraper,
+    default_identity,
+    extract_pagination_info
+)
+from high_water_mark import KNOWN_IDS_PER_PRODUCT, HighWaterMarks
+from identity_pool import DEFAULT_POOL_SIZE as DEFAULT_SESSION_POOL_SIZE, IdentityPool
+from metrics import metrics
+from proxy_pool import ProxyPool, proxy_urls_from_env
+from rate_controller import DEFAULT_MAX_RATE, AdaptiveRateController
+from response_cache import (
+    CACHE_OFF,
+    CACHE_REPLAY,
+    DEFAULT_MAX_BYTES as DEFAULT_CACHE_MAX_BYTES,
+    DEFAULT_TTL_SECONDS as DEFAULT_CACHE_TTL_SECONDS,
+    ResponseCache
 )
+from review_dedup import DEDUP_EXACT, ReviewDeduplicator
+from review_export import ReviewExporter
+from url_planner import ProductTarget, plan_products
+from work_queue import default_owner, holding_lease, merge_item_results, open_work_queue, plan_work_items
+
+DEFAULT_PRODUCT_CONCURRENCY = 3
+DEFAULT_APIFY_PROXY_SESSIONS = 10
+SESSION_POOL_KEY = 'SESSION_POOL'
+# Named store, unlike the run's default one, survives between runs
+STATE_STORE_NAME = 'flipkart-review-scraper-state'
+METRICS_KEY = 'METRICS'
+METRICS_PROMETHEUS_KEY = 'METRICS_PROMETHEUS'
+METRICS_OFF = 'off'
+METRICS_JSON = 'json'
+METRICS_PROMETHEUS = 'prometheus'
+EXPORT_TO_KEY_VALUE_STORE = 'key_value_store'
+EXPORT_TO_DISK = 'local'
+EXPORT_CONTENT_TYPES = {'.parquet': 'application/vnd.apache.parquet', '.zst': 'application/zstd',
+                        '.gz': 'application/gzip'}
+_INVALID_KEY_CHARS = re.compile(r"[^A-Za-z0-9!\-_.'()]")
+CRAWL_SINGLE = 'single'
+CRAWL_COORDINATOR = 'coordinator'
+CRAWL_WORKER = 'worker'
+WORK_QUEUE_PREFIX = 'flipkart-review-work'
+WORK_POLL_SECONDS = 10  # how often idle workers look for expired leases
+
+
+async def load_proxy_urls(actor_input: dict) -> list:
+    """
+    Collect proxy URLs from the actor input and the environment.
+
+    Accepts the Apify proxy editor format (`useApifyProxy`, `apifyProxyGroups`,
+    `proxyUrls`), the legacy `{"http": ..., "https": ...}` object and the
+    `use_apify_proxy` checkbox. Apify Proxy contributes one sticky session
+    URL per `apify_proxy_sessions`, so each pool entry is a distinct IP.
+    """
+    urls = proxy_urls_from_env()
+    proxy_input = dict(actor_input.get('proxy_configuration') or {})
+
+    urls.extend(proxy_input.get('proxyUrls') or [])
+    urls.extend(proxy_input[key] for key in ('http', 'https') if proxy_input.get(key))
+
+    if actor_input.get('use_apify_proxy'):
+        proxy_input['useApifyProxy'] = True
+
+    if proxy_input.get('useApifyProxy'):
+        proxy_configuration = await Actor.create_proxy_configuration(actor_proxy_input={
+            key: value for key, value in proxy_input.items() if key not in ('http', 'https', 'proxyUrls')
+        })
+        if proxy_configuration:
+            session_count = actor_input.get('apify_proxy_sessions') or DEFAULT_APIFY_PROXY_SESSIONS
+            for session_index in range(session_count):
+                urls.append(await proxy_configuration.new_url(session_id=f'flipkart_{session_index}'))
+
+    return list(dict.fromkeys(urls))
+
+
+async def save_metrics(run_stats: dict, metrics_format: str):
+    """
+    Store the metrics in the run's key-value store.
+
+    METRICS holds the counters and histograms plus run_stats as JSON; with
+    the Prometheus format, METRICS_PROMETHEUS also gets the text exposition.
+    """
+    await Actor.set_value(METRICS_KEY, {**metrics.snapshot(), **run_stats})
+    if metrics_format == METRICS_PROMETHEUS:
+        await Actor.set_value(METRICS_PROMETHEUS_KEY, metrics.to_prometheus(),
+                              content_type='text/plain; version=0.0.4')
+
+
+async def plan_page_count(scraper: FlipkartReviewScraper, target: ProductTarget,
+                          max_reviews: Optional[int]) -> Tuple[Optional[int], int]:
+    """
+    Fetch a product's first review page to learn how many pages to split into work items.
+
+    Returns:
+        Tuple of (pages to scrape or None if unknown, reviews on the first page)
+    """
+    states = []
+    result = await scraper.fetch_page_result(target.review_url, {'page': '1'}, page_num=1, on_state=states.append)
+    if not states:
+        return None, 0
+    try:
+        info = extract_pagination_info(json_backend.loads(states[0]))
+    except ValueError:
+        return None, 0
+    return info.plan_pages(len(result.reviews), max_reviews), len(result.reviews)
+
+
+async def upload_export_files(paths: List[str], root: str) -> List[str]:
+    """
+    Move export files into the run's key-value store.
+
+    Args:
+        paths: Closed export files
+        root: Export directory; the key is the path below it, e.g.
+            EXPORT-parquet-product_id_MOBXYZ-part-00000.parquet
+
+    Returns:
+        Keys of the stored records
+    """
+    keys = []
+    for path in paths:
+        key = _INVALID_KEY_CHARS.sub('_', 'EXPORT-' + os.path.relpath(path, root).replace(os.sep, '-'))
+        content_type = EXPORT_CONTENT_TYPES.get(os.path.splitext(path)[1], 'application/octet-stream')
+        with open(path, 'rb') as f:
+            data = await asyncio.to_thread(f.read)
+        await Actor.set_value(key, data, content_type=content_type)
+        os.remove(path)
+        keys.append(key)
+    return keys
 
 
 async def main():
@@ -21,14 +158,42 @@ async def main():
 
         flipkart_urls = actor_input.get('flipkart_urls', [])
         max_reviews = actor_input.get('max_reviews', 0)
+        max_concurrent_pages = actor_input.get('max_concurrent_pages') or DEFAULT_PAGE_CONCURRENCY
+        max_concurrent_products = actor_input.get('max_concurrent_products') or DEFAULT_PRODUCT_CONCURRENCY
+        parse_workers = actor_input.get('parse_workers') or 0
+        push_batch_size = actor_input.get('push_batch_size') or DEFAULT_BATCH_SIZE
+        max_request_rate = actor_input.get('max_request_rate') or DEFAULT_MAX_RATE
+        session_pool_size = actor_input.get('session_pool_size') or DEFAULT_SESSION_POOL_SIZE
+        incremental = bool(actor_input.get('incremental'))
+        cache_mode = actor_input.get('response_cache') or CACHE_OFF
+        dedup_mode = actor_input.get('review_dedup') or DEDUP_EXACT
+        metrics_format = actor_input.get('metrics') or METRICS_JSON
+        export_formats = actor_input.get('export_formats') or []
+        export_destination = actor_input.get('export_destination') or EXPORT_TO_KEY_VALUE_STORE
+        crawl_mode = actor_input.get('crawl_mode') or CRAWL_SINGLE
+        queue_name = actor_input.get('work_queue') or f'{WORK_QUEUE_PREFIX}-{Actor.config.actor_run_id or "local"}'
+        pages_per_work_item = actor_input.get('pages_per_work_item') or 0
+        worker_runs = actor_input.get('worker_runs') or 0
+        metrics.enable(metrics_format != METRICS_OFF)
+        cache_ttl_hours = actor_input.get('response_cache_ttl_hours') or DEFAULT_CACHE_TTL_SECONDS / 3600
+        cache_max_mb = actor_input.get('response_cache_max_mb') or DEFAULT_CACHE_MAX_BYTES // (1024 * 1024)
 
-        # Validate input
-        if not flipkart_urls or len(flipkart_urls) == 0:
+        # Validate input; workers take their products from the work queue instead
+        if crawl_mode == CRAWL_WORKER:
+            if not actor_input.get('work_queue'):
+                Actor.log.error('Missing required input for worker runs: work_queue')
+                await Actor.fail(status_message='Missing required input: work_queue (the coordinator\'s queue name)')
+                return
+            flipkart_urls = []
+        elif not flipkart_urls or len(flipkart_urls) == 0:
             Actor.log.error('Missing required input: flipkart_urls')
-            await Actor.fail('Missing required input: flipkart_urls (must provide at least one URL)')
+            await Actor.fail(status_message='Missing required input: flipkart_urls (must provide at least one URL)')
             return
 
-        Actor.log.info(f'Starting scraper for {len(flipkart_urls)} URL(s)')
+        if crawl_mode == CRAWL_WORKER:
+            Actor.log.info(f'Starting worker for work queue {queue_name}')
+        else:
+            Actor.log.info(f'Starting scraper for {len(flipkart_urls)} URL(s)')
 
         # Set max_reviews to None if 0 or not set (scrape all)
         max_reviews_param = None if max_reviews == 0 else max_reviews
@@ -38,79 +203,449 @@ async def main():
         else:
             Actor.log.info('Max reviews limit: No limit (scraping all)')
 
+        Actor.log.info(f'Concurrent pages per product: {max_concurrent_pages}')
+        Actor.log.info(f'Concurrent products: {max_concurrent_products}')
+        if parse_workers:
+            Actor.log.info(f'Parser processes: {parse_workers}')
+        Actor.log.info(f'Max request rate: {max_request_rate} req/s (adaptive)')
+        if incremental:
+            Actor.log.info('Incremental mode: newest reviews first, stopping at the last scraped one')
+
+        # Every proxy gets its own adaptive rate limit, so throughput scales with the pool
+        proxy_pool = ProxyPool(
+            await load_proxy_urls(actor_input),
+            rate_controller_factory=lambda: AdaptiveRateController(max_rate=max_request_rate)
+        )
+        if len(proxy_pool):
+            Actor.log.info(f'Proxy pool: {len(proxy_pool)} proxies')
+        else:
+            Actor.log.info('Proxy pool: none configured, connecting directly')
+
+        # Reuse the cookies earlier runs were issued; the built-in ones seed an empty store
+        state_store = await Actor.open_key_value_store(name=STATE_STORE_NAME)
+        identity_pool = IdentityPool.from_snapshot(
+            await state_store.get_value(SESSION_POOL_KEY),
+            seed=default_identity(),
+            size=session_pool_size
+        )
+        # The store is shared by every run. The workers of a distributed crawl would overwrite
+        # each other's session pool, so only the coordinator (or a single run) saves it;
+        # high-water marks are merged into the stored ones on save instead
+        persist_sessions = crawl_mode != CRAWL_WORKER
+        high_water_marks = await HighWaterMarks.load(state_store)
+
+        # Local disk cache of fetched pages; replay mode re-runs a batch without network access
+        response_cache = ResponseCache(
+            os.getenv('RESPONSE_CACHE_DIR') or os.path.join(os.getenv('APIFY_LOCAL_STORAGE_DIR') or 'storage',
+                                                            'response_cache'),
+            mode=cache_mode,
+            ttl=cache_ttl_hours * 3600,
+            max_bytes=cache_max_mb * 1024 * 1024
+        )
+        if response_cache.enabled:
+            Actor.log.info(f'Response cache: {cache_mode} mode, {len(response_cache)} cached page(s) '
+                           f'in {response_cache.directory}')
+
+        # Streaming file export, partitioned by product; files of finished products
+        # are moved to the key-value store unless they should stay on local disk
+        exporter = None
+        export_keys = []
+        if export_formats:
+            if export_destination == EXPORT_TO_DISK:
+                export_dir = os.getenv('EXPORT_DIR') or os.path.join(
+                    os.getenv('APIFY_LOCAL_STORAGE_DIR') or 'storage', 'exports')
+            else:
+                export_dir = tempfile.mkdtemp(prefix='review-export-')
+            try:
+                exporter = ReviewExporter(export_dir, export_formats)
+            except ValueError as e:
+                await Actor.fail(status_message=str(e))
+                return
+            Actor.log.info(f'Exporting reviews as {", ".join(exporter.formats)} to '
+                           + (export_dir if export_destination == EXPORT_TO_DISK else 'the key-value store'))
+
+        async def finish_export(pid: str, paths: List[str] = None):
+            """Close a product's export files and move them to the key-value store if needed."""
+            try:
+                if paths is None:
+                    paths = await exporter.close_partition(pid)
+                if export_destination != EXPORT_TO_DISK:
+                    export_keys.extend(await upload_export_files(paths, exporter.directory))
+            except Exception as e:
+                Actor.log.warning(f'Exporting the reviews of product {pid} failed: {e}')
+
         # Store all summaries and results
         all_summaries = []
-        all_reviews = []
         total_reviews_scraped = 0
         successful_urls = 0
         failed_urls = []
 
-        # Process each URL
-        for idx, flipkart_url in enumerate(flipkart_urls, 1):
-            Actor.log.info(f'\n{"="*60}')
-            Actor.log.info(f'Processing URL {idx}/{len(flipkart_urls)}: {flipkart_url}')
-            Actor.log.info(f'{"="*60}')
+        rate_controller = AdaptiveRateController(max_rate=max_request_rate)
 
-            # Validate URL format
-            review_url, pid, lid = extract_product_id_from_url(flipkart_url)
+        # Variant listings of one product share reviews; push each review once per run
+        dedup = ReviewDeduplicator(dedup_mode)
 
-            if not review_url:
-                error_msg = f'Invalid Flipkart Product URL (missing /p/): {flipkart_url}'
-                Actor.log.error(error_msg)
-                failed_urls.append({'url': flipkart_url, 'error': 'Invalid URL format'})
-                continue
+        # Limits how many products are scraped at the same time
+        product_slots = asyncio.Semaphore(max_concurrent_products)
 
-            Actor.log.info(f'Product ID: {pid}')
-            Actor.log.info(f'Review URL: {review_url}')
+        # Canonicalise every URL up front; URLs that resolve to the same review pages are scraped once
+        targets, invalid_urls = plan_products(flipkart_urls)
+        for idx, flipkart_url in invalid_urls:
+            Actor.log.error(f'Invalid Flipkart Product URL (missing /p/): {flipkart_url}')
+            failed_urls.append({'url': flipkart_url, 'error': 'Invalid URL format', 'url_index': idx})
+        coalesced = len(flipkart_urls) - len(invalid_urls) - len(targets)
+        if coalesced:
+            Actor.log.info(f'{len(targets)} unique product(s); {coalesced} URL(s) point at a product '
+                           f'listed earlier and will share its reviews')
 
-            # Scrape reviews
-            try:
-                reviews, review_count, success = scrape_product_reviews_wrapper(
-                    flipkart_url,
-                    max_reviews=max_reviews_param
-                )
-
-                if not success:
-                    error_msg = f'Failed to scrape reviews for: {flipkart_url}'
-                    Actor.log.error(error_msg)
-                    failed_urls.append({'url': flipkart_url, 'error': 'Scraping failed'})
+        # A distributed crawl shares its products through a work queue: the coordinator queues
+        # them (split into page ranges if asked to), then it and every worker lease items until
+        # none are left. Each run pushes the reviews it scraped to its own dataset.
+        work_queue = None
+        work_owner = default_owner()
+        items_completed = 0
+        worker_run_ids = []
+        work_stats = {}  # per worker, merged by the coordinator
+        invalid_url_failures = list(failed_urls)
+        if crawl_mode != CRAWL_SINGLE:
+            work_queue = await open_work_queue(
+                queue_name, work_owner,
+                os.path.join(os.getenv('APIFY_LOCAL_STORAGE_DIR') or 'storage', 'work_queues')
+            )
+            Actor.log.info(f'Distributed crawl as {crawl_mode} {work_owner}: {work_queue!r}')
+
+        async def process_product(target, item=None) -> Tuple[List[dict], Optional[str]]:
+            """
+            Scrape one product, or with a work item one range of its pages.
+
+            Returns:
+                Tuple of (summaries, one per input URL of the product; error message if the scrape failed)
+            """
+            nonlocal total_reviews_scraped, successful_urls
+
+            idx, flipkart_url, pid = target.url_index, target.url, target.pid
+            total_urls = len(flipkart_urls) or '?'
+
+            if item is None:
+                progress = checkpoint.product(idx, target.review_url)
+                start_page, collected, end_page = progress.next_page, progress.page_reviews, None
+            else:
+                # A work item interrupted here is leased again by another run; the checkpoint is per run
+                progress = ProductProgress(url=target.review_url)
+                start_page, collected, end_page = item.start_page, item.collected, item.end_page
+
+            if progress.done:
+                # Finished before the run was interrupted; its reviews and summary are already pushed
+                Actor.log.info(f'Skipping URL {idx}/{total_urls}, completed before restart: {flipkart_url}')
+                summaries = target.fan_out(progress.summary)
+                all_summaries.extend(summaries)
+                total_reviews_scraped += progress.summary['total_reviews']
+                successful_urls += len(summaries)
+                return summaries, None
+
+            error = None
+            summaries = []
+            async with product_slots:
+                product_started = time.monotonic()
+                Actor.log.info(f'Processing URL {idx}/{total_urls}: {flipkart_url}')
+                if end_page:
+                    Actor.log.info(f'Pages {start_page} to {end_page}')
+                Actor.log.info(f'Product ID: {pid}')
+                Actor.log.info(f'Review URL: {target.review_url}')
+                if len(target.urls) > 1:
+                    Actor.log.info(f'Also covers URL(s) {", ".join(map(str, target.url_indexes[1:]))}')
+                if progress.last_page:
+                    Actor.log.info(f'Resuming from page {progress.next_page} '
+                                   f'({progress.pushed} reviews pushed before restart)')
+
+                # In incremental mode, stop at the newest review an earlier run scraped. Marks are
+                # kept per product ID, or per review URL for product URLs without a pid.
+                mark_key = pid or target.review_url
+                known_review_ids = high_water_marks.known_review_ids(mark_key) if incremental else None
+                # Several page ranges of a product can be scraped by the same run
+                duplicates_before = dedup.duplicates_for(idx)
+                new_review_ids = []
+                newest_created_date = None
+                pagination = []
+                failed_pages = []
+
+                if exporter is not None:
+                    # Shared with other page ranges of the product, and with every pid-less product
+                    exporter.open_partition(pid)
+
+                # Stream reviews straight into the dataset as pages arrive
+                try:
+                    async for review in scraper.iter_product_reviews(
+                        flipkart_url,
+                        max_reviews=max_reviews_param,
+                        concurrency=max_concurrent_pages,
+                        start_page=start_page,
+                        collected=collected,
+                        end_page=end_page,
+                        on_page=progress.complete_page,
+                        sort_order=SORT_MOST_RECENT if incremental else None,
+                        stop_at_review_ids=known_review_ids,
+                        on_pagination=pagination.append,
+                        review_url=target.review_url,
+                        on_page_failed=lambda page, outcome: failed_pages.append(page)
+                    ):
+                        if incremental and len(new_review_ids) < KNOWN_IDS_PER_PRODUCT and review.review_id:
+                            new_review_ids.append(review.review_id)
+                            newest_created_date = newest_created_date or review.created_date
+                        if progress.is_pushed(review.review_id) or not dedup.add(review.review_id, idx):
+                            continue
+                        review.flipkart_url = flipkart_url
+                        review.product_id = pid
+                        review.url_index = idx
+                        await dataset.push(review.to_dict())
+                        if exporter is not None:
+                            await exporter.write(review)
+                        progress.record_review(review.review_id)
+
+                    review_count = progress.pushed
+                    if not review_count and failed_pages:
+                        # Every page was blocked or failed; an empty product would have returned a page
+                        raise RuntimeError(f'No review page could be fetched, {len(failed_pages)} page(s) '
+                                           f'failed: {failed_pages}')
+
+                    Actor.log.info(f'Successfully scraped {review_count} reviews from {flipkart_url}')
+
+                    # Create summary object
+                    summary = {
+                        'flipkart_url': flipkart_url,
+                        'product_id': pid,
+                        'total_reviews': review_count,
+                        'success': True,
+                        'max_reviews_requested': max_reviews if max_reviews > 0 else 'all',
+                        'url_index': idx
+                    }
+                    if dedup.enabled:
+                        summary['duplicates_dropped'] = dedup.duplicates_for(idx) - duplicates_before
+                    if failed_pages:
+                        # Pages skipped because Flipkart kept blocking or stripping them
+                        summary['failed_pages'] = failed_pages
+                        Actor.log.warning(f'{len(failed_pages)} page(s) of {flipkart_url} could not be fetched: '
+                                          f'{failed_pages}')
+                    if pagination:
+                        summary['total_pages'] = pagination[0].total_pages
+                        summary['rating_histogram'] = pagination[0].rating_histogram
+                    if incremental:
+                        summary['incremental'] = True
+                        summary['known_reviews'] = len(known_review_ids)
+
+                    # One summary per input URL, pushed to the dataset too; in a distributed
+                    # crawl the coordinator pushes them once every page range is merged
+                    summaries = target.fan_out(summary)
+                    all_summaries.extend(summaries)
+                    if item is None:
+                        await dataset.push_many(summaries)
+                    progress.complete(summary)
+
+                    if incremental and failed_pages:
+                        # The next run would stop above the reviews on the failed pages and never fetch them
+                        Actor.log.warning(f'Not advancing the high-water mark of {flipkart_url}: '
+                                          f'{len(failed_pages)} page(s) failed')
+                    elif incremental:
+                        high_water_marks.update(mark_key, new_review_ids, newest_created_date)
+                        await high_water_marks.save()
+
+                    total_reviews_scraped += review_count
+                    successful_urls += len(summaries)
+                    metrics.inc('products_total', result='success')
+
+                    Actor.log.info(f'✓ Completed URL {idx}/{total_urls}')
+
+                except Exception as e:
+                    error_msg = f'Error scraping reviews from {flipkart_url}: {str(e)}'
+                    Actor.log.exception(error_msg)
+                    error = str(e)
+                    if item is None:
+                        # Work items are retried first; the work loop records them once they give up
+                        record_failure(target, error)
+                    metrics.inc('products_total', result='failed')
+
+                if exporter is not None:
+                    await finish_export(pid)
+                metrics.observe('product_seconds', time.monotonic() - product_started)
+            return summaries, error
+
+        def record_failure(target, error: str):
+            for index, url in zip(target.url_indexes, target.urls):
+                failed_urls.append({'url': url, 'error': error, 'url_index': index})
+
+        async def work_loop():
+            """Lease work items and scrape them until the queue has none left."""
+            nonlocal items_completed
+            while True:
+                item = await work_queue.lease()
+                if item is None:
+                    counts = await work_queue.counts()
+                    if not counts['remaining'] and (counts['total'] or crawl_mode == CRAWL_COORDINATOR):
+                        return
+                    # Items are still leased by other runs (or not queued yet); a lease that expires is picked up
+                    await asyncio.sleep(WORK_POLL_SECONDS)
                     continue
 
-                Actor.log.info(f'Successfully scraped {review_count} reviews from {flipkart_url}')
+                async with holding_lease(work_queue, item):
+                    summaries, error = await process_product(item.target, item)
+                    if error is None:
+                        # Flush first: a completed item's reviews must already be in the dataset
+                        await dataset.flush()
+                        await work_queue.complete(item, {
+                            'summaries': summaries,
+                            'worker': work_owner,
+                            'dataset_id': Actor.config.default_dataset_id,
+                        })
+                        items_completed += 1
+                    elif await work_queue.fail(item, error):
+                        Actor.log.warning(f'Work item {item.id} failed (attempt {item.attempts}), '
+                                          f'it will be retried: {error}')
+                    else:
+                        Actor.log.error(f'Work item {item.id} failed {item.attempts} times, giving up: {error}')
+                        record_failure(item.target, error)
 
-                # Create summary object
-                summary = {
-                    'flipkart_url': flipkart_url,
-                    'product_id': pid,
-                    'total_reviews': review_count,
-                    'success': success,
-                    'max_reviews_requested': max_reviews if max_reviews > 0 else 'all',
-                    'url_index': idx
-                }
+        async def queue_work(scraper: FlipkartReviewScraper, resumed: bool):
+            """Queue the products as work items and start the worker runs."""
+            if not resumed:
+                # Items left by an earlier crawl under the same queue name would be skipped as done
+                await work_queue.clear()
 
-                all_summaries.append(summary)
+            pages_per_item = pages_per_work_item
+            if pages_per_item and incremental:
+                Actor.log.info('Incremental mode: products are not split into page ranges')
+                pages_per_item = 0
 
-                # Push summary to dataset
-                await Actor.push_data(summary)
+            async def plan(target):
+                if not pages_per_item:
+                    return plan_work_items(target)
+                total_pages, reviews_per_page = await plan_page_count(scraper, target, max_reviews_param)
+                return plan_work_items(target, total_pages, pages_per_item, reviews_per_page)
 
-                # Push each review to dataset with metadata
-                for review in reviews:
-                    review['flipkart_url'] = flipkart_url
-                    review['product_id'] = pid
-                    review['url_index'] = idx
-                    await Actor.push_data(review)
-                    all_reviews.append(review)
+            items = [item for planned in await asyncio.gather(*(plan(target) for target in targets))
+                     for item in planned]
+            added = await work_queue.add(items)
+            Actor.log.info(f'Queued {added} work item(s) for {len(targets)} product(s)'
+                           + (f' ({len(items) - added} already queued)' if len(items) > added else ''))
 
-                total_reviews_scraped += review_count
-                successful_urls += 1
+            if worker_runs and items:
+                if not Actor.config.actor_id:
+                    Actor.log.warning('worker_runs only starts runs on the Apify platform; '
+                                      f'start local workers with crawl_mode "worker" and work_queue "{queue_name}"')
+                    return
+                worker_input = {**actor_input, 'crawl_mode': CRAWL_WORKER, 'work_queue': queue_name, 'worker_runs': 0}
+                for _ in range(worker_runs):
+                    run = await Actor.start(Actor.config.actor_id, run_input=worker_input)
+                    worker_run_ids.append(run['id'])
+                Actor.log.info(f'Started {len(worker_run_ids)} worker run(s): {", ".join(worker_run_ids)}')
 
-                Actor.log.info(f'✓ Completed URL {idx}/{len(flipkart_urls)}')
+        async def report_progress():
+            """Log and show how far the crawl is while the queue drains."""
+            while True:
+                counts = await work_queue.counts()
+                message = f'{counts["remaining"]} of {counts["total"]} work item(s) left'
+                Actor.log.info(f'Work queue: {counts}')
+                await Actor.set_status_message(message)
+                await asyncio.sleep(WORK_POLL_SECONDS * 3)
 
-            except Exception as e:
-                error_msg = f'Error scraping reviews from {flipkart_url}: {str(e)}'
-                Actor.log.exception(error_msg)
-                failed_urls.append({'url': flipkart_url, 'error': str(e)})
-                continue
+        async def merge_work_results():
+            """Replace this run's own results with those of every run of the crawl."""
+            nonlocal all_summaries, failed_urls, total_reviews_scraped, successful_urls
+            results = await work_queue.results()
+            summaries, failed = merge_item_results(results)
+
+            all_summaries = summaries
+            failed_urls = invalid_url_failures + failed
+            total_reviews_scraped = sum(summary['total_reviews'] for summary in summaries
+                                        if 'coalesced_into' not in summary)
+            successful_urls = len(summaries)
+            await dataset.push_many(summaries)
+
+            for item_result in results:
+                if item_result.result:
+                    worker = item_result.result['worker']
+                    stats = work_stats.setdefault(worker, {'worker': worker,
+                                                           'dataset_id': item_result.result.get('dataset_id'),
+                                                           'work_items': 0, 'reviews': 0})
+                    stats['work_items'] += 1
+                    stats['reviews'] += sum(summary['total_reviews'] for summary in item_result.result['summaries']
+                                            if 'coalesced_into' not in summary)
+
+        def run_stats() -> dict:
+            return {
+                'rate_controller': {'rate': round(rate_controller.rate, 2), 'successes': rate_controller.successes,
+                                    'throttles': rate_controller.throttles},
+                'proxies': proxy_pool.stats(),
+                'identities': {'count': len(identity_pool), 'refreshes': identity_pool.refreshes},
+                'response_cache': response_cache.stats() if response_cache.enabled else None,
+                'dedup': dedup.stats() if dedup.enabled else None,
+                'dataset': {'items_pushed': dataset.items_pushed, 'push_calls': dataset.push_calls},
+                'parse_pool': scraper.parse_pool.stats() if scraper.parse_pool is not None else None,
+            }
+
+        async def persist_metrics():
+            await save_metrics(run_stats(), metrics_format)
+
+        # Process all URLs, at most max_concurrent_products at a time.
+        # Dataset items are buffered and pushed in chunks; leaving the block flushes the rest.
+        # One pooled HTTP session and one adaptive rate limit serve every page of every product.
+        # Progress is checkpointed (after flushing the dataset) so a restarted run resumes without duplicates.
+        # Metrics snapshots are saved on the same PERSIST_STATE events.
+        async with DatasetWriter(batch_size=push_batch_size) as dataset:
+            checkpoint = await CrawlCheckpoint.load(before_save=dataset.flush)
+            if checkpoint.resumed:
+                Actor.log.info('Resuming from the checkpoint of an interrupted run')
+
+            async with checkpoint, FlipkartReviewScraper(
+                pool_size=max_concurrent_products * max_concurrent_pages,
+                page_concurrency=max_concurrent_pages,
+                rate_controller=rate_controller,
+                proxy_pool=proxy_pool,
+                identity_pool=identity_pool,
+                response_cache=response_cache,
+                parse_workers=parse_workers
+            ) as scraper:
+                if cache_mode != CACHE_REPLAY:
+                    await identity_pool.fill()
+                    if persist_sessions:
+                        await state_store.set_value(SESSION_POOL_KEY, identity_pool.snapshot())
+                    Actor.log.info(f'Session pool: {len(identity_pool)} identities')
+
+                if crawl_mode == CRAWL_COORDINATOR:
+                    await queue_work(scraper, checkpoint.resumed)
+
+                if metrics.enabled:
+                    Actor.on(ActorEventTypes.PERSIST_STATE, persist_metrics)
+                try:
+                    if work_queue is None:
+                        await asyncio.gather(*(process_product(target) for target in targets))
+                    else:
+                        reporter = asyncio.create_task(report_progress()) if crawl_mode == CRAWL_COORDINATOR else None
+                        try:
+                            await asyncio.gather(*(work_loop() for _ in range(max_concurrent_products)))
+                        finally:
+                            if reporter is not None:
+                                reporter.cancel()
+                                await asyncio.gather(reporter, return_exceptions=True)
+                finally:
+                    if metrics.enabled:
+                        Actor.off(ActorEventTypes.PERSIST_STATE, persist_metrics)
+
+                if crawl_mode == CRAWL_COORDINATOR:
+                    await merge_work_results()
+
+        if persist_sessions:
+            await state_store.set_value(SESSION_POOL_KEY, identity_pool.snapshot())
+        if work_queue is not None:
+            work_counts = await work_queue.counts()
+            await work_queue.close()
+        if exporter is not None:
+            await finish_export(None, await exporter.close())
+
+        # Products finish in any order; report them in input order
+        all_summaries.sort(key=lambda summary: summary['url_index'])
+        failed_urls.sort(key=lambda failed: failed['url_index'])
+        for failed in failed_urls:
+            del failed['url_index']
 
         # Final summary
         Actor.log.info(f'\n{"="*60}')
@@ -120,6 +655,24 @@ async def main():
         Actor.log.info(f'Successful: {successful_urls}')
         Actor.log.info(f'Failed: {len(failed_urls)}')
         Actor.log.info(f'Total reviews scraped: {total_reviews_scraped}')
+        Actor.log.info(f'Final request rate: {rate_controller.rate:.2f} req/s '
+                       f'({rate_controller.throttles} throttled response(s))')
+
+        Actor.log.info(f'Session identities refreshed: {identity_pool.refreshes}')
+
+        if dedup.enabled:
+            Actor.log.info(f'De-duplication: {dedup.stats()}')
+        if response_cache.enabled:
+            Actor.log.info(f'Response cache stats: {response_cache.stats()}')
+
+        for proxy_stats in proxy_pool.stats():
+            Actor.log.info(f'Proxy stats: {proxy_stats}')
+
+        if exporter is not None:
+            Actor.log.info(f'Export: {exporter.rows_written} review(s) in {len(exporter.files)} file(s)')
+
+        if work_queue is not None:
+            Actor.log.info(f'Work queue {queue_name}: {work_counts}, {items_completed} item(s) completed by this run')
 
         if failed_urls:
             Actor.log.warning(f'\nFailed URLs:')
@@ -135,16 +688,34 @@ async def main():
             'summaries': all_summaries,
             'failed_url_details': failed_urls
         }
+        if work_queue is not None:
+            final_output['distributed'] = {
+                'mode': crawl_mode,
+                'work_queue': queue_name,
+                'worker': work_owner,
+                'work_items': work_counts,
+                'work_items_completed': items_completed,
+            }
+            if crawl_mode == CRAWL_COORDINATOR:
+                final_output['distributed']['worker_runs'] = worker_run_ids
+                final_output['distributed']['workers'] = list(work_stats.values())
+        if exporter is not None:
+            final_output['export'] = {
+                **exporter.stats(),
+                'destination': export_destination,
+                'location': export_keys if export_destination != EXPORT_TO_DISK else exporter.directory,
+            }
 
         await Actor.set_value('OUTPUT', final_output)
+        if metrics.enabled:
+            await persist_metrics()
 
         Actor.log.info('\nAll reviews pushed to dataset successfully')
 
-        # If all URLs failed, mark the run as failed
-        if successful_urls == 0:
-            await Actor.fail('Failed to scrape any URLs')
+        # If all URLs failed, mark the run as failed (a worker may simply have found no work left)
+        if successful_urls == 0 and (crawl_mode != CRAWL_WORKER or failed_urls):
+            await Actor.fail(status_message='Failed to scrape any URLs')
 
 
 if __name__ == '__main__':
-    import asyncio
     asyncio.run(main())
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Metrics - counters and latency histograms for the scraper's hot paths
+"""
+
+import bisect
+import math
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Tuple
+
+# Upper bounds (seconds) of the latency histogram buckets; the last one catches the rest
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, math.inf)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _format_labels(key: LabelKey) -> str:
+    return ','.join(f'{name}={value}' for name, value in key)
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram, as in Prometheus."""
+
+    __slots__ = ('bounds', 'counts', 'count', 'sum', 'max')
+
+    def __init__(self, bounds=DEFAULT_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * len(bounds)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-th quantile (the max for the last bucket)."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.bounds, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'count': self.count,
+            'sum': round(self.sum, 6),
+            'mean': round(self.sum / self.count, 6) if self.count else 0.0,
+            'p50': round(self.quantile(0.5), 6),
+            'p95': round(self.quantile(0.95), 6),
+            'max': round(self.max, 6),
+        }
+
+
+class Metrics:
+    """
+    Registry of labelled counters and latency histograms.
+
+    Disabled by default: every recording call then returns after a single
+    attribute check, so instrumented code pays next to nothing.
+
+    Usage:
+        metrics.enable()
+        metrics.inc('http_responses_total', status=200)
+        with metrics.timer('fetch_seconds'):
+            ...
+        metrics.snapshot()  # or metrics.to_prometheus()
+    """
+
+    def __init__(self, enabled: bool = False, prefix: str = 'flipkart_scraper_'):
+        self.enabled = enabled
+        self.prefix = prefix
+        self.started_at = time.time()
+        self.counters: Dict[str, Dict[LabelKey, float]] = {}
+        self.histograms: Dict[str, Dict[LabelKey, Histogram]] = {}
+
+    def enable(self, enabled: bool = True):
+        self.enabled = enabled
+
+    def reset(self):
+        self.started_at = time.time()
+        self.counters.clear()
+        self.histograms.clear()
+
+    def inc(self, name: str, value: float = 1, **labels):
+        """Add value to a counter."""
+        if not self.enabled:
+            return
+        series = self.counters.setdefault(name, {})
+        key = _label_key(labels)
+        series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, seconds: float, **labels):
+        """Record one duration in a histogram."""
+        if not self.enabled:
+            return
+        series = self.histograms.setdefault(name, {})
+        key = _label_key(labels)
+        histogram = series.get(key)
+        if histogram is None:
+            histogram = series[key] = Histogram()
+        histogram.observe(seconds)
+
+    @contextmanager
+    def timer(self, name: str, **labels) -> Iterator[None]:
+        """Time the enclosed block into a histogram."""
+        if not self.enabled:
+            yield
+            return
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        JSON-serialisable view of every metric.
+
+        Returns:
+            {'uptime_seconds': ..., 'counters': {name: {labels: value}},
+             'histograms': {name: {labels: {count, sum, mean, p50, p95, max}}}},
+            where labels is "name=value,..." ("" for unlabelled series)
+        """
+        return {
+            'uptime_seconds': round(time.time() - self.started_at, 3),
+            'counters': {
+                name: {_format_labels(key): value for key, value in sorted(series.items())}
+                for name, series in sorted(self.counters.items())
+            },
+            'histograms': {
+                name: {_format_labels(key): histogram.to_dict() for key, histogram in sorted(series.items())}
+                for name, series in sorted(self.histograms.items())
+            },
+        }
+
+    def to_prometheus(self) -> str:
+        """Every metric in the Prometheus text exposition format."""
+        lines: List[str] = []
+
+        def labels_text(key: LabelKey, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+            pairs = key + extra
+            if not pairs:
+                return ''
+            return '{' + ','.join(f'{name}="{value}"' for name, value in pairs) + '}'
+
+        for name, series in sorted(self.counters.items()):
+            metric = self.prefix + name
+            lines.append(f'# TYPE {metric} counter')
+            for key, value in sorted(series.items()):
+                lines.append(f'{metric}{labels_text(key)} {value}')
+
+        for name, series in sorted(self.histograms.items()):
+            metric = self.prefix + name
+            lines.append(f'# TYPE {metric} histogram')
+            for key, histogram in sorted(series.items()):
+                cumulative = 0
+                for bound, count in zip(histogram.bounds, histogram.counts):
+                    cumulative += count
+                    le = '+Inf' if math.isinf(bound) else repr(bound)
+                    lines.append(f'{metric}_bucket{labels_text(key, (("le", le),))} {cumulative}')
+                lines.append(f'{metric}_sum{labels_text(key)} {histogram.sum}')
+                lines.append(f'{metric}_count{labels_text(key)} {histogram.count}')
+
+        return '\n'.join(lines) + '\n'
+
+
+# Process-wide registry used by the scraper modules
+metrics = Metrics()
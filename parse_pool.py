@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Parse pool - CPU-bound page parsing in worker processes, with backpressure
+"""
+
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+import json_backend
+
+# Jobs allowed to wait for a worker, per worker
+DEFAULT_QUEUE_PER_WORKER = 2
+
+
+def default_workers() -> int:
+    """One worker per core, leaving a core to the event loop."""
+    return max(1, (os.cpu_count() or 1) - 1)
+
+
+class ParsePool:
+    """
+    Bounded pool of parser processes.
+
+    Decoding __INITIAL_STATE__ and walking it for reviews holds the GIL, so
+    with many fetches in flight a single interpreter parses one page at a time
+    and the fetch loop stalls behind it. Jobs submitted here run in worker
+    processes instead, so parsing scales with the number of cores.
+
+    At most max_pending jobs are queued or running. Further callers wait for a
+    slot, which keeps page HTML from piling up in memory and, because a page
+    fetch only completes once its page is parsed, slows fetching down to the
+    rate the workers can parse at.
+
+    Usage:
+        pool = ParsePool(workers=3)
+        result = await pool.run(parse_function, html)
+        pool.close()
+    """
+
+    def __init__(self, workers: Optional[int] = None, max_pending: Optional[int] = None):
+        """
+        Args:
+            workers: Number of worker processes. Defaults to default_workers().
+            max_pending: Jobs queued or running at once.
+                Defaults to DEFAULT_QUEUE_PER_WORKER per worker.
+        """
+        self.workers = max(1, workers or default_workers())
+        self.max_pending = max(1, max_pending or self.workers * DEFAULT_QUEUE_PER_WORKER)
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self.jobs = 0
+        self.waits = 0  # jobs that had to wait for a free slot
+
+    def open(self):
+        """Start the worker processes. Must be called from a running event loop."""
+        if self._executor is not None:
+            return
+        self._slots = asyncio.Semaphore(self.max_pending)
+        # Workers decode with the same JSON backend as this process
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=json_backend.set_backend,
+            initargs=(json_backend.BACKEND,),
+        )
+
+    def close(self):
+        """Stop the worker processes; queued jobs are cancelled."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    async def run(self, func: Callable[..., Any], *args) -> Any:
+        """
+        Run func(*args) in a worker process once a slot is free.
+
+        Args:
+            func: Module-level function (it is pickled by reference)
+            *args: Picklable arguments
+
+        Returns:
+            What func returned; exceptions raised by func are re-raised here
+        """
+        self.open()
+        if self._slots.locked():
+            self.waits += 1
+        async with self._slots:
+            self.jobs += 1
+            return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    def stats(self) -> Dict[str, int]:
+        return {'workers': self.workers, 'max_pending': self.max_pending, 'jobs': self.jobs, 'waits': self.waits}
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Adaptive rate controller - AIMD pacing for Flipkart page requests
+"""
+
+import asyncio
+import random
+import time
+from typing import Optional
+
+DEFAULT_INITIAL_RATE = 2.0  # requests per second
+DEFAULT_MIN_RATE = 0.2
+DEFAULT_MAX_RATE = 10.0
+
+# HTTP status codes Flipkart uses when it wants us to slow down or go away
+THROTTLE_STATUS_CODES = frozenset({403, 429, 503, 529})
+
+
+class AdaptiveRateController:
+    """
+    Token-bucket pacing whose rate adapts with additive increase / multiplicative decrease.
+
+    Every healthy response nudges the rate up by roughly `increase_step`
+    requests/second per second of traffic; a throttling or block signal cuts
+    it by `decrease_factor` and pauses all callers for a jittered back-off.
+    The rate therefore settles just below the level that triggers blocking.
+
+    Usage:
+        controller = AdaptiveRateController()
+        await controller.acquire()
+        ... send request ...
+        controller.record_success()  # or record_throttle(reason)
+    """
+
+    def __init__(self, initial_rate: float = DEFAULT_INITIAL_RATE, min_rate: float = DEFAULT_MIN_RATE,
+                 max_rate: float = DEFAULT_MAX_RATE, increase_step: float = 0.5,
+                 decrease_factor: float = 0.5, burst: float = 1.0,
+                 base_backoff: float = 2.0, max_backoff: float = 60.0,
+                 decrease_cooldown: float = 2.0, log_interval: float = 30.0):
+        """
+        Args:
+            initial_rate: Starting rate in requests per second
+            min_rate: Lowest rate the controller backs off to
+            max_rate: Highest rate the controller climbs to
+            increase_step: Additive increase, in requests/second per second of healthy traffic
+            decrease_factor: Multiplier applied to the rate on a throttling signal
+            burst: Number of requests that may be sent back to back after an idle period
+            base_backoff: Back-off in seconds for the first retry; doubles per attempt
+            max_backoff: Upper bound for a single back-off
+            decrease_cooldown: Seconds during which further throttling signals don't cut
+                the rate again, so one burst of concurrent failures counts once
+            log_interval: Minimum seconds between rate-increase log lines
+        """
+        self.min_rate = min_rate
+        self.max_rate = max(max_rate, min_rate)
+        self.rate = min(max(initial_rate, min_rate), self.max_rate)
+        self.increase_step = increase_step
+        self.decrease_factor = decrease_factor
+        self.burst = max(1.0, burst)
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.decrease_cooldown = decrease_cooldown
+        self.log_interval = log_interval
+
+        self._next_slot = time.monotonic()
+        self._last_decrease = float('-inf')
+        self._last_log = 0.0
+        self._logged_rate = self.rate
+
+        self.successes = 0
+        self.throttles = 0
+
+    async def acquire(self):
+        """Wait until the current rate allows another request."""
+        now = time.monotonic()
+        # A bucket of `burst` tokens refilling at `rate`: allow a short burst after idling
+        self._next_slot = max(self._next_slot, now - (self.burst - 1) / self.rate)
+        wait = self._next_slot - now
+        self._next_slot += 1.0 / self.rate
+
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def record_success(self):
+        """Additive increase after a healthy response."""
+        self.successes += 1
+        self.rate = min(self.max_rate, self.rate + self.increase_step / self.rate)
+
+        now = time.monotonic()
+        if self.rate != self._logged_rate and now - self._last_log >= self.log_interval:
+            print(f"Rate controller: {self.rate:.2f} req/s")
+            self._last_log = now
+            self._logged_rate = self.rate
+
+    def record_throttle(self, reason: str, attempt: int = 1) -> float:
+        """
+        Multiplicative decrease after a throttling or block signal.
+
+        All callers of acquire() are held back for the returned back-off.
+
+        Args:
+            reason: Short description for the log, e.g. "HTTP 429"
+            attempt: Retry attempt number, used to grow the back-off
+
+        Returns:
+            Back-off in seconds that was applied
+        """
+        self.throttles += 1
+        now = time.monotonic()
+        old_rate = self.rate
+        if now - self._last_decrease >= self.decrease_cooldown:
+            self.rate = max(self.min_rate, self.rate * self.decrease_factor)
+            self._last_decrease = now
+
+        pause = self.backoff_delay(attempt)
+        self._next_slot = max(self._next_slot, now + pause)
+
+        print(f"Rate controller: {old_rate:.2f} → {self.rate:.2f} req/s after {reason}, pausing {pause:.1f}s")
+        self._last_log = now
+        self._logged_rate = self.rate
+        return pause
+
+    def backoff_delay(self, attempt: int, rng: Optional[random.Random] = None) -> float:
+        """
+        Exponential back-off with jitter.
+
+        Args:
+            attempt: Retry attempt number (1 for the first retry)
+            rng: Optional random generator, for reproducible delays
+
+        Returns:
+            Delay in seconds, drawn uniformly between a tenth of and the full
+            ceiling base_backoff * 2**(attempt - 1), capped at max_backoff
+        """
+        ceiling = min(self.max_backoff, self.base_backoff * 2 ** max(0, attempt - 1))
+        return (rng or random).uniform(ceiling / 10, ceiling)
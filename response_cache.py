@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Response cache - review page state on local disk, with TTL and LRU eviction
+"""
+
+import asyncio
+import gzip
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlencode
+
+CACHE_OFF = 'off'
+CACHE_READ_WRITE = 'readwrite'
+CACHE_REPLAY = 'replay'  # serve only from the cache, never touch the network
+CACHE_MODES = (CACHE_OFF, CACHE_READ_WRITE, CACHE_REPLAY)
+
+DEFAULT_TTL_SECONDS = 24 * 60 * 60
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+CACHE_FILE_SUFFIX = '.json.gz'
+
+
+def cache_key(url: str, params: Dict[str, str] = None) -> str:
+    """
+    Content address of a review page request.
+
+    Args:
+        url: Review URL, as normalised by extract_product_id_from_url
+        params: Query parameters such as page and sortOrder; their order doesn't matter
+
+    Returns:
+        Hex SHA-256 digest of the URL and sorted parameters
+    """
+    canonical = url.rstrip('/')
+    if params:
+        canonical += '?' + urlencode(sorted(params.items()))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+class ResponseCache:
+    """
+    Stores the __INITIAL_STATE__ JSON of fetched review pages, gzip-compressed.
+
+    Only the state is kept, not the whole HTML, which is several times
+    smaller and is all the parser needs. Entries older than `ttl` are
+    ignored in read-write mode; replay mode serves every entry regardless of
+    age and reports a miss instead of fetching. Once the cache holds more
+    than `max_bytes`, the least recently used entries are deleted. Recency
+    is kept in each file's access time, set explicitly, so it survives
+    between runs.
+
+    Usage:
+        cache = ResponseCache('storage/response_cache')
+        state_json = await cache.get(url, params)
+        if state_json is None:
+            ... fetch ...
+            await cache.put(url, params, state_json)
+    """
+
+    def __init__(self, directory: str, mode: str = CACHE_READ_WRITE, ttl: float = DEFAULT_TTL_SECONDS,
+                 max_bytes: int = DEFAULT_MAX_BYTES):
+        """
+        Args:
+            directory: Where cache files are kept; created if missing
+            mode: CACHE_READ_WRITE, CACHE_REPLAY or CACHE_OFF
+            ttl: Seconds a cached page stays fresh in read-write mode
+            max_bytes: Total size of cache files above which old entries are evicted
+        """
+        if mode not in CACHE_MODES:
+            raise ValueError(f"Unknown cache mode '{mode}' (expected one of {', '.join(CACHE_MODES)})")
+
+        self.directory = directory
+        self.mode = mode
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+
+        # key -> (size in bytes, stored at), least recently used first
+        self._entries: 'OrderedDict[str, Tuple[int, float]]' = OrderedDict()
+        self._total_bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        if self.enabled:
+            os.makedirs(directory, exist_ok=True)
+            self._load_index()
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode != CACHE_OFF
+
+    @property
+    def replay(self) -> bool:
+        return self.mode == CACHE_REPLAY
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key + CACHE_FILE_SUFFIX)
+
+    def _load_index(self):
+        found = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if not name.endswith(CACHE_FILE_SUFFIX):
+                    continue
+                stat = os.stat(os.path.join(root, name))
+                found.append((stat.st_atime, name[:-len(CACHE_FILE_SUFFIX)], stat.st_size, stat.st_mtime))
+        for _, key, size, stored_at in sorted(found):
+            self._entries[key] = (size, stored_at)
+            self._total_bytes += size
+
+    async def get(self, url: str, params: Dict[str, str] = None) -> Optional[str]:
+        """
+        Look up the state JSON of a page.
+
+        Returns:
+            The cached JSON text, or None on a miss or an expired entry
+        """
+        if not self.enabled:
+            return None
+
+        key = cache_key(url, params)
+        entry = self._entries.get(key)
+        if entry is None or (not self.replay and time.time() - entry[1] > self.ttl):
+            self.misses += 1
+            return None
+
+        try:
+            state_json = await asyncio.to_thread(self._read, key, entry[1])
+        except (OSError, EOFError, UnicodeDecodeError):
+            # Deleted or truncated behind our back; forget it
+            self._forget(key)
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return state_json
+
+    async def put(self, url: str, params: Dict[str, str], state_json: str):
+        """Store the state JSON of a freshly fetched page, evicting old entries if needed."""
+        if not self.enabled or self.replay:
+            return
+
+        key = cache_key(url, params)
+        size = await asyncio.to_thread(self._write, key, state_json)
+
+        self._forget(key)
+        self._entries[key] = (size, time.time())
+        self._total_bytes += size
+        self._evict()
+
+    def _read(self, key: str, stored_at: float) -> str:
+        path = self._path(key)
+        with open(path, 'rb') as f:
+            state_json = gzip.decompress(f.read()).decode('utf-8')
+        # Record the access for LRU ordering; the modification time keeps the TTL
+        os.utime(path, (time.time(), stored_at))
+        return state_json
+
+    def _write(self, key: str, state_json: str) -> int:
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        data = gzip.compress(state_json.encode('utf-8'), compresslevel=5)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, path)
+        return len(data)
+
+    def _forget(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry:
+            self._total_bytes -= entry[0]
+
+    def _evict(self):
+        while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+            key, (size, _) = self._entries.popitem(last=False)
+            self._total_bytes -= size
+            self.evictions += 1
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'entries': len(self._entries),
+            'bytes': self._total_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+        }
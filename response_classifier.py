@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Response classifier - tells blocks, throttling, stripped page variants and the real end of reviews apart
+"""
+
+import re
+from dataclasses import dataclass
+from typing import Optional, Union
+
+from rate_controller import THROTTLE_STATUS_CODES
+
+# Outcomes of fetching a review page
+SUCCESS = 'success'      # the page has reviews
+EMPTY = 'empty'          # a complete review page without reviews: past the last review
+STRIPPED = 'stripped'    # a minimal page variant without page state or review list
+BLOCKED = 'blocked'      # HTTP 401/403 or a captcha / block page
+THROTTLED = 'throttled'  # HTTP 429/503/529
+ERROR = 'error'          # no usable response (connection errors, other HTTP errors)
+
+BLOCKED_STATUS_CODES = frozenset({401, 403})
+
+STATE_MARKER = 'window.__INITIAL_STATE__'
+# Phrases of the pages Flipkart serves instead of a review page when it blocks a client
+_BLOCK_PAGE = re.compile(r'captcha|are you a human|access denied|unusual traffic|request blocked', re.IGNORECASE)
+# Present in every real review page, with or without reviews; missing from stripped variants
+_REVIEW_LIST_MARKERS = ('"pageDataV4"', '"renderableComponents"')
+
+
+@dataclass(frozen=True)
+class Classification:
+    """What a response turned out to be, and why."""
+    outcome: str
+    reason: str = ''
+
+    @property
+    def usable(self) -> bool:
+        """Whether the page can be used as is (it has reviews, or there are no more)."""
+        return self.outcome in (SUCCESS, EMPTY)
+
+
+def classify_status(status_code: int) -> Optional[Classification]:
+    """
+    Classify a response by its status code alone.
+
+    Args:
+        status_code: HTTP status code
+
+    Returns:
+        BLOCKED or THROTTLED, or None if the body has to be looked at
+    """
+    if status_code in BLOCKED_STATUS_CODES:
+        return Classification(BLOCKED, f'HTTP {status_code}')
+    if status_code in THROTTLE_STATUS_CODES:
+        return Classification(THROTTLED, f'HTTP {status_code}')
+    return None
+
+
+def classify_html(html_content: str) -> Optional[Classification]:
+    """
+    Classify a page before parsing it, from plain substring checks.
+
+    Args:
+        html_content: HTML of a 200 response
+
+    Returns:
+        BLOCKED for a captcha / block page, STRIPPED for another page without
+        __INITIAL_STATE__, or None if the page has state worth parsing
+    """
+    if STATE_MARKER in html_content:
+        return None
+    block = _BLOCK_PAGE.search(html_content)
+    if block:
+        return Classification(BLOCKED, f'block page ("{block.group(0)}")')
+    return Classification(STRIPPED, 'no __INITIAL_STATE__')
+
+
+def classify_reviews(content: Union[str, bytes], review_count: int) -> Classification:
+    """
+    Classify a parsed page by whether it had reviews and, if not, whether it had a review list at all.
+
+    Args:
+        content: Page HTML or __INITIAL_STATE__ JSON text
+        review_count: Number of reviews extracted from it
+
+    Returns:
+        SUCCESS, EMPTY (a real page past the last review) or STRIPPED
+    """
+    if review_count:
+        return Classification(SUCCESS)
+    markers = _REVIEW_LIST_MARKERS
+    if isinstance(content, bytes):
+        markers = tuple(marker.encode('utf-8') for marker in markers)
+    if all(marker in content for marker in markers):
+        return Classification(EMPTY, 'no reviews on page')
+    return Classification(STRIPPED, 'page state without a review list')
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Review de-duplication - drops reviews already pushed under another listing
+"""
+
+import hashlib
+import math
+from collections import Counter
+from typing import Any, Dict, Optional
+
+DEDUP_OFF = 'off'
+DEDUP_EXACT = 'exact'
+DEDUP_BLOOM = 'bloom'
+DEDUP_MODES = (DEDUP_OFF, DEDUP_EXACT, DEDUP_BLOOM)
+
+DEFAULT_EXPECTED_REVIEWS = 1_000_000
+DEFAULT_FALSE_POSITIVE_RATE = 0.001
+
+
+def _digest(review_id: str) -> bytes:
+    return hashlib.blake2b(review_id.encode('utf-8'), digest_size=16).digest()
+
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter over a bytearray.
+
+    Uses about 1.8 bytes per item at a 0.1% false positive rate, against
+    roughly 100 bytes per review ID string in a set. A false positive drops a
+    review that was never seen, so keep the rate low.
+    """
+
+    def __init__(self, expected_items: int = DEFAULT_EXPECTED_REVIEWS,
+                 false_positive_rate: float = DEFAULT_FALSE_POSITIVE_RATE):
+        expected_items = max(1, expected_items)
+        self.size = max(8, int(-expected_items * math.log(false_positive_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / expected_items * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, digest: bytes):
+        # Double hashing: k positions from two 64-bit halves of one digest
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        return [(first + i * second) % self.size for i in range(self.hash_count)]
+
+    def add(self, digest: bytes) -> bool:
+        """Add an item; returns True if it was (probably) present already."""
+        present = True
+        for position in self._positions(digest):
+            byte, bit = divmod(position, 8)
+            if not self.bits[byte] & (1 << bit):
+                present = False
+                self.bits[byte] |= 1 << bit
+        return present
+
+
+class ReviewDeduplicator:
+    """
+    Remembers which review IDs have been pushed during the run.
+
+    The exact mode keeps a set of 64-bit hashes of the IDs, a fraction of the
+    memory of the ID strings with a negligible chance of collision; the
+    bloom mode uses a Bloom filter of fixed size for very large runs.
+    Duplicates are counted per product so summaries can report them.
+
+    Usage:
+        dedup = ReviewDeduplicator()
+        if dedup.add(review.review_id, product_key):
+            await dataset.push(review.to_dict())
+    """
+
+    def __init__(self, mode: str = DEDUP_EXACT, expected_reviews: int = DEFAULT_EXPECTED_REVIEWS,
+                 false_positive_rate: float = DEFAULT_FALSE_POSITIVE_RATE):
+        """
+        Args:
+            mode: DEDUP_EXACT, DEDUP_BLOOM or DEDUP_OFF
+            expected_reviews: Bloom filter capacity (bloom mode only)
+            false_positive_rate: Bloom filter false positive rate at capacity (bloom mode only)
+        """
+        if mode not in DEDUP_MODES:
+            raise ValueError(f"Unknown de-duplication mode '{mode}' (expected one of {', '.join(DEDUP_MODES)})")
+        self.mode = mode
+        self._hashes = set()
+        self._bloom: Optional[BloomFilter] = (
+            BloomFilter(expected_reviews, false_positive_rate) if mode == DEDUP_BLOOM else None
+        )
+        self.unique = 0
+        self.duplicates: Counter = Counter()
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode != DEDUP_OFF
+
+    def add(self, review_id: Optional[str], product_key: Any = None) -> bool:
+        """
+        Record a review about to be pushed.
+
+        Args:
+            review_id: Flipkart review ID. Reviews without one are always kept.
+            product_key: Which product the review was scraped for, for the per-product count
+
+        Returns:
+            True if the review is new and should be pushed, False for a duplicate
+        """
+        if not self.enabled or not review_id:
+            return True
+
+        digest = _digest(review_id)
+        if self._bloom is not None:
+            seen = self._bloom.add(digest)
+        else:
+            key = int.from_bytes(digest[:8], 'little')
+            seen = key in self._hashes
+            self._hashes.add(key)
+
+        if seen:
+            self.duplicates[product_key] += 1
+            return False
+        self.unique += 1
+        return True
+
+    def duplicates_for(self, product_key: Any) -> int:
+        return self.duplicates.get(product_key, 0)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'mode': self.mode,
+            'unique_reviews': self.unique,
+            'duplicates_dropped': sum(self.duplicates.values()),
+        }
@@ -0,0 +1,383 @@
+#!/usr/bin/env python3
+"""
+Review export - streams reviews into Parquet and compressed NDJSON/CSV files, one partition per product
+"""
+
+import asyncio
+import csv
+import gzip
+import io
+import json
+import os
+import re
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # optional dependency
+    pyarrow = None
+
+try:
+    import zstandard
+except ImportError:  # optional dependency
+    zstandard = None
+
+EXPORT_PARQUET = 'parquet'
+EXPORT_NDJSON = 'ndjson'
+EXPORT_CSV = 'csv'
+EXPORT_FORMATS = (EXPORT_PARQUET, EXPORT_NDJSON, EXPORT_CSV)
+
+DEFAULT_ROW_GROUP_SIZE = 10_000  # rows buffered per partition before they are written out
+DEFAULT_ZSTD_LEVEL = 3
+UNKNOWN_PRODUCT = 'unknown'
+
+# Every export has these columns, in this order. Product attributes (colour,
+# size, ...) differ between products, so instead of product_<attribute>
+# columns they are kept in one map column: attribute -> value.
+STRING, INTEGER, BOOLEAN, ATTRIBUTES = 'string', 'integer', 'boolean', 'attributes'
+COLUMNS: List[Tuple[str, str]] = [
+    ('review_id', STRING),
+    ('author', STRING),
+    ('certified_buyer', BOOLEAN),
+    ('created_date', STRING),
+    ('rating', INTEGER),
+    ('title', STRING),
+    ('review_text', STRING),
+    ('helpful_count', INTEGER),
+    ('city', STRING),
+    ('state', STRING),
+    ('product_attributes', ATTRIBUTES),
+    ('image_urls', STRING),
+    ('image_count', INTEGER),
+    ('upvotes', INTEGER),
+    ('downvotes', INTEGER),
+    ('verified_purchase', BOOLEAN),
+    ('position', STRING),
+    ('review_language', STRING),
+    ('flipkart_url', STRING),
+    ('product_id', STRING),
+    ('url_index', INTEGER),
+]
+COLUMN_NAMES = [name for name, _ in COLUMNS]
+
+_UNSAFE_PATH_CHARS = re.compile(r'[^A-Za-z0-9_.-]')
+
+
+def available_formats() -> List[str]:
+    """Export formats that can be written in this environment (Parquet needs pyarrow)."""
+    return [fmt for fmt in EXPORT_FORMATS if fmt != EXPORT_PARQUET or pyarrow is not None]
+
+
+def compression_suffix() -> str:
+    """Suffix of compressed NDJSON/CSV files: zstd when zstandard is installed, gzip otherwise."""
+    return '.zst' if zstandard is not None else '.gz'
+
+
+def parquet_schema():
+    """The pyarrow schema of Parquet exports."""
+    types = {
+        STRING: pyarrow.string(),
+        INTEGER: pyarrow.int64(),
+        BOOLEAN: pyarrow.bool_(),
+        ATTRIBUTES: pyarrow.map_(pyarrow.string(), pyarrow.string()),
+    }
+    return pyarrow.schema([(name, types[kind]) for name, kind in COLUMNS])
+
+
+def _as_string(value: Any) -> Optional[str]:
+    return value if isinstance(value, str) or value is None else str(value)
+
+
+def _as_integer(value: Any) -> Optional[int]:
+    if value is None:
+        return None
+    if isinstance(value, int):
+        return int(value)  # also turns bools into 0/1
+    try:
+        return int(float(str(value).replace(',', '')))
+    except (ValueError, OverflowError):
+        return None
+
+
+def _as_boolean(value: Any) -> Optional[bool]:
+    if isinstance(value, str):
+        return value.strip().lower() in ('true', '1', 'yes')
+    return None if value is None else bool(value)
+
+
+def _as_attributes(value: Any) -> List[Tuple[str, str]]:
+    return [(str(name), _as_string(attr_value)) for name, attr_value in value or ()]
+
+
+_CONVERTERS: Dict[str, Callable[[Any], Any]] = {
+    STRING: _as_string,
+    INTEGER: _as_integer,
+    BOOLEAN: _as_boolean,
+    ATTRIBUTES: _as_attributes,
+}
+_ROW_CONVERTERS = [(name, _CONVERTERS[kind]) for name, kind in COLUMNS]
+
+
+def review_row(review) -> Dict[str, Any]:
+    """
+    Convert a review into an export row with the fixed COLUMNS schema.
+
+    Args:
+        review: Review record (with flipkart_url / product_id / url_index set by the caller)
+
+    Returns:
+        Dictionary with one typed value per column; product_attributes is a list of (attribute, value) pairs
+    """
+    return {name: convert(getattr(review, name, None)) for name, convert in _ROW_CONVERTERS}
+
+
+def partition_name(product_id: Optional[str]) -> str:
+    """Directory name of a product's partition, e.g. 'product_id=MOBG6VF5Q6ZXYZ'."""
+    return f"product_id={_UNSAFE_PATH_CHARS.sub('_', product_id or UNKNOWN_PRODUCT)}"
+
+
+def _file_name(fmt: str, part: int) -> str:
+    if fmt == EXPORT_PARQUET:
+        return f'part-{part:05d}.parquet'
+    return f'part-{part:05d}.{fmt}{compression_suffix()}'
+
+
+def _csv_value(name: str, value: Any) -> Any:
+    if name == 'product_attributes':
+        return json.dumps(dict(value), ensure_ascii=False)
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    return '' if value is None else value
+
+
+class _ParquetWriter:
+    """Writes each flushed batch of rows as one Parquet row group."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._writer = pyarrow.parquet.ParquetWriter(path, parquet_schema(), compression='zstd')
+
+    def write(self, rows: List[Dict[str, Any]]):
+        columns = {name: [row[name] for row in rows] for name in COLUMN_NAMES}
+        self._writer.write_table(pyarrow.Table.from_pydict(columns, schema=self._writer.schema))
+
+    def close(self):
+        self._writer.close()
+
+
+class _CompressedTextWriter:
+    """Writes rows as NDJSON lines or CSV records into a zstd (or gzip) stream."""
+
+    def __init__(self, path: str, fmt: str, zstd_level: int):
+        self.path = path
+        self.format = fmt
+        self._file = open(path, 'wb')
+        if zstandard is not None:
+            self._stream = zstandard.ZstdCompressor(level=zstd_level).stream_writer(self._file)
+        else:
+            self._stream = gzip.GzipFile(fileobj=self._file, mode='wb')
+        self._text = io.TextIOWrapper(self._stream, encoding='utf-8', newline='')
+        if fmt == EXPORT_CSV:
+            self._csv = csv.writer(self._text)
+            self._csv.writerow(COLUMN_NAMES)
+
+    def write(self, rows: List[Dict[str, Any]]):
+        if self.format == EXPORT_NDJSON:
+            for row in rows:
+                line = {**row, 'product_attributes': dict(row['product_attributes'])}
+                self._text.write(json.dumps(line, ensure_ascii=False))
+                self._text.write('\n')
+        else:
+            for row in rows:
+                self._csv.writerow([
+                    _csv_value(name, value) for name, value in row.items()
+                ])
+
+    def close(self):
+        # Closing the wrapper closes the compressor, which writes the frame end, then the file
+        self._text.close()
+        if not self._file.closed:
+            self._file.close()
+
+
+class _Partition:
+    """The open export files of one product, one per format."""
+
+    def __init__(self, root: str, key: str, formats: List[str], zstd_level: int):
+        directories = [os.path.join(root, fmt, key) for fmt in formats]
+        for directory in directories:
+            os.makedirs(directory, exist_ok=True)
+        part = 0
+        while any(os.path.exists(os.path.join(directory, _file_name(fmt, part)))
+                  for fmt, directory in zip(formats, directories)):
+            part += 1
+        self.rows: List[Dict[str, Any]] = []
+        self.row_count = 0
+        self.lock = asyncio.Lock()  # held while a batch is written, so writes never overlap
+        self.writers = []
+        for fmt, directory in zip(formats, directories):
+            path = os.path.join(directory, _file_name(fmt, part))
+            if fmt == EXPORT_PARQUET:
+                self.writers.append(_ParquetWriter(path))
+            else:
+                self.writers.append(_CompressedTextWriter(path, fmt, zstd_level))
+
+    @property
+    def paths(self) -> List[str]:
+        return [writer.path for writer in self.writers]
+
+    def write(self, rows: List[Dict[str, Any]]):
+        for writer in self.writers:
+            writer.write(rows)
+
+    def close(self):
+        for writer in self.writers:
+            writer.close()
+
+
+class ReviewExporter:
+    """
+    Streams reviews into export files, partitioned by product ID.
+
+    Each format has its own tree of Hive-style product directories, e.g.
+    <directory>/parquet/product_id=<pid>/part-00000.parquet and
+    <directory>/ndjson/product_id=<pid>/part-00000.ndjson.zst, which
+    pyarrow.dataset, DuckDB or Spark read as one table partitioned by
+    product_id. Rows are buffered per product and written
+    row_group_size at a time (one Parquet row group per batch) on a worker
+    thread, so memory stays bounded however many reviews a product has.
+    Every file has the same columns (see COLUMNS).
+
+    Without zstandard installed, NDJSON and CSV are gzip-compressed instead.
+
+    Several crawls can write to one partition at the same time - page ranges
+    of one product, or products without an ID, which share the 'unknown'
+    partition. Each opens it with open_partition and the partition's files are
+    closed once every one of them has called close_partition.
+
+    Usage:
+        exporter = ReviewExporter('exports', ['parquet', 'ndjson'])
+        exporter.open_partition(review.product_id)
+        await exporter.write(review)
+        paths = await exporter.close_partition(review.product_id)
+        ...
+        await exporter.close()
+    """
+
+    def __init__(self, directory: str, formats: List[str],
+                 row_group_size: int = DEFAULT_ROW_GROUP_SIZE, zstd_level: int = DEFAULT_ZSTD_LEVEL):
+        """
+        Args:
+            directory: Root directory of the export
+            formats: Any of 'parquet', 'ndjson' and 'csv'
+            row_group_size: Rows buffered per product before they are written
+            zstd_level: zstd compression level of NDJSON/CSV files
+
+        Raises:
+            ValueError: If a format is unknown, or is 'parquet' and pyarrow is not installed
+        """
+        for fmt in formats:
+            if fmt not in EXPORT_FORMATS:
+                raise ValueError(f"Unknown export format '{fmt}' (expected one of {', '.join(EXPORT_FORMATS)})")
+            if fmt not in available_formats():
+                raise ValueError(f"Export format '{fmt}' needs pyarrow, which is not installed")
+        self.directory = directory
+        self.formats = list(dict.fromkeys(formats))
+        self.row_group_size = max(1, row_group_size)
+        self.zstd_level = zstd_level
+        self.rows_written = 0
+        self.files: List[str] = []  # paths of every closed file
+        self._partitions: Dict[str, _Partition] = {}
+        self._writers: Dict[str, int] = {}  # crawls that opened each partition and have not closed it
+        self._lock = asyncio.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.formats)
+
+    async def write(self, review):
+        """
+        Add one review to its product's partition.
+
+        Args:
+            review: Review record; its product_id picks the partition
+        """
+        key = partition_name(review.product_id)
+        partition = self._partitions.get(key)
+        if partition is None:
+            async with self._lock:
+                # Another writer of the same partition may have created it while we waited
+                partition = self._partitions.get(key)
+                if partition is None:
+                    partition = await asyncio.to_thread(_Partition, self.directory, key, self.formats,
+                                                        self.zstd_level)
+                    self._partitions[key] = partition
+
+        partition.rows.append(review_row(review))
+        if len(partition.rows) >= self.row_group_size:
+            await self._flush(partition)
+
+    async def _flush(self, partition: _Partition, close: bool = False):
+        # A shared partition can fill up again while its previous batch is being written
+        async with partition.lock:
+            rows, partition.rows = partition.rows, []
+            if rows:
+                await asyncio.to_thread(partition.write, rows)
+                partition.row_count += len(rows)
+                self.rows_written += len(rows)
+            if close:
+                await asyncio.to_thread(partition.close)
+
+    def open_partition(self, product_id: Optional[str]):
+        """
+        Register a crawl that is about to write a product's reviews.
+
+        Pair every call with close_partition; the partition stays open while
+        any crawl that opened it has not closed it.
+
+        Args:
+            product_id: Product whose reviews will be written
+        """
+        key = partition_name(product_id)
+        self._writers[key] = self._writers.get(key, 0) + 1
+
+    async def close_partition(self, product_id: Optional[str]) -> List[str]:
+        """
+        Write out a product's buffered reviews and close its files.
+
+        Reviews written for the product afterwards go to new part files. If
+        other crawls opened the partition and are still writing, it is left
+        open for them and only the last close_partition closes the files.
+
+        Args:
+            product_id: Product whose partition to close
+
+        Returns:
+            Paths of the closed files (empty if the product had no reviews or is still being written)
+        """
+        key = partition_name(product_id)
+        writers = self._writers.pop(key, 0) - 1
+        if writers > 0:
+            self._writers[key] = writers
+            return []
+        if key not in self._partitions:
+            return []
+        return await self._close_key(key)
+
+    async def close(self) -> List[str]:
+        """Close every open partition; returns the paths of the files closed now."""
+        paths = []
+        self._writers.clear()
+        for key in list(self._partitions):
+            paths.extend(await self._close_key(key))
+        return paths
+
+    async def _close_key(self, key: str) -> List[str]:
+        partition = self._partitions.pop(key)
+        await self._flush(partition, close=True)
+        self.files.extend(partition.paths)
+        return partition.paths
+
+    def stats(self) -> Dict[str, Any]:
+        return {'formats': self.formats, 'rows': self.rows_written, 'files': len(self.files)}
@@ -50,7 +50,7 @@ if success and reviews:
             'url': url,
             'total_reviews': count,
             'success': success,
-            'reviews': reviews
+            'reviews': [review.to_dict() for review in reviews]
         }, f, indent=2, ensure_ascii=False)
 
     print(f"\n✅ All reviews saved to: {output_file}")
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# The scraper modules live in the repository root; the benchmarks package builds sample pages
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
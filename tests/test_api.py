@@ -0,0 +1,102 @@
+import asyncio
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+import api.app as api_app
+from api.app import QueueFullError, ReviewService
+from flipkart_scraper_apify import Review
+
+PHONE = 'https://www.flipkart.com/phone/p/itm1?pid=BLUE'
+PHONE_RED = 'https://www.flipkart.com/phone/p/itm1?pid=RED'
+BLOCKED_PRODUCT = 'https://www.flipkart.com/blocked/p/itm2?pid=BLK'
+
+
+class FakeScraper:
+    """Serves 3 reviews per product; products under /blocked/ have every page blocked."""
+
+    def __init__(self):
+        self.crawled = []
+
+    async def iter_product_reviews(self, product_url, max_reviews=None, review_url=None, on_page=None,
+                                   on_page_failed=None):
+        self.crawled.append(review_url)
+        await asyncio.sleep(0)
+        if '/blocked/' in review_url:
+            on_page_failed(1, 'blocked')
+            return
+        for i in range(3)[:max_reviews]:
+            yield Review(review_id=f'{review_url}#{i}', rating=5)
+        on_page(1, 3)
+
+    async def close(self):
+        pass
+
+
+class FakeService(ReviewService):
+    async def start(self):
+        self.scraper = FakeScraper()
+        self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(api_app, 'service', FakeService(workers=2))
+    with TestClient(api_app.app) as client:
+        yield client
+
+
+def test_variant_listings_share_one_crawl():
+    service = ReviewService(max_queue=10)
+    first = service.crawl(PHONE, max_reviews=5)
+    assert service.crawl(PHONE_RED, max_reviews=5) is first
+    assert service.crawl(PHONE) is not first  # needs more reviews than the first crawl fetches
+    assert service.coalesced == 1
+    assert service.product_url_for('RED') == PHONE_RED
+    with pytest.raises(ValueError):
+        service.crawl('https://www.flipkart.com/search?q=phone')
+
+
+def test_full_queue_rejects_new_products():
+    service = ReviewService(max_queue=1)
+    service.crawl(PHONE)
+    service.crawl(PHONE_RED)  # coalesced, needs no slot
+    with pytest.raises(QueueFullError):
+        service.crawl(BLOCKED_PRODUCT)
+    with pytest.raises(QueueFullError):
+        service.submit([BLOCKED_PRODUCT], None)
+
+
+def test_zero_max_queue_is_unbounded():
+    service = ReviewService(max_queue=0)
+    job = service.submit([f'https://www.flipkart.com/p{i}/p/itm{i}?pid=P{i}' for i in range(50)], None)
+    assert len(job.crawls) == 50
+
+
+def test_job_status_and_ndjson_stream(client):
+    response = client.post('/jobs', json={'flipkart_urls': [PHONE, 'bad-url', PHONE_RED], 'max_reviews': 2})
+    assert response.status_code == 202
+    job_id = response.json()['job_id']
+
+    lines = [json.loads(line) for line in client.get(f'/jobs/{job_id}/reviews').text.splitlines()]
+    assert [(line['url_index'], line.get('product_id')) for line in lines] == [
+        (1, 'BLUE'), (1, 'BLUE'), (2, None), (3, 'RED'), (3, 'RED')]
+    assert 'error' in lines[2]
+    assert lines[3]['review_id'] == lines[0]['review_id']  # the variant shares its crawl
+
+    job = client.get(f'/jobs/{job_id}').json()
+    assert job['status'] == 'done'
+    assert [product['status'] for product in job['products']] == ['done', 'failed', 'done']
+    assert job['products'][0]['reviews'] == 2
+    assert client.get('/jobs/unknown').status_code == 404
+    assert api_app.service.scraper.crawled == ['https://www.flipkart.com/phone/product-reviews/itm1']
+
+
+def test_blocked_product_fails_instead_of_caching_no_reviews(client):
+    response = client.get('/scrape', params={'flipkart_url': BLOCKED_PRODUCT})
+    assert response.status_code == 502
+    assert 'No review page could be fetched' in response.json()['detail']
+    # A failed crawl is not served from the cache
+    client.get('/scrape', params={'flipkart_url': BLOCKED_PRODUCT})
+    assert len(api_app.service.scraper.crawled) == 2
@@ -0,0 +1,49 @@
+from checkpoint import CrawlCheckpoint, ProductProgress
+
+
+def push_page(progress, page, ids):
+    for review_id in ids:
+        progress.record_review(review_id)
+    progress.complete_page(page, progress.pushed)
+
+
+def test_only_the_resumable_pages_are_kept():
+    progress = ProductProgress(url='https://x/product-reviews/itm1')
+    for page in range(1, 101):
+        push_page(progress, page, [f'r{page}-{i}' for i in range(10)])
+    progress.record_review('r101-0')
+
+    data = progress.to_dict()
+    assert data['last_page'] == 100
+    assert data['pushed'] == 1001
+    assert data['review_ids'] == ['r101-0']
+    assert len(data['last_page_ids']) == 10
+    assert progress.is_pushed('r100-3')  # may come back on page 101 if new reviews were posted
+    assert progress.is_pushed('r101-0')
+    assert not progress.is_pushed('r1-0')
+    assert not progress.is_pushed(None)
+
+
+def test_round_trip_resumes_after_the_last_pushed_page():
+    progress = ProductProgress(url='u')
+    push_page(progress, 1, ['a', 'b'])
+    progress.record_review('c')
+
+    restored = ProductProgress.from_dict(progress.to_dict())
+    assert (restored.next_page, restored.page_reviews, restored.pushed) == (2, 2, 3)
+    assert restored.is_pushed('a') and restored.is_pushed('c')
+
+
+def test_completed_products_drop_their_ids():
+    progress = ProductProgress(url='u')
+    push_page(progress, 1, ['a'])
+    progress.complete({'total_reviews': 1})
+    assert progress.done
+    assert progress.to_dict()['review_ids'] == progress.to_dict()['last_page_ids'] == []
+
+
+def test_changed_input_url_starts_fresh():
+    checkpoint = CrawlCheckpoint({'1': ProductProgress(url='old', last_page=4)})
+    assert checkpoint.resumed
+    assert checkpoint.product(1, 'new').last_page == 0
+    assert checkpoint.product(2, 'other').url == 'other'
@@ -0,0 +1,85 @@
+import asyncio
+import logging
+
+import pytest
+
+import dataset_writer
+import json_backend
+from dataset_writer import DatasetWriter
+
+
+class FakeActor:
+    log = logging.getLogger('test_dataset_writer')
+
+    def __init__(self, fail_calls=0):
+        self.chunks = []
+        self.fail_calls = fail_calls
+
+    async def push_data(self, chunk):
+        if self.fail_calls:
+            self.fail_calls -= 1
+            raise RuntimeError('dataset unavailable')
+        self.chunks.append(list(chunk))
+
+
+@pytest.fixture
+def actor(monkeypatch):
+    fake = FakeActor()
+    monkeypatch.setattr(dataset_writer, 'Actor', fake)
+    return fake
+
+
+def items(count, text='x'):
+    return [{'review_id': str(i), 'text': text} for i in range(count)]
+
+
+def test_flushes_full_batches_and_the_rest_on_close(actor):
+    async def run():
+        async with DatasetWriter(batch_size=3, flush_interval=None) as dataset:
+            await dataset.push_many(items(7))
+            assert [len(chunk) for chunk in actor.chunks] == [3, 3]
+        return dataset
+
+    dataset = asyncio.run(run())
+    assert [len(chunk) for chunk in actor.chunks] == [3, 3, 1]
+    assert [item['review_id'] for chunk in actor.chunks for item in chunk] == [str(i) for i in range(7)]
+    assert (dataset.items_pushed, dataset.push_calls) == (7, 3)
+
+
+def test_chunks_stay_under_the_byte_limit(actor):
+    item_bytes = len(json_backend.dumps(items(1, 'y' * 100)[0])) + 1
+
+    async def run():
+        async with DatasetWriter(batch_size=100, max_batch_bytes=item_bytes * 2, flush_interval=None) as dataset:
+            await dataset.push_many(items(5, 'y' * 100))
+
+    asyncio.run(run())
+    assert [len(chunk) for chunk in actor.chunks] == [2, 2, 1]
+
+
+def test_flush_interval_pushes_a_partial_batch(actor):
+    async def run():
+        async with DatasetWriter(batch_size=100, flush_interval=0.01) as dataset:
+            await dataset.push_many(items(2))
+            await asyncio.sleep(0.05)
+            assert [len(chunk) for chunk in actor.chunks] == [2]
+
+    asyncio.run(run())
+    assert len(actor.chunks) == 1
+
+
+def test_failed_push_keeps_items_for_the_next_flush(actor):
+    actor.fail_calls = 1
+
+    async def run():
+        dataset = DatasetWriter(batch_size=100, flush_interval=None)
+        await dataset.push_many(items(2))
+        with pytest.raises(RuntimeError):
+            await dataset.flush()
+        await dataset.push(items(3)[2])
+        await dataset.close()
+        return dataset
+
+    dataset = asyncio.run(run())
+    assert [item['review_id'] for chunk in actor.chunks for item in chunk] == ['0', '1', '2']
+    assert (dataset.items_pushed, dataset.push_calls) == (3, 1)
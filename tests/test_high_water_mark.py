@@ -0,0 +1,67 @@
+import asyncio
+
+from high_water_mark import KNOWN_IDS_PER_PRODUCT, HighWaterMarks
+
+
+class MemoryStore:
+    def __init__(self):
+        self.records = {}
+
+    async def get_value(self, key):
+        return self.records.get(key)
+
+    async def set_value(self, key, value):
+        self.records[key] = value
+
+
+def test_update_keeps_the_newest_ids_first():
+    marks = HighWaterMarks(MemoryStore())
+    marks.update('PID1', ['r3', 'r2'], '2024-03-01')
+    marks.update('PID1', ['r5', 'r4'], '2024-04-01')
+    assert marks.get('PID1')['review_id'] == 'r5'
+    assert marks.get('PID1')['created_date'] == '2024-04-01'
+    assert marks.known_review_ids('PID1') == {'r2', 'r3', 'r4', 'r5'}
+
+
+def test_known_ids_are_bounded():
+    marks = HighWaterMarks(MemoryStore())
+    marks.update('PID1', [f'r{i}' for i in range(KNOWN_IDS_PER_PRODUCT * 2)])
+    assert len(marks.known_review_ids('PID1')) == KNOWN_IDS_PER_PRODUCT
+
+
+def test_nothing_new_changes_nothing():
+    marks = HighWaterMarks(MemoryStore())
+    marks.update('PID1', [])
+    assert marks.get('PID1') is None
+    assert marks.known_review_ids('unknown') == set()
+
+
+def test_marks_round_trip_through_the_store():
+    async def run():
+        store = MemoryStore()
+        marks = HighWaterMarks(store)
+        # Product URLs without a pid are keyed by their review URL
+        marks.update('https://www.flipkart.com/x/product-reviews/itm1', ['r1'])
+        await marks.save()
+        return await HighWaterMarks.load(store)
+
+    loaded = asyncio.run(run())
+    assert loaded.known_review_ids('https://www.flipkart.com/x/product-reviews/itm1') == {'r1'}
+
+
+def test_concurrent_runs_keep_each_others_marks():
+    async def run():
+        store = MemoryStore()
+        first = await HighWaterMarks.load(store)
+        second = await HighWaterMarks.load(store)
+        first.update('PID1', ['a1'])
+        second.update('PID2', ['b1'])
+        second.update('PID1', ['a2'])
+        await first.save()
+        await second.save()
+        return await HighWaterMarks.load(store)
+
+    loaded = asyncio.run(run())
+    assert loaded.known_review_ids('PID2') == {'b1'}
+    assert loaded.known_review_ids('PID1') == {'a1', 'a2'}
+    assert loaded.get('PID1')['review_id'] == 'a2'
@@ -0,0 +1,93 @@
+import asyncio
+import base64
+import json
+import time
+
+from identity_pool import STALE_THRESHOLD, Identity, IdentityPool, token_expiry
+
+
+def access_token(expires_at):
+    payload = base64.urlsafe_b64encode(json.dumps({'exp': expires_at}).encode()).decode().rstrip('=')
+    return f'header.{payload}.signature'
+
+
+def counting_bootstrap():
+    calls = []
+
+    async def bootstrap(headers):
+        calls.append(headers)
+        await asyncio.sleep(0)
+        return {'at': access_token(time.time() + 3600), 'n': str(len(calls))}
+    return bootstrap, calls
+
+
+def test_token_expiry():
+    assert token_expiry({'at': access_token(1234)}) == 1234
+    assert token_expiry({'at': 'not-a-jwt'}) is None
+    assert token_expiry({}) is None
+
+
+def test_snapshot_round_trip_drops_expired_identities():
+    fresh = Identity(cookies={'at': access_token(time.time() + 3600)}, headers={'User-Agent': 'a'})
+    expired = Identity(cookies={'at': access_token(time.time() - 10)}, headers={'User-Agent': 'b'})
+    seed = Identity(cookies={}, headers={})
+
+    pool = IdentityPool.from_snapshot(IdentityPool([fresh, expired]).snapshot(), seed=seed)
+    assert [identity.id for identity in pool.identities] == [fresh.id]
+    assert IdentityPool.from_snapshot([expired.to_dict()], seed=seed).identities == [seed]
+
+
+def test_checkout_picks_the_least_busy_identity():
+    pool = IdentityPool([Identity(cookies={}, headers={}) for _ in range(3)])
+
+    async def run():
+        return [await pool.checkout() for _ in range(4)]
+
+    first, second, third, fourth = asyncio.run(run())
+    assert len({first.id, second.id, third.id}) == 3
+    pool.release(second, {'sid': 'x'})
+    assert asyncio.run(pool.checkout()) is second
+    assert second.cookies == {'sid': 'x'}
+    assert fourth.in_flight == 2
+
+
+def test_fill_and_expired_identity_is_refreshed_on_checkout():
+    bootstrap, calls = counting_bootstrap()
+    expired = Identity(cookies={'at': access_token(time.time() - 10)}, headers={'User-Agent': 'ua'})
+    pool = IdentityPool([expired], bootstrap=bootstrap, size=3)
+
+    async def run():
+        await pool.fill()
+        return await asyncio.gather(*(pool.checkout() for _ in range(3)))
+
+    identities = asyncio.run(run())
+    assert len(pool) == 3
+    assert expired not in pool.identities
+    assert pool.refreshes == 1
+    assert len(calls) == 3  # two to fill, one shared refresh
+    assert all(identity.headers == {'User-Agent': 'ua'} for identity in identities)
+
+
+def test_repeated_stale_responses_replace_the_identity():
+    bootstrap, calls = counting_bootstrap()
+    identity = Identity(cookies={}, headers={})
+    pool = IdentityPool([identity], bootstrap=bootstrap)
+
+    async def run():
+        for _ in range(STALE_THRESHOLD):
+            await pool.report_stale(await pool.checkout(), 'no reviews')
+
+    asyncio.run(run())
+    assert pool.identities[0] is not identity
+    assert pool.refreshes == 1
+
+
+def test_failed_refresh_keeps_the_old_identity():
+    async def failing(headers):
+        raise ConnectionError('down')
+
+    identity = Identity(cookies={}, headers={})
+    pool = IdentityPool([identity], bootstrap=failing)
+    assert asyncio.run(pool.refresh(identity, 'test')) is identity
+    assert pool.identities == [identity]
+    assert identity.retry_refresh_at > time.time()
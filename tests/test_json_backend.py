@@ -0,0 +1,55 @@
+import pytest
+
+import json_backend
+from flipkart_scraper_apify import extract_review_details, extract_reviews_from_json
+from sample_pages import build_state
+
+DOCUMENT = {'title': 'Très bon ₹ 999', 'rating': 4, 'tags': ['a', None, True], 'nested': {'price': 12.5}}
+
+
+@pytest.fixture
+def restore_backend():
+    previous = json_backend.BACKEND
+    yield
+    json_backend.set_backend(previous)
+
+
+def test_default_is_the_fastest_installed_backend(restore_backend):
+    preferred = [name for name in ('orjson', 'msgspec', 'json') if name in json_backend.available_backends()]
+    assert json_backend.set_backend() == preferred[0]
+    assert json_backend.BACKEND == preferred[0]
+
+
+def test_unknown_backend_is_rejected(restore_backend):
+    previous = json_backend.BACKEND
+    with pytest.raises(ValueError):
+        json_backend.set_backend('simdjson-but-not-installed')
+    assert json_backend.BACKEND == previous
+
+
+@pytest.mark.parametrize('name', json_backend.available_backends())
+def test_every_backend_round_trips(restore_backend, name):
+    json_backend.set_backend(name)
+    encoded = json_backend.dumps(DOCUMENT)
+    assert isinstance(encoded, bytes)
+    assert 'Très bon ₹ 999'.encode('utf-8') in encoded  # not \u-escaped
+    assert json_backend.loads(encoded) == DOCUMENT
+    assert json_backend.loads(encoded.decode('utf-8')) == DOCUMENT
+    with pytest.raises(ValueError):
+        json_backend.loads('{"truncated": ')
+
+
+@pytest.mark.skipif(json_backend.msgspec is None, reason='msgspec is not installed')
+def test_typed_decoder_matches_the_generic_parser():
+    state = build_state(num_reviews=5, filler_items=20)
+    state_json = json_backend.dumps(state)
+    components = json_backend.decode_review_components(state_json)
+    typed = [extract_review_details(component['value'], component) for component in components]
+    assert typed == extract_reviews_from_json(state)
+
+
+@pytest.mark.skipif(json_backend.msgspec is None, reason='msgspec is not installed')
+def test_typed_decoder_gives_up_on_other_layouts():
+    assert json_backend.decode_review_components(b'{"somethingElse": {}}') is None
+    assert json_backend.decode_review_components(b'{"pageDataV4": ') is None
+    assert json_backend.decode_review_components(json_backend.dumps(build_state(num_reviews=0))) is None
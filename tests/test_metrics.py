@@ -0,0 +1,74 @@
+import json
+import math
+
+from metrics import Histogram, Metrics
+
+
+def test_disabled_registry_records_nothing():
+    registry = Metrics()
+    registry.inc('requests_total')
+    registry.observe('fetch_seconds', 0.2)
+    with registry.timer('parse_seconds'):
+        pass
+    snapshot = registry.snapshot()
+    assert snapshot['counters'] == {} and snapshot['histograms'] == {}
+    assert registry.to_prometheus() == '\n'
+
+
+def test_counters_are_keyed_by_sorted_labels():
+    registry = Metrics(enabled=True)
+    registry.inc('http_responses_total', status=200, host='a')
+    registry.inc('http_responses_total', 2, host='a', status=200)
+    registry.inc('http_responses_total', status=429, host='a')
+    registry.inc('pages_total')
+    assert registry.snapshot()['counters'] == {
+        'http_responses_total': {'host=a,status=200': 3, 'host=a,status=429': 1},
+        'pages_total': {'': 1},
+    }
+
+
+def test_histogram_buckets_and_quantiles():
+    histogram = Histogram(bounds=(0.1, 1.0, math.inf))
+    for value in (0.05, 0.1, 0.5, 0.7, 3.0):
+        histogram.observe(value)
+    assert histogram.counts == [2, 2, 1]  # a value on a bound falls in that bucket
+    assert histogram.quantile(0.4) == 0.1
+    assert histogram.quantile(0.8) == 1.0
+    assert histogram.quantile(1.0) == 3.0  # the last bucket reports the max
+    assert histogram.to_dict()['count'] == 5
+    assert Histogram().quantile(0.5) == 0.0
+
+
+def test_timer_records_even_when_the_block_raises():
+    registry = Metrics(enabled=True)
+    try:
+        with registry.timer('fetch_seconds', outcome='error'):
+            raise RuntimeError
+    except RuntimeError:
+        pass
+    assert registry.snapshot()['histograms']['fetch_seconds']['outcome=error']['count'] == 1
+
+
+def test_snapshot_is_json_serialisable_and_reset_clears_it():
+    registry = Metrics(enabled=True)
+    registry.inc('pages_total')
+    registry.observe('fetch_seconds', 0.2)
+    json.dumps(registry.snapshot())
+    registry.reset()
+    assert registry.snapshot()['counters'] == {}
+
+
+def test_prometheus_exposition():
+    registry = Metrics(enabled=True, prefix='test_')
+    registry.inc('pages_total', outcome='success')
+    registry.observe('fetch_seconds', 0.3)
+    registry.observe('fetch_seconds', 20)
+    lines = registry.to_prometheus().splitlines()
+
+    assert lines[:2] == ['# TYPE test_pages_total counter', 'test_pages_total{outcome="success"} 1']
+    assert '# TYPE test_fetch_seconds histogram' in lines
+    assert 'test_fetch_seconds_bucket{le="0.25"} 0' in lines
+    assert 'test_fetch_seconds_bucket{le="0.5"} 1' in lines
+    assert 'test_fetch_seconds_bucket{le="+Inf"} 2' in lines
+    assert 'test_fetch_seconds_sum 20.3' in lines
+    assert lines[-1] == 'test_fetch_seconds_count 2'
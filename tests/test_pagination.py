@@ -0,0 +1,110 @@
+import asyncio
+import json
+
+from flipkart_scraper_apify import (
+    MAX_CONSECUTIVE_EMPTY_PAGES,
+    FlipkartReviewScraper,
+    PageResult,
+    extract_pagination_info,
+    extract_reviews_from_json,
+    scrape_product_reviews_async,
+)
+from response_classifier import BLOCKED, EMPTY, SUCCESS
+from sample_pages import build_state
+
+
+def test_reads_pagination_and_summary_widgets():
+    info = extract_pagination_info(build_state(num_reviews=10, filler_items=5, total_pages=7))
+    assert info.total_pages == 7
+    assert info.total_reviews == 200
+    assert info.rating_histogram == {'5': 250, '4': 120, '3': 60, '2': 30, '1': 40}
+
+
+def test_ignores_counts_of_unrelated_widgets():
+    state = build_state(num_reviews=10, filler_items=5, total_pages=7)
+    slots = state['pageDataV4']['page']['data']
+    del slots['10003']  # no pagination widget
+    slots['10000'] = [{'widget': {'type': 'QNA_LIST', 'data': {'totalPages': 2, 'reviewCount': 3}}}]
+    info = extract_pagination_info(state)
+    assert info.total_pages is None
+    assert info.total_reviews == 200
+
+
+class FakeScraper(FlipkartReviewScraper):
+    """Serves `pages` pages of 10 reviews; page 1 claims `total_pages` pages."""
+
+    def __init__(self, pages, total_pages, failed=()):
+        super().__init__(page_concurrency=3)
+        self.pages = pages
+        self.total_pages = total_pages
+        self.failed = set(failed)
+        self.requested = []
+
+    async def fetch_page_result(self, url, params, page_num=None, on_state=None):
+        page = int(params['page'])
+        self.requested.append(page)
+        await asyncio.sleep(0)
+        if page in self.failed:
+            return PageResult([], BLOCKED, 'HTTP 403')
+        state = build_state(num_reviews=10 if page <= self.pages else 0, filler_items=1, seed=page,
+                            total_pages=self.total_pages)
+        if on_state:
+            on_state(json.dumps(state))
+        reviews = extract_reviews_from_json(state)
+        return PageResult(reviews, SUCCESS if reviews else EMPTY)
+
+
+def crawl(scraper, **kwargs):
+    async def run():
+        return [page async for page, _ in scraper.iter_review_pages('https://x/product-reviews/itm1', **kwargs)]
+    return asyncio.run(run())
+
+
+def test_accurate_page_count_stops_at_the_first_empty_page_past_the_plan():
+    scraper = FakeScraper(pages=4, total_pages=4)
+    assert crawl(scraper) == [1, 2, 3, 4]
+    # The page count is trusted: a single page past it is probed
+    assert max(scraper.requested) == 5
+    assert sorted(scraper.requested) == [1, 2, 3, 4, 5]
+
+
+def test_understated_page_count_is_a_lower_bound():
+    scraper = FakeScraper(pages=9, total_pages=3)
+    assert crawl(scraper) == list(range(1, 10))
+
+
+def test_overstated_page_count_falls_back_to_empty_pages():
+    scraper = FakeScraper(pages=3, total_pages=50)
+    assert crawl(scraper) == [1, 2, 3]
+    assert max(scraper.requested) < 3 + MAX_CONSECUTIVE_EMPTY_PAGES + scraper.page_concurrency + 1
+
+
+def test_max_reviews_still_limits_the_crawl():
+    scraper = FakeScraper(pages=9, total_pages=9)
+    assert crawl(scraper, max_reviews=25) == [1, 2, 3]
+
+
+def test_page_range_stops_at_end_page():
+    scraper = FakeScraper(pages=9, total_pages=9)
+    assert crawl(scraper, start_page=4, end_page=6) == [4, 5, 6]
+    assert max(scraper.requested) == 6
+
+
+def test_failed_pages_are_skipped_and_reported():
+    failed = []
+    scraper = FakeScraper(pages=5, total_pages=5, failed={3})
+    assert crawl(scraper, on_page_failed=lambda page, outcome: failed.append((page, outcome))) == [1, 2, 4, 5]
+    assert failed == [(3, BLOCKED)]
+
+
+def scrape(scraper):
+    return asyncio.run(scrape_product_reviews_async('https://www.flipkart.com/x/p/itm1?pid=PID1', scraper=scraper))
+
+
+def test_blocked_run_is_not_reported_as_success():
+    scraper = FakeScraper(pages=5, total_pages=5, failed=range(1, 50))
+    assert scrape(scraper) == ([], 0, False)
+
+
+def test_empty_product_is_a_success():
+    assert scrape(FakeScraper(pages=0, total_pages=1)) == ([], 0, True)
@@ -0,0 +1,59 @@
+import asyncio
+import json
+
+import pytest
+
+from flipkart_scraper_apify import FlipkartReviewScraper
+from metrics import metrics
+from parse_pool import ParsePool
+from sample_pages import build_page, build_state
+
+TRAILING_JS_PAGE = (f'<html><script>window.__INITIAL_STATE__ = {json.dumps(build_state(num_reviews=4, filler_items=5))};'
+                    'window.__FOO__ = {"a": 1};</script></html>')
+
+
+@pytest.fixture
+def enabled_metrics():
+    metrics.reset()
+    metrics.enable()
+    yield metrics
+    metrics.enable(False)
+    metrics.reset()
+
+
+def parse_both(html, keep_state=True):
+    """Parse a page inline and in a one-process parse pool."""
+    async def run(parse_workers):
+        scraper = FlipkartReviewScraper(parse_workers=parse_workers)
+        try:
+            return await scraper._parse_page(html, keep_state)
+        finally:
+            if scraper.parse_pool is not None:
+                scraper.parse_pool.close()
+    return asyncio.run(run(0)), asyncio.run(run(1))
+
+
+@pytest.mark.parametrize('html', [build_page(num_reviews=10, filler_items=20), TRAILING_JS_PAGE])
+def test_pool_returns_what_inline_parsing_returns(html):
+    inline, pooled = parse_both(html)
+    assert pooled == inline
+    assert inline[1]
+
+
+def test_fallbacks_are_counted_in_the_parent_process(enabled_metrics):
+    parse_both(TRAILING_JS_PAGE)
+    assert enabled_metrics.snapshot()['counters']['state_fallbacks_total'] == {'path=raw_decode': 2}
+
+
+def test_errors_come_back_as_value_errors():
+    async def run():
+        pool = ParsePool(workers=1)
+        try:
+            with pytest.raises(ValueError):
+                await pool.run(json.loads, '{"broken": ')
+            assert await pool.run(sorted, [3, 1, 2]) == [1, 2, 3]
+        finally:
+            pool.close()
+        return pool.stats()
+
+    assert asyncio.run(run())['jobs'] == 2
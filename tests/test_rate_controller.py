@@ -0,0 +1,56 @@
+import asyncio
+import random
+import time
+
+from rate_controller import AdaptiveRateController
+
+
+def test_success_increases_up_to_max_rate():
+    controller = AdaptiveRateController(initial_rate=2.0, max_rate=3.0, increase_step=0.5)
+    controller.record_success()
+    assert controller.rate == 2.25
+    for _ in range(100):
+        controller.record_success()
+    assert controller.rate == 3.0
+    assert controller.successes == 101
+
+
+def test_throttle_halves_once_per_cooldown_and_respects_min_rate():
+    controller = AdaptiveRateController(initial_rate=4.0, min_rate=0.5, base_backoff=0.01, decrease_cooldown=60)
+    controller.record_throttle('HTTP 429')
+    controller.record_throttle('HTTP 429')  # same burst of failures
+    assert controller.rate == 2.0
+    assert controller.throttles == 2
+
+    controller = AdaptiveRateController(initial_rate=1.0, min_rate=0.5, base_backoff=0.01, decrease_cooldown=0)
+    for _ in range(5):
+        controller.record_throttle('HTTP 503')
+    assert controller.rate == 0.5
+
+
+def test_throttle_pauses_every_caller():
+    controller = AdaptiveRateController(initial_rate=10.0, base_backoff=1.0)
+    pause = controller.record_throttle('HTTP 403')
+    assert 0.1 <= pause <= 1.0
+    assert controller._next_slot >= time.monotonic() + pause - 0.05
+
+
+def test_backoff_grows_exponentially_up_to_the_cap():
+    controller = AdaptiveRateController(base_backoff=2.0, max_backoff=10.0)
+    rng = random.Random(1)
+    for attempt, ceiling in [(1, 2.0), (2, 4.0), (3, 8.0), (4, 10.0), (10, 10.0)]:
+        delay = controller.backoff_delay(attempt, rng)
+        assert ceiling / 10 <= delay <= ceiling
+
+
+def test_acquire_paces_requests_at_the_rate():
+    controller = AdaptiveRateController(initial_rate=50.0, max_rate=50.0)
+
+    async def run():
+        started = time.monotonic()
+        for _ in range(6):
+            await controller.acquire()
+        return time.monotonic() - started
+
+    # The first request goes straight away, the next five wait 1/50 s each
+    assert asyncio.run(run()) >= 5 / 50 - 0.01
@@ -0,0 +1,120 @@
+import asyncio
+import json
+
+import pytest
+
+import response_cache
+from flipkart_scraper_apify import FlipkartReviewScraper
+from response_cache import CACHE_OFF, CACHE_READ_WRITE, CACHE_REPLAY, ResponseCache, cache_key
+from response_classifier import EMPTY, SUCCESS
+from sample_pages import build_state
+
+URL = 'https://www.flipkart.com/x/product-reviews/itm1'
+
+
+class Clock:
+    def __init__(self, now=1_700_000_000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(response_cache.time, 'time', clock.time)
+    return clock
+
+
+def page(n):
+    return {'page': str(n)}
+
+
+def test_key_ignores_parameter_order_and_trailing_slash():
+    assert cache_key(URL, {'page': '2', 'sortOrder': 'MOST_RECENT'}) == \
+        cache_key(URL + '/', {'sortOrder': 'MOST_RECENT', 'page': '2'})
+    assert cache_key(URL, page(1)) != cache_key(URL, page(2))
+
+
+def test_entries_expire_after_the_ttl(tmp_path, clock):
+    async def run():
+        cache = ResponseCache(str(tmp_path), ttl=60)
+        await cache.put(URL, page(1), '{"a": 1}')
+        clock.now += 59
+        fresh = await cache.get(URL, page(1))
+        clock.now += 2
+        return cache, fresh, await cache.get(URL, page(1))
+
+    cache, fresh, expired = asyncio.run(run())
+    assert fresh == '{"a": 1}'
+    assert expired is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_least_recently_used_entry_is_evicted(tmp_path, clock):
+    async def run():
+        cache = ResponseCache(str(tmp_path))
+        for n in (1, 2):
+            await cache.put(URL, page(n), json.dumps({'page': n, 'filler': 'x' * 100}))
+            clock.now += 1
+        cache.max_bytes = cache.stats()['bytes']
+        assert await cache.get(URL, page(1)) is not None  # page 2 is now the oldest
+        clock.now += 1
+        await cache.put(URL, page(3), json.dumps({'page': 3, 'filler': 'x' * 100}))
+        return cache, [await cache.get(URL, page(n)) is not None for n in (1, 2, 3)]
+
+    cache, present = asyncio.run(run())
+    assert present == [True, False, True]
+    assert cache.evictions == 1
+    assert len(list(tmp_path.rglob('*' + response_cache.CACHE_FILE_SUFFIX))) == 2
+
+
+def test_recency_survives_reopening(tmp_path):
+    async def run():
+        cache = ResponseCache(str(tmp_path))
+        for n in (1, 2):
+            await cache.put(URL, page(n), json.dumps({'page': n}))
+        await cache.get(URL, page(1))
+        reopened = ResponseCache(str(tmp_path))
+        return list(reopened._entries)
+
+    assert asyncio.run(run()) == [cache_key(URL, page(2)), cache_key(URL, page(1))]
+
+
+def test_replay_serves_expired_entries_and_never_stores(tmp_path, clock):
+    async def run():
+        await ResponseCache(str(tmp_path), ttl=60).put(URL, page(1), '{"a": 1}')
+        clock.now += 3600
+        cache = ResponseCache(str(tmp_path), mode=CACHE_REPLAY, ttl=60)
+        await cache.put(URL, page(2), '{"b": 2}')
+        return cache, await cache.get(URL, page(1)), await cache.get(URL, page(2))
+
+    cache, replayed, missing = asyncio.run(run())
+    assert replayed == '{"a": 1}'
+    assert missing is None
+    assert len(cache) == 1
+
+
+def test_off_mode_touches_nothing(tmp_path):
+    cache = ResponseCache(str(tmp_path / 'cache'), mode=CACHE_OFF)
+    asyncio.run(cache.put(URL, page(1), '{}'))
+    assert asyncio.run(cache.get(URL, page(1))) is None
+    assert not (tmp_path / 'cache').exists()
+    with pytest.raises(ValueError):
+        ResponseCache(str(tmp_path), mode='sometimes')
+
+
+def test_scraper_replays_pages_without_fetching(tmp_path):
+    state = json.dumps(build_state(num_reviews=3, filler_items=5))
+
+    async def run():
+        await ResponseCache(str(tmp_path), mode=CACHE_READ_WRITE).put(URL, page(1), state)
+        scraper = FlipkartReviewScraper(response_cache=ResponseCache(str(tmp_path), mode=CACHE_REPLAY))
+        scraper.open = lambda: None  # no session: any fetch would fail
+        return (await scraper.fetch_page_result(URL, page(1)),
+                await scraper.fetch_page_result(URL, page(2)))
+
+    cached, missing = asyncio.run(run())
+    assert (cached.outcome, len(cached.reviews)) == (SUCCESS, 3)
+    assert (missing.outcome, missing.reviews) == (EMPTY, [])
@@ -0,0 +1,36 @@
+from response_classifier import (
+    BLOCKED,
+    EMPTY,
+    STRIPPED,
+    SUCCESS,
+    THROTTLED,
+    classify_html,
+    classify_reviews,
+    classify_status,
+)
+
+
+def test_status_codes():
+    assert classify_status(403).outcome == BLOCKED
+    assert classify_status(401).outcome == BLOCKED
+    assert classify_status(429).outcome == THROTTLED
+    assert classify_status(503).outcome == THROTTLED
+    assert classify_status(200) is None
+    assert classify_status(404) is None
+
+
+def test_pages_without_state():
+    assert classify_html('<html>window.__INITIAL_STATE__ = {};</html>') is None
+    blocked = classify_html('<html>Please solve the CAPTCHA</html>')
+    assert blocked.outcome == BLOCKED and not blocked.usable
+    assert classify_html('<html><body>Flipkart</body></html>').outcome == STRIPPED
+
+
+def test_empty_page_needs_a_review_list():
+    state = '{"pageDataV4": {"page": {}}, "renderableComponents": []}'
+    assert classify_reviews(state, 10).outcome == SUCCESS
+    assert classify_reviews(state, 0).outcome == EMPTY
+    assert classify_reviews(state.encode('utf-8'), 0).outcome == EMPTY
+    assert classify_reviews(state, 0).usable
+    stripped = classify_reviews('{"pageDataV4": {}}', 0)
+    assert stripped.outcome == STRIPPED and not stripped.usable
@@ -0,0 +1,40 @@
+import pytest
+
+from review_dedup import DEDUP_BLOOM, DEDUP_EXACT, DEDUP_OFF, BloomFilter, ReviewDeduplicator, _digest
+
+
+@pytest.mark.parametrize('mode', [DEDUP_EXACT, DEDUP_BLOOM])
+def test_duplicates_are_dropped_and_counted_per_product(mode):
+    dedup = ReviewDeduplicator(mode, expected_reviews=1000)
+    assert dedup.add('r1', 1)
+    assert dedup.add('r2', 1)
+    assert not dedup.add('r1', 2)
+    assert not dedup.add('r2', 2)
+    assert dedup.add(None, 2) and dedup.add('', 2)  # reviews without an ID are always kept
+    assert dedup.duplicates_for(1) == 0
+    assert dedup.duplicates_for(2) == 2
+    assert dedup.stats() == {'mode': mode, 'unique_reviews': 2, 'duplicates_dropped': 2}
+
+
+def test_off_keeps_everything():
+    dedup = ReviewDeduplicator(DEDUP_OFF)
+    assert not dedup.enabled
+    assert dedup.add('r1') and dedup.add('r1')
+
+
+def test_unknown_mode_is_rejected():
+    with pytest.raises(ValueError):
+        ReviewDeduplicator('fuzzy')
+
+
+def test_bloom_false_positive_rate_stays_near_the_target():
+    bloom = BloomFilter(expected_items=10_000, false_positive_rate=0.01)
+    for i in range(10_000):
+        bloom.add(_digest(f'seen-{i}'))
+
+    def contains(item):
+        return all(bloom.bits[position // 8] & (1 << position % 8) for position in bloom._positions(_digest(item)))
+
+    assert all(contains(f'seen-{i}') for i in range(10_000))
+    false_positives = sum(contains(f'new-{i}') for i in range(10_000))
+    assert false_positives < 200
@@ -0,0 +1,86 @@
+import asyncio
+import gzip
+import json
+import os
+import threading
+import time
+
+import review_export
+from flipkart_scraper_apify import Review
+from review_export import EXPORT_NDJSON, ReviewExporter
+
+
+def read_ndjson(path):
+    with open(path, 'rb') as f:
+        data = f.read()
+    if path.endswith('.zst'):
+        data = review_export.zstandard.ZstdDecompressor().decompressobj().decompress(data)
+    else:
+        data = gzip.decompress(data)
+    return [json.loads(line) for line in data.decode('utf-8').splitlines()]
+
+
+def test_pidless_products_share_the_partition_until_both_close(tmp_path):
+    async def run():
+        exporter = ReviewExporter(str(tmp_path), [EXPORT_NDJSON], row_group_size=2)
+        exporter.open_partition(None)
+        exporter.open_partition(None)
+        for i in range(3):
+            await exporter.write(Review(review_id=f'a{i}', flipkart_url='https://x/a'))
+            await exporter.write(Review(review_id=f'b{i}', flipkart_url='https://x/b'))
+        assert await exporter.close_partition(None) == []  # the other product is still writing
+        await exporter.write(Review(review_id='b3', flipkart_url='https://x/b'))
+        paths = await exporter.close_partition(None)
+        return exporter, paths
+
+    exporter, paths = asyncio.run(run())
+    assert len(paths) == 1
+    assert os.path.basename(os.path.dirname(paths[0])) == 'product_id=unknown'
+    ids = [row['review_id'] for row in read_ndjson(paths[0])]
+    assert sorted(ids) == ['a0', 'a1', 'a2', 'b0', 'b1', 'b2', 'b3']
+    assert exporter.rows_written == 7
+
+
+def test_concurrent_first_writes_open_one_partition(tmp_path):
+    async def run():
+        exporter = ReviewExporter(str(tmp_path), [EXPORT_NDJSON])
+        await asyncio.gather(*(exporter.write(Review(review_id=str(i), product_id='P1')) for i in range(5)))
+        return await exporter.close()
+
+    paths = asyncio.run(run())
+    assert len(paths) == 1
+    assert len(read_ndjson(paths[0])) == 5
+
+
+def test_flushes_of_a_shared_partition_never_overlap(tmp_path, monkeypatch):
+    active, overlaps = [], []
+    lock = threading.Lock()
+    write = review_export._Partition.write
+
+    def slow_write(partition, rows):
+        with lock:
+            active.append(1)
+            overlaps.append(len(active) > 1)
+        time.sleep(0.01)
+        write(partition, rows)
+        with lock:
+            active.pop()
+
+    monkeypatch.setattr(review_export._Partition, 'write', slow_write)
+
+    async def run():
+        exporter = ReviewExporter(str(tmp_path), [EXPORT_NDJSON], row_group_size=2)
+        exporter.open_partition(None)
+        exporter.open_partition(None)
+
+        async def crawl(name):
+            for i in range(10):
+                await exporter.write(Review(review_id=f'{name}{i}'))
+
+        await asyncio.gather(crawl('a'), crawl('b'))
+        await exporter.close_partition(None)
+        return await exporter.close_partition(None)
+
+    paths = asyncio.run(run())
+    assert not any(overlaps)
+    assert len(read_ndjson(paths[0])) == 20
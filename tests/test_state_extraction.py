@@ -0,0 +1,79 @@
+import json
+
+import pytest
+
+import json_backend
+from flipkart_scraper_apify import (
+    Review,
+    extract_json_from_html,
+    extract_page,
+    extract_reviews_from_html,
+    extract_reviews_from_json,
+    parse_page,
+)
+from sample_pages import build_page, build_state
+
+
+def state_page(script: str) -> str:
+    return f'<html><head><script>{script}</script></head><body></body></html>'
+
+
+@pytest.fixture
+def state():
+    return build_state(num_reviews=3, filler_items=10)
+
+
+@pytest.fixture(params=[None, 'json'])
+def backend(request):
+    """Run each test with the default backend and with the stdlib one."""
+    previous = json_backend.BACKEND
+    if request.param:
+        json_backend.set_backend(request.param)
+    yield
+    json_backend.set_backend(previous)
+
+
+def test_plain_state_script(backend, state):
+    html = state_page(f'window.__INITIAL_STATE__ = {json.dumps(state)};')
+    state_json, reviews, fallback = extract_page(html)
+    assert json.loads(state_json) == state
+    assert len(reviews) == 3
+    assert fallback is None
+
+
+def test_state_script_with_trailing_js(backend, state):
+    # Still ends in '}', so the </script> slice looks like the object but is not valid JSON
+    html = state_page(f'window.__INITIAL_STATE__ = {json.dumps(state)};window.__FOO__ = {{"a": 1}};')
+    expected = extract_reviews_from_json(state)
+
+    state_json, reviews, fallback = extract_page(html)
+    assert json.loads(state_json) == state
+    assert reviews == expected == extract_reviews_from_html(html)
+    assert fallback == 'raw_decode'
+    assert extract_json_from_html(html) == state
+
+    _, records, fallback = parse_page(html, keep_state=True)
+    assert [Review(*record) for record in records] == expected
+    assert fallback == 'raw_decode'
+
+
+def test_closing_brace_and_semicolon_inside_strings(backend, state):
+    state['note'] = 'ends like a script: };'
+    html = state_page(f'window.__INITIAL_STATE__={json.dumps(state)}')
+    state_json, reviews, _ = extract_page(html)
+    assert json.loads(state_json)['note'] == 'ends like a script: };'
+    assert len(reviews) == 3
+
+
+def test_marker_mentioned_before_assignment():
+    html = build_page(num_reviews=2)
+    assert 'window.__INITIAL_STATE__ is set below' in html
+    _, reviews, _ = extract_page(html)
+    assert len(reviews) == 2
+
+
+def test_page_without_state():
+    with pytest.raises(ValueError):
+        extract_page('<html><body>captcha</body></html>')
+    with pytest.raises(ValueError):
+        parse_page('<html><script>window.__INITIAL_STATE__ = {"broken": </script></html>')
@@ -0,0 +1,32 @@
+from url_planner import plan_products
+
+
+def test_listings_of_one_review_path_are_scraped_once():
+    urls = [
+        'https://www.flipkart.com/phone-blue/p/itm123?pid=PIDBLUE&lid=L1',
+        'not a product url',
+        'http://flipkart.com/phone-blue/p/itm123?pid=PIDRED&utm_source=x',
+        'https://www.flipkart.com/other/p/itm999?pid=OTHER',
+    ]
+    targets, invalid = plan_products(urls)
+
+    assert invalid == [(2, 'not a product url')]
+    assert [target.review_url for target in targets] == [
+        'https://www.flipkart.com/phone-blue/product-reviews/itm123',
+        'https://www.flipkart.com/other/product-reviews/itm999',
+    ]
+    phone = targets[0]
+    assert (phone.url_index, phone.url, phone.pid) == (1, urls[0], 'PIDBLUE')
+    assert phone.url_indexes == [1, 3]
+    assert phone.pids == ['PIDBLUE', 'PIDRED']
+
+
+def test_fan_out_gives_every_input_url_a_summary():
+    urls = ['https://www.flipkart.com/a/p/itm1?pid=A', 'https://www.flipkart.com/a/p/itm1?pid=B']
+    (target,), _ = plan_products(urls)
+    summaries = target.fan_out({'flipkart_url': urls[0], 'product_id': 'A', 'url_index': 1, 'total_reviews': 7})
+
+    assert len(summaries) == 2
+    assert 'coalesced_into' not in summaries[0]
+    assert summaries[1] == {'flipkart_url': urls[1], 'product_id': 'B', 'url_index': 2, 'total_reviews': 7,
+                            'coalesced_into': urls[0]}
@@ -0,0 +1,158 @@
+import asyncio
+
+import pytest
+
+from url_planner import plan_products
+from work_queue import (
+    DONE,
+    FAILED,
+    ApifyWorkQueue,
+    ItemResult,
+    SqliteWorkQueue,
+    merge_item_results,
+    plan_work_items,
+)
+
+URLS = ['https://www.flipkart.com/a/p/itm1?pid=A', 'https://www.flipkart.com/b/p/itm2?pid=B',
+        'https://www.flipkart.com/a/p/itm1?pid=A2']
+
+
+@pytest.fixture
+def targets():
+    targets, invalid = plan_products(URLS)
+    assert not invalid
+    return targets
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_plan_splits_large_products_into_ranges(targets):
+    items = plan_work_items(targets[0], total_pages=7, pages_per_item=3, reviews_per_page=10)
+    assert [(item.start_page, item.end_page, item.collected) for item in items] == [
+        (1, 3, 0), (4, 6, 30), (7, None, 60)]
+    assert len({item.id for item in items}) == 3
+    assert plan_work_items(targets[0], total_pages=3, pages_per_item=3)[0].id == targets[0].review_url
+    assert plan_work_items(targets[1])[0].urls == [URLS[1]]
+
+
+def test_leases_are_exclusive_and_adding_is_idempotent(tmp_path, targets):
+    async def scenario():
+        a = SqliteWorkQueue(str(tmp_path / 'q.sqlite'), 'a')
+        b = SqliteWorkQueue(str(tmp_path / 'q.sqlite'), 'b')
+        items = [item for target in targets for item in plan_work_items(target)]
+        assert await a.add(items) == 2
+        assert await b.add(items) == 0
+        first, second = await a.lease(), await b.lease()
+        assert {first.id, second.id} == {target.review_url for target in targets}
+        assert await a.lease() is None
+        await a.complete(first, {'summaries': []})
+        counts = await b.counts()
+        assert (counts['done'], counts['leased'], counts['remaining']) == (1, 1, 1)
+
+    run(scenario())
+
+
+def test_failed_items_are_retried_then_given_up(tmp_path, targets):
+    async def scenario():
+        queue = SqliteWorkQueue(str(tmp_path / 'q.sqlite'), 'a', max_attempts=2)
+        await queue.add(plan_work_items(targets[0]))
+        item = await queue.lease()
+        assert await queue.fail(item, 'blocked') is True
+        item = await queue.lease()
+        assert item.attempts == 2
+        assert await queue.fail(item, 'blocked again') is False
+        assert await queue.lease() is None
+        [result] = await queue.results()
+        assert (result.status, result.error) == (FAILED, 'blocked again')
+
+    run(scenario())
+
+
+def test_expired_leases_are_handed_out_until_attempts_run_out(tmp_path, targets):
+    async def scenario():
+        queue = SqliteWorkQueue(str(tmp_path / 'q.sqlite'), 'a', lease_seconds=0, max_attempts=2)
+        await queue.add(plan_work_items(targets[0]))
+        assert (await queue.lease()).attempts == 1
+        await asyncio.sleep(0.01)
+        assert (await queue.lease()).attempts == 2  # the first worker died
+        await asyncio.sleep(0.01)
+        assert await queue.lease() is None  # and so did the second
+        counts = await queue.counts()
+        assert (counts['failed'], counts['remaining']) == (1, 0)
+
+    run(scenario())
+
+
+class FakeRequestQueue:
+    """The request queue client calls ApifyWorkQueue makes; locks never outlive a lease() call."""
+
+    def __init__(self):
+        self.requests = {}
+
+    async def batch_add_requests(self, requests):
+        processed = []
+        for request in requests:
+            present = request['uniqueKey'] in self.requests
+            if not present:
+                self.requests[request['uniqueKey']] = {**request, 'id': request['uniqueKey'], 'retryCount': 0}
+            processed.append({'wasAlreadyPresent': present})
+        return {'processedRequests': processed}
+
+    async def list_and_lock_head(self, lock_secs, limit):
+        # Every earlier lock has expired: the worker that held it died
+        pending = [request for request in self.requests.values() if not request.get('handledAt')]
+        return {'items': [{'id': request['id']} for request in pending[:limit]]}
+
+    async def get_request(self, request_id):
+        return dict(self.requests[request_id])
+
+    async def update_request(self, request):
+        self.requests[request['id']] = dict(request)
+
+    async def get(self):
+        return {'totalRequestCount': len(self.requests),
+                'handledRequestCount': sum(bool(request.get('handledAt')) for request in self.requests.values())}
+
+
+class FakeClient:
+    def __init__(self):
+        self.queue = FakeRequestQueue()
+
+    def request_queue(self, queue_id, client_key=None):
+        return self.queue
+
+
+def test_apify_queue_counts_expired_leases_as_attempts(targets):
+    async def scenario():
+        client = FakeClient()
+        queue = ApifyWorkQueue('crawl', 'a', client, results_store=None, queue_id='q', max_attempts=2)
+        await queue.add(plan_work_items(targets[0]))
+        assert (await queue.lease()).attempts == 1
+        assert (await queue.lease()).attempts == 2
+        assert await queue.lease() is None
+        request, = client.queue.requests.values()
+        assert request['userData']['status'] == FAILED
+        assert (await queue.counts())['remaining'] == 0
+
+    run(scenario())
+
+
+def test_merge_adds_up_page_ranges_per_input_url(targets):
+    product = targets[0]  # URLs 1 and 3
+    first, second = plan_work_items(product, total_pages=4, pages_per_item=2)
+
+    def summaries(total, **extra):
+        base = {'product_id': 'A', 'total_reviews': total, 'success': True, 'duplicates_dropped': 1, **extra}
+        return {'summaries': product.fan_out({**base, 'flipkart_url': URLS[0], 'url_index': 1})}
+
+    merged, failed = merge_item_results([
+        ItemResult(second, DONE, summaries(15, failed_pages=[4])),
+        ItemResult(first, DONE, summaries(20, total_pages=4)),
+        ItemResult(plan_work_items(targets[1])[0], FAILED, error='blocked'),
+    ])
+    assert [(s['url_index'], s['total_reviews'], s['duplicates_dropped'], s['total_pages'], s['work_items'])
+            for s in merged] == [(1, 35, 2, 4, 2), (3, 35, 2, 4, 2)]
+    assert merged[0]['failed_pages'] == [4]
+    assert failed == [{'url': URLS[1], 'error': 'blocked', 'url_index': 2}]
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+URL planning - canonicalise input URLs and scrape each product once
+"""
+
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from flipkart_scraper_apify import canonical_review_url
+
+
+@dataclass
+class ProductTarget:
+    """One product to scrape, with every input URL that points at it."""
+    review_url: str
+    pid: Optional[str]
+    url_indexes: List[int] = field(default_factory=list)  # 1-based positions in the input
+    urls: List[str] = field(default_factory=list)
+    pids: List[Optional[str]] = field(default_factory=list)  # pid of each input URL
+
+    @property
+    def url_index(self) -> int:
+        """Position of the first input URL, which the reviews are pushed under."""
+        return self.url_indexes[0]
+
+    @property
+    def url(self) -> str:
+        return self.urls[0]
+
+    def fan_out(self, summary: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        One summary per input URL, from the summary of the scraped product.
+
+        Args:
+            summary: Summary for the first input URL
+
+        Returns:
+            Summaries in input order; the others point at the URL their reviews were pushed under
+        """
+        summaries = [summary]
+        for index, url, pid in zip(self.url_indexes[1:], self.urls[1:], self.pids[1:]):
+            summaries.append({
+                **summary,
+                'flipkart_url': url,
+                'product_id': pid,
+                'url_index': index,
+                'coalesced_into': self.url,
+            })
+        return summaries
+
+
+def plan_products(urls: List[str]) -> Tuple[List[ProductTarget], List[Tuple[int, str]]]:
+    """
+    Group input URLs by the review URL they resolve to.
+
+    Args:
+        urls: Flipkart product URLs, in input order
+
+    Returns:
+        Tuple of (targets in order of first appearance, [(url_index, url)] of invalid URLs)
+    """
+    targets: Dict[str, ProductTarget] = {}
+    invalid = []
+
+    for index, url in enumerate(urls, 1):
+        review_url, pid, _ = canonical_review_url(url)
+        if not review_url:
+            invalid.append((index, url))
+            continue
+        target = targets.setdefault(review_url, ProductTarget(review_url=review_url, pid=pid))
+        target.url_indexes.append(index)
+        target.urls.append(url)
+        target.pids.append(pid)
+
+    return list(targets.values()), invalid
@@ -0,0 +1,528 @@
+#!/usr/bin/env python3
+"""
+Work queue - shares the products (or page ranges) of one crawl between several actor runs
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from apify import Actor
+
+from url_planner import ProductTarget
+
+DEFAULT_LEASE_SECONDS = 600
+DEFAULT_MAX_ATTEMPTS = 3
+SQLITE_PREFIX = 'sqlite:'
+
+PENDING = 'pending'
+LEASED = 'leased'
+DONE = 'done'
+FAILED = 'failed'
+
+_APIFY_BATCH_SIZE = 25  # requests per batch_add_requests call
+
+
+@dataclass
+class WorkItem:
+    """One product, or one range of its review pages, for a worker to scrape."""
+    review_url: str
+    pid: Optional[str]
+    url_indexes: List[int] = field(default_factory=list)
+    urls: List[str] = field(default_factory=list)
+    pids: List[Optional[str]] = field(default_factory=list)
+    start_page: int = 1
+    end_page: Optional[int] = None  # None: every page from start_page on
+    collected: int = 0  # reviews expected on the pages before start_page; they count towards max_reviews
+    attempts: int = 0  # set when the item is leased
+    handle: Any = field(default=None, repr=False, compare=False)  # backend's own record of the lease
+
+    @property
+    def id(self) -> str:
+        """Stable ID, so planning the same crawl twice queues nothing new."""
+        if self.start_page == 1 and self.end_page is None:
+            return self.review_url
+        return f'{self.review_url}#pages={self.start_page}-{self.end_page or ""}'
+
+    @property
+    def target(self) -> ProductTarget:
+        return ProductTarget(review_url=self.review_url, pid=self.pid, url_indexes=list(self.url_indexes),
+                             urls=list(self.urls), pids=list(self.pids))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'review_url': self.review_url,
+            'pid': self.pid,
+            'url_indexes': self.url_indexes,
+            'urls': self.urls,
+            'pids': self.pids,
+            'start_page': self.start_page,
+            'end_page': self.end_page,
+            'collected': self.collected,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], attempts: int = 0, handle: Any = None) -> 'WorkItem':
+        return cls(review_url=data['review_url'], pid=data.get('pid'), url_indexes=data.get('url_indexes') or [],
+                   urls=data.get('urls') or [], pids=data.get('pids') or [], start_page=data.get('start_page', 1),
+                   end_page=data.get('end_page'), collected=data.get('collected', 0), attempts=attempts,
+                   handle=handle)
+
+
+@dataclass
+class ItemResult:
+    """How a finished work item went."""
+    item: WorkItem
+    status: str  # DONE or FAILED
+    result: Optional[Dict[str, Any]] = None  # what the worker passed to complete()
+    error: Optional[str] = None
+
+
+def plan_work_items(target: ProductTarget, total_pages: Optional[int] = None, pages_per_item: int = 0,
+                    reviews_per_page: int = 0) -> List[WorkItem]:
+    """
+    Split a product into work items.
+
+    Args:
+        target: Product to scrape
+        total_pages: Pages to scrape, if known (read from page 1, clamped by max_reviews)
+        pages_per_item: Pages per work item; 0 keeps the whole product in one item
+        reviews_per_page: Reviews on a full page, used to estimate `collected` for later ranges
+
+    Returns:
+        One item for the whole product, or one per range of pages_per_item pages.
+        The last range is open-ended, in case the page count is too low.
+    """
+    base = dict(review_url=target.review_url, pid=target.pid, url_indexes=list(target.url_indexes),
+                urls=list(target.urls), pids=list(target.pids))
+    if not pages_per_item or not total_pages or total_pages <= pages_per_item:
+        return [WorkItem(**base)]
+    starts = range(1, total_pages + 1, pages_per_item)
+    return [
+        WorkItem(**base, start_page=start, end_page=start + pages_per_item - 1 if start != starts[-1] else None,
+                 collected=(start - 1) * reviews_per_page)
+        for start in starts
+    ]
+
+
+def merge_item_results(results: List[ItemResult]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    Merge the summaries workers reported into one summary per input URL.
+
+    Page ranges of the same product are added up: review and duplicate
+    counts are summed, failed pages joined, and the page count and rating
+    histogram taken from the range that read page 1. A product with a failed
+    range is reported as failed.
+
+    Args:
+        results: Finished work items
+
+    Returns:
+        Tuple of (summaries, failed URLs as {'url', 'error', 'url_index'}), both in input order
+    """
+    products: Dict[str, List[ItemResult]] = {}
+    for item_result in results:
+        products.setdefault(item_result.item.review_url, []).append(item_result)
+
+    summaries = []
+    failed = []
+    for ranges in products.values():
+        ranges.sort(key=lambda item_result: item_result.item.start_page)
+        item = ranges[0].item
+        errors = [item_result.error or 'failed' for item_result in ranges if item_result.status != DONE]
+        if errors:
+            for index, url in zip(item.url_indexes, item.urls):
+                failed.append({'url': url, 'error': '; '.join(dict.fromkeys(errors)), 'url_index': index})
+            continue
+
+        merged: Dict[int, Dict[str, Any]] = {}
+        for item_result in ranges:
+            for summary in (item_result.result or {}).get('summaries') or []:
+                current = merged.get(summary['url_index'])
+                if current is None:
+                    merged[summary['url_index']] = dict(summary)
+                    continue
+                current['total_reviews'] += summary['total_reviews']
+                if 'duplicates_dropped' in summary:
+                    current['duplicates_dropped'] = current.get('duplicates_dropped', 0) + summary['duplicates_dropped']
+                if summary.get('failed_pages'):
+                    current['failed_pages'] = current.get('failed_pages', []) + summary['failed_pages']
+                for key in ('total_pages', 'rating_histogram'):
+                    if current.get(key) is None and summary.get(key) is not None:
+                        current[key] = summary[key]
+        for summary in merged.values():
+            if len(ranges) > 1:
+                summary['work_items'] = len(ranges)
+        summaries.extend(merged.values())
+
+    summaries.sort(key=lambda summary: summary['url_index'])
+    failed.sort(key=lambda failed_url: failed_url['url_index'])
+    return summaries, failed
+
+
+def default_owner() -> str:
+    """Name of this worker: the actor run ID on the platform, host and process ID locally."""
+    return Actor.config.actor_run_id or f'{socket.gethostname()}-{os.getpid()}'
+
+
+class SqliteWorkQueue:
+    """
+    Work queue in a SQLite file, for crawls whose workers share a disk.
+
+    Stands in for the Apify request queue locally: start a coordinator and
+    any number of worker processes with the same storage directory and
+    work queue name. Leasing is a single IMMEDIATE transaction, so two
+    processes never lease the same item; a lease that is not renewed
+    expires after lease_seconds and the item is handed out again.
+
+    Usage:
+        queue = SqliteWorkQueue('storage/work_queues/crawl.sqlite', owner='worker-1')
+        await queue.add(items)
+        item = await queue.lease()
+        await queue.complete(item, {'summaries': [...]})
+    """
+
+    def __init__(self, path: str, owner: str, lease_seconds: int = DEFAULT_LEASE_SECONDS,
+                 max_attempts: int = DEFAULT_MAX_ATTEMPTS):
+        """
+        Args:
+            path: SQLite file; created if missing
+            owner: Name of this worker, recorded on the items it leases
+            lease_seconds: How long a lease lasts without being renewed
+            max_attempts: Leases an item gets before it is marked failed
+        """
+        self.path = path
+        self.owner = owner
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS work_items ('
+            ' id TEXT PRIMARY KEY, payload TEXT NOT NULL, status TEXT NOT NULL,'
+            ' owner TEXT, lease_expires REAL, attempts INTEGER NOT NULL DEFAULT 0,'
+            ' result TEXT, error TEXT)'
+        )
+
+    def __repr__(self) -> str:
+        return f'SqliteWorkQueue({self.path!r})'
+
+    def _run(self, func, *args):
+        with self._lock:
+            return func(*args)
+
+    async def add(self, items: List[WorkItem]) -> int:
+        """Queue items, skipping any already queued; returns how many were new."""
+        def add():
+            with self._db:
+                cursor = self._db.executemany(
+                    'INSERT OR IGNORE INTO work_items (id, payload, status) VALUES (?, ?, ?)',
+                    [(item.id, json.dumps(item.to_dict()), PENDING) for item in items]
+                )
+            return cursor.rowcount
+        return await asyncio.to_thread(self._run, add)
+
+    def _fail_exhausted(self, now: float):
+        """Mark items failed whose last allowed lease expired (their worker died or hung every time)."""
+        self._db.execute(
+            'UPDATE work_items SET status = ?, owner = NULL, lease_expires = NULL,'
+            ' error = COALESCE(error, ?) WHERE status = ? AND lease_expires < ? AND attempts >= ?',
+            (FAILED, f'lease expired on each of {self.max_attempts} attempts', LEASED, now, self.max_attempts)
+        )
+
+    async def lease(self) -> Optional[WorkItem]:
+        """Lease the oldest pending item (or one whose lease expired); None if there is none."""
+        def lease():
+            now = time.time()
+            self._db.execute('BEGIN IMMEDIATE')
+            try:
+                self._fail_exhausted(now)
+                row = self._db.execute(
+                    'SELECT id, payload, attempts FROM work_items'
+                    ' WHERE status = ? OR (status = ? AND lease_expires < ?) ORDER BY rowid LIMIT 1',
+                    (PENDING, LEASED, now)
+                ).fetchone()
+                if row is not None:
+                    self._db.execute(
+                        'UPDATE work_items SET status = ?, owner = ?, lease_expires = ?, attempts = attempts + 1'
+                        ' WHERE id = ?',
+                        (LEASED, self.owner, now + self.lease_seconds, row[0])
+                    )
+                self._db.execute('COMMIT')
+            except BaseException:
+                self._db.execute('ROLLBACK')
+                raise
+            if row is None:
+                return None
+            return WorkItem.from_dict(json.loads(row[1]), attempts=row[2] + 1, handle=row[0])
+        return await asyncio.to_thread(self._run, lease)
+
+    async def renew(self, item: WorkItem):
+        """Extend this worker's lease of an item by lease_seconds."""
+        await asyncio.to_thread(self._run, self._db.execute,
+                                'UPDATE work_items SET lease_expires = ? WHERE id = ? AND owner = ? AND status = ?',
+                                (time.time() + self.lease_seconds, item.handle, self.owner, LEASED))
+
+    async def complete(self, item: WorkItem, result: Dict[str, Any]):
+        """Mark an item done and store what the worker reports about it."""
+        await asyncio.to_thread(self._run, self._db.execute,
+                                'UPDATE work_items SET status = ?, owner = ?, result = ?, error = NULL WHERE id = ?',
+                                (DONE, self.owner, json.dumps(result), item.handle))
+
+    async def fail(self, item: WorkItem, error: str) -> bool:
+        """
+        Give an item back after a failed attempt.
+
+        Returns:
+            True if it will be retried, False if it ran out of attempts and is marked failed
+        """
+        retry = item.attempts < self.max_attempts
+        await asyncio.to_thread(self._run, self._db.execute,
+                                'UPDATE work_items SET status = ?, owner = NULL, lease_expires = NULL, error = ?'
+                                ' WHERE id = ?',
+                                (PENDING if retry else FAILED, error, item.handle))
+        return retry
+
+    async def counts(self) -> Dict[str, int]:
+        """Items by status, plus 'total', 'finished' (done or failed) and 'remaining'."""
+        def counts():
+            self._fail_exhausted(time.time())
+            rows = self._db.execute(
+                'SELECT CASE WHEN status = ? AND lease_expires < ? THEN ? ELSE status END, COUNT(*)'
+                ' FROM work_items GROUP BY 1', (LEASED, time.time(), PENDING)
+            ).fetchall()
+            by_status = {PENDING: 0, LEASED: 0, DONE: 0, FAILED: 0, **dict(rows)}
+            by_status['total'] = sum(count for _, count in rows)
+            by_status['finished'] = by_status[DONE] + by_status[FAILED]
+            by_status['remaining'] = by_status[PENDING] + by_status[LEASED]
+            return by_status
+        return await asyncio.to_thread(self._run, counts)
+
+    async def results(self) -> List[ItemResult]:
+        """Every finished item, in the order it was queued."""
+        def results():
+            rows = self._db.execute(
+                'SELECT payload, status, result, error FROM work_items WHERE status IN (?, ?) ORDER BY rowid',
+                (DONE, FAILED)
+            ).fetchall()
+            return [
+                ItemResult(WorkItem.from_dict(json.loads(payload)), status,
+                           json.loads(result) if result else None, error)
+                for payload, status, result, error in rows
+            ]
+        return await asyncio.to_thread(self._run, results)
+
+    async def clear(self):
+        """Remove every item, e.g. those of an earlier crawl that used the same name."""
+        await asyncio.to_thread(self._run, self._db.execute, 'DELETE FROM work_items')
+
+    async def close(self):
+        await asyncio.to_thread(self._run, self._db.close)
+
+
+class ApifyWorkQueue:
+    """
+    Work queue in a named Apify request queue, shared by the runs of one crawl.
+
+    Each item is a request whose userData holds the item. Workers lease items
+    with the queue's request locks (list_and_lock_head, under a client key per
+    worker), so a lock that is not prolonged expires after lease_seconds and
+    the item goes back to the head of the queue. Finished items are marked
+    handled; what the worker reported is stored in a named key-value store,
+    '<queue name>-results', because request userData is small.
+
+    Usage:
+        queue = await ApifyWorkQueue.open('flipkart-crawl-abc', owner=run_id)
+        item = await queue.lease()
+        await queue.complete(item, {'summaries': [...]})
+    """
+
+    def __init__(self, name: str, owner: str, client, results_store, queue_id: str,
+                 lease_seconds: int = DEFAULT_LEASE_SECONDS, max_attempts: int = DEFAULT_MAX_ATTEMPTS):
+        self.name = name
+        self.owner = owner
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self._client = client
+        self._results = results_store
+        self._queue_id = queue_id
+        self._queue = client.request_queue(queue_id, client_key=owner)
+
+    def __repr__(self) -> str:
+        return f'ApifyWorkQueue({self.name!r})'
+
+    @classmethod
+    async def open(cls, name: str, owner: str, lease_seconds: int = DEFAULT_LEASE_SECONDS,
+                   max_attempts: int = DEFAULT_MAX_ATTEMPTS) -> 'ApifyWorkQueue':
+        """Open (or create) the named request queue and its results store."""
+        client = Actor.new_client()
+        queue_info = await client.request_queues().get_or_create(name=name)
+        results_store = await Actor.open_key_value_store(name=f'{name}-results', force_cloud=True)
+        return cls(name, owner, client, results_store, queue_info['id'], lease_seconds, max_attempts)
+
+    @staticmethod
+    def _result_key(item_id: str) -> str:
+        return 'RESULT-' + hashlib.sha1(item_id.encode('utf-8')).hexdigest()
+
+    async def add(self, items: List[WorkItem]) -> int:
+        """Queue items, skipping any already queued; returns how many were new."""
+        added = 0
+        for start in range(0, len(items), _APIFY_BATCH_SIZE):
+            requests = [
+                {'url': item.review_url, 'uniqueKey': item.id, 'userData': {'work_item': item.to_dict()}}
+                for item in items[start:start + _APIFY_BATCH_SIZE]
+            ]
+            response = await self._queue.batch_add_requests(requests)
+            added += sum(1 for request in response.get('processedRequests') or []
+                         if not request.get('wasAlreadyPresent'))
+        return added
+
+    async def lease(self) -> Optional[WorkItem]:
+        """
+        Lock the item at the head of the queue; None if no item is free.
+
+        Every lease counts as an attempt and is recorded in the request's
+        retryCount before the item is handed out, so an item whose worker
+        died or hung (and whose lock expired) runs out of attempts too.
+        """
+        head = await self._queue.list_and_lock_head(lock_secs=self.lease_seconds, limit=1)
+        for locked in head.get('items') or []:
+            request = await self._queue.get_request(locked['id'])
+            if request is None or request.get('handledAt'):
+                continue
+            item = WorkItem.from_dict(request['userData']['work_item'], attempts=request.get('retryCount', 0) + 1,
+                                      handle=request)
+            if item.attempts > self.max_attempts:
+                # The lock of its last allowed lease expired
+                await self._finish(item, FAILED, request['userData'].get('error')
+                                   or f'lease expired on each of {self.max_attempts} attempts')
+                continue
+            request['retryCount'] = item.attempts
+            await self._queue.update_request(request)
+            return item
+        return None
+
+    async def renew(self, item: WorkItem):
+        """Prolong this worker's lock on an item by lease_seconds."""
+        await self._queue.prolong_request_lock(item.handle['id'], lock_secs=self.lease_seconds)
+
+    async def _finish(self, item: WorkItem, status: str, error: Optional[str] = None):
+        request = item.handle
+        request['userData'] = {**request['userData'], 'status': status, 'owner': self.owner, 'error': error}
+        request['handledAt'] = datetime.now(timezone.utc).isoformat()
+        await self._queue.update_request(request)
+
+    async def complete(self, item: WorkItem, result: Dict[str, Any]):
+        """Store what the worker reports about an item, then mark it handled."""
+        await self._results.set_value(self._result_key(item.id), result)
+        await self._finish(item, DONE)
+
+    async def fail(self, item: WorkItem, error: str) -> bool:
+        """
+        Give an item back after a failed attempt.
+
+        Returns:
+            True if it will be retried, False if it ran out of attempts and is marked failed
+        """
+        if item.attempts >= self.max_attempts:
+            await self._finish(item, FAILED, error)
+            return False
+        request = item.handle
+        request['userData'] = {**request['userData'], 'error': error}
+        await self._queue.update_request(request)
+        await self._queue.delete_request_lock(request['id'])
+        return True
+
+    async def counts(self) -> Dict[str, int]:
+        """Item totals; 'remaining' counts every item not yet handled (leased or not)."""
+        info = await self._queue.get() or {}
+        total = info.get('totalRequestCount') or 0
+        finished = info.get('handledRequestCount') or 0
+        return {'total': total, 'finished': finished, 'remaining': total - finished}
+
+    async def results(self) -> List[ItemResult]:
+        """Every handled item, with the result its worker stored."""
+        results = []
+        exclusive_start_id = None
+        while True:
+            page = await self._queue.list_requests(limit=1000, exclusive_start_id=exclusive_start_id)
+            requests = page.get('items') or []
+            for request in requests:
+                if not request.get('handledAt'):
+                    continue
+                user_data = request.get('userData') or {}
+                item = WorkItem.from_dict(user_data['work_item'])
+                if user_data.get('status') == FAILED:
+                    results.append(ItemResult(item, FAILED, error=user_data.get('error')))
+                else:
+                    results.append(ItemResult(item, DONE, await self._results.get_value(self._result_key(item.id))))
+            if len(requests) < 1000:
+                return results
+            exclusive_start_id = requests[-1]['id']
+
+    async def clear(self):
+        """Start over with an empty queue and results store."""
+        await self._queue.delete()
+        await self._results.drop()
+        queue_info = await self._client.request_queues().get_or_create(name=self.name)
+        self._queue_id = queue_info['id']
+        self._queue = self._client.request_queue(self._queue_id, client_key=self.owner)
+        self._results = await Actor.open_key_value_store(name=f'{self.name}-results', force_cloud=True)
+
+    async def close(self):
+        pass
+
+
+async def open_work_queue(name: str, owner: str, local_directory: str, lease_seconds: int = DEFAULT_LEASE_SECONDS,
+                          max_attempts: int = DEFAULT_MAX_ATTEMPTS):
+    """
+    Open the work queue of a distributed crawl.
+
+    Args:
+        name: Queue name. On the Apify platform it names a request queue; locally a
+            SQLite file in local_directory. 'sqlite:<path>' always uses that SQLite file.
+        owner: Name of this worker
+        local_directory: Where local queues are kept
+        lease_seconds: How long a lease lasts without being renewed
+        max_attempts: Leases an item gets before it is marked failed
+
+    Returns:
+        An ApifyWorkQueue or a SqliteWorkQueue
+    """
+    if name.startswith(SQLITE_PREFIX):
+        return SqliteWorkQueue(name[len(SQLITE_PREFIX):], owner, lease_seconds, max_attempts)
+    if Actor.is_at_home():
+        return await ApifyWorkQueue.open(name, owner, lease_seconds, max_attempts)
+    return SqliteWorkQueue(os.path.join(local_directory, f'{name}.sqlite'), owner, lease_seconds, max_attempts)
+
+
+@asynccontextmanager
+async def holding_lease(queue, item: WorkItem):
+    """Renew the lease of an item in the background while the block runs."""
+    async def renew():
+        while True:
+            await asyncio.sleep(queue.lease_seconds / 3)
+            try:
+                await queue.renew(item)
+            except Exception as e:
+                print(f"  Could not renew the lease of {item.id}: {e}")
+
+    task = asyncio.create_task(renew())
+    try:
+        yield item
+    finally:
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)